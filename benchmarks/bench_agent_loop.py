@@ -0,0 +1,177 @@
+"""
+Measures how much time the Agent loop itself adds on top of the model and the tools.
+
+Runs N-turn sessions against the real file tools on a synthetic project, with a scripted
+fake model, and reports the per-turn overhead breakdown and per-tool timings.
+
+    python -m benchmarks.bench_agent_loop --turns 50 --files 200 --latency 0.0
+    python -m benchmarks.bench_agent_loop --http   # go through the OpenAI client and a local HTTP stand-in
+"""
+import argparse
+import contextlib
+import functools
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from lib.agents import agents as agents_module
+from lib.agents import dev_agent
+from lib.agents.agents import Agent, functions_to_dict
+from lib.agents.fake_client import FakeClient, FakeOpenAIServer
+from lib.agents.tracing import percentile
+
+
+class Timings:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def add(self, bucket, seconds):
+        self.samples[bucket].append(seconds)
+
+    def total(self, bucket):
+        return sum(self.samples.get(bucket, []))
+
+    def wrap(self, bucket, fun):
+        @functools.wraps(fun)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fun(*args, **kwargs)
+            finally:
+                self.add(bucket, time.perf_counter() - start)
+        return wrapper
+
+
+class TimedJson:
+    def __init__(self, timings):
+        self.dumps = timings.wrap("json", json.dumps)
+        self.loads = timings.wrap("json", json.loads)
+
+
+def make_project(root, files):
+    for i in range(files):
+        directory = os.path.join(root, "src", f"module_{i % 20}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"file_{i}.py"), "w") as f:
+            f.write("".join(f"def function_{i}_{n}(value):\n    return value * {n}\n\n" for n in range(40)))
+
+
+def make_script(turns, files, reads_per_turn):
+    script = []
+    for turn in range(turns):
+        paths = [f"src/module_{(turn + k) % 20}/file_{(turn * reads_per_turn + k) % files}.py" for k in range(reads_per_turn)]
+        target = paths[0]
+        script.append({"tool_calls": [{"name": "get_files_content", "arguments": {"file_paths": paths}}]})
+        script.append({"tool_calls": [{"name": "set_files_content", "arguments": {
+            "files": [{"file_path": target, "content": f"def edited_{turn}():\n    return {turn}\n"}]
+        }}]})
+        script.append(f"Edited {target}.")
+    return script
+
+
+def run(turns, files, reads_per_turn, latency, use_http):
+    timings = Timings()
+
+    with tempfile.TemporaryDirectory() as root:
+        make_project(root, files)
+        dev_agent.ROOT_DIRECTORY = root
+
+        logging.basicConfig(filename=os.path.join(root, "bench.log"), level=logging.INFO, force=True)
+
+        tools = [timings.wrap(f"tool:{t.__name__}", t) for t in (dev_agent.get_files_content, dev_agent.set_files_content)]
+        script = make_script(turns, files, reads_per_turn)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            functions_to_dict(tools)
+            timings.add("schema", time.perf_counter() - start)
+
+            agent = Agent(name="Bench", model="fake-model", system_prompt=dev_agent.developer.system_prompt, tools=tools)
+
+        agent.log_info = timings.wrap("logging", agent.log_info)
+        agent.log_error = timings.wrap("logging", agent.log_error)
+        original_json = agents_module.json
+        agents_module.json = TimedJson(timings)
+
+        server = None
+        if use_http:
+            from openai import OpenAI
+            server = FakeOpenAIServer(script, latency=latency).start()
+            client = OpenAI(base_url=server.base_url, api_key="benchmark", max_retries=0)
+            client.chat.completions.create = timings.wrap("model", client.chat.completions.create)
+        else:
+            client = FakeClient(script, latency=latency)
+            client.chat.completions.create = timings.wrap("model", client.chat.completions.create)
+
+        turn_times = []
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                for turn in range(turns):
+                    start = time.perf_counter()
+                    agent.request(client, f"Edit file number {turn}.")
+                    turn_times.append(time.perf_counter() - start)
+        finally:
+            agents_module.json = original_json
+            if server:
+                server.stop()
+
+    return timings, turn_times
+
+
+def report(timings, turn_times, latency, out=sys.stdout):
+    turns = len(turn_times)
+    total = sum(turn_times)
+    model_calls = len(timings.samples["model"])
+    model_total = timings.total("model")
+    scripted = latency * model_calls
+    tools_total = sum(timings.total(b) for b in timings.samples if b.startswith("tool:"))
+    accounted = model_total + tools_total + timings.total("logging") + timings.total("json")
+
+    rows = [
+        ("turn total", total),
+        ("model (scripted latency)", scripted),
+        ("client overhead", model_total - scripted),
+        ("tools", tools_total),
+        ("logging", timings.total("logging")),
+        ("json encode/decode", timings.total("json")),
+        ("agent other", total - accounted),
+    ]
+
+    print(f"{turns} turns, {model_calls} completions, p50 turn {percentile(turn_times, 0.5) * 1e3:.3f} ms, "
+          f"p95 turn {percentile(turn_times, 0.95) * 1e3:.3f} ms", file=out)
+    print(f"schema generation: {timings.total('schema') * 1e3:.3f} ms (once per Agent)", file=out)
+    print(f"\n{'per turn':<26}{'ms':>10}{'share':>9}", file=out)
+    for label, seconds in rows:
+        share = seconds / total * 100 if total else 0.0
+        print(f"{label:<26}{seconds / turns * 1e3:>10.3f}{share:>8.1f}%", file=out)
+
+    print(f"\n{'per tool':<26}{'calls':>7}{'mean ms':>10}{'p95 ms':>10}", file=out)
+    for bucket, samples in sorted(timings.samples.items()):
+        if bucket.startswith("tool:"):
+            print(f"{bucket[5:]:<26}{len(samples):>7}{statistics.mean(samples) * 1e3:>10.3f}"
+                  f"{percentile(samples, 0.95) * 1e3:>10.3f}", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--reads", type=int, default=3, help="files read per turn")
+    parser.add_argument("--latency", type=float, default=0.0, help="scripted model latency in seconds")
+    parser.add_argument("--http", action="store_true", help="use the OpenAI client against a local HTTP stand-in")
+    args = parser.parse_args()
+
+    timings, turn_times = run(args.turns, args.files, args.reads, args.latency, args.http)
+    report(timings, turn_times, args.latency)
+
+
+if __name__ == "__main__":
+    main()
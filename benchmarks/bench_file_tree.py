@@ -0,0 +1,132 @@
+"""
+Compares walking the project on every prompt with the cached, watcher-driven file tree.
+
+Builds a synthetic project (default 100k files, with a .gitignored build directory) and reports
+the cold build, the cost of a snapshot, a tool-driven update and how long the watcher takes
+to notice an outside change.
+
+    python -m benchmarks.bench_file_tree --files 100000 --per-dir 100
+    python -m benchmarks.bench_file_tree --watch poll --poll-interval 0.5
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from lib.agents.file_tree import FileTreeService
+
+
+def walk_tree(root, exclude_dirs=(".git", "__pycache__")):
+    """
+    The previous get_file_tree: a full os.walk on every call.
+    """
+    file_tree = {}
+    for current, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if d not in exclude_dirs]
+        node = file_tree
+        relative_path = os.path.relpath(current, root)
+        if relative_path != ".":
+            for folder in relative_path.split(os.sep):
+                node = node.setdefault(folder, {})
+        node.update({d: {} for d in dirs})
+        node.update({f: None for f in files})
+    return file_tree
+
+
+def make_project(root, files, per_dir):
+    with open(os.path.join(root, ".gitignore"), "w") as f:
+        f.write("build/\n*.o\n")
+    for i in range(files):
+        directory = os.path.join(root, "src", f"pkg_{i // (per_dir * 10)}", f"mod_{i // per_dir}")
+        if i % per_dir == 0:
+            os.makedirs(directory, exist_ok=True)
+        open(os.path.join(directory, f"file_{i}.py"), "w").close()
+    os.makedirs(os.path.join(root, "build"))
+    for i in range(files // 10):
+        open(os.path.join(root, "build", f"obj_{i}.o"), "w").close()
+
+
+def count_files(tree):
+    return sum(1 if value is None else count_files(value) for value in tree.values())
+
+
+def timed(fun, repeat=1):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fun()
+        samples.append(time.perf_counter() - start)
+    return result, samples
+
+
+def wait_for(service, rel_path, present=True, timeout=10.0):
+    parts = rel_path.split("/")
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        node = service.snapshot()
+        for part in parts[:-1]:
+            node = node.get(part) or {}
+        if (parts[-1] in node) == present:
+            return time.perf_counter() - start
+        time.sleep(0.001)
+    return float("nan")
+
+
+def report(label, samples):
+    print(f"  {label:<28} median {statistics.median(samples) * 1000:9.3f} ms   max {max(samples) * 1000:9.3f} ms")
+
+
+def run(files, per_dir, watch, poll_interval, repeat):
+    with tempfile.TemporaryDirectory() as root:
+        start = time.perf_counter()
+        make_project(root, files, per_dir)
+        print(f"Synthetic project: {files} files (+{files // 10} ignored) in {time.perf_counter() - start:.1f}s")
+
+        walked, walk_samples = timed(lambda: walk_tree(root), repeat=3)
+        service = FileTreeService(root, watch=watch, poll_interval=poll_interval)
+        _, build_samples = timed(service.start)
+        print(f"Watching with: {service.watch_mode}, {len(service.dirs)} directories, "
+              f"{count_files(service.snapshot())} files listed (os.walk lists {count_files(walked)})")
+
+        _, snapshot_samples = timed(service.snapshot, repeat=repeat)
+
+        target_dir = "src/pkg_0/mod_0"
+        notify_samples = []
+        for i in range(20):
+            rel_path = f"{target_dir}/tool_{i}.py"
+            open(os.path.join(root, rel_path), "w").close()
+            _, samples = timed(lambda: service.notify_changed(rel_path))
+            notify_samples += samples
+
+        watch_samples = []
+        for i in range(10):
+            rel_path = f"src/pkg_1/mod_{10 + i}/outside_{i}.py"
+            open(os.path.join(root, rel_path), "w").close()
+            watch_samples.append(wait_for(service, rel_path))
+            os.remove(os.path.join(root, rel_path))
+            wait_for(service, rel_path, present=False)
+        service.stop()
+
+        print("Results:")
+        report("os.walk per call", walk_samples)
+        report("cold build", build_samples)
+        report(f"snapshot (x{repeat})", snapshot_samples)
+        report("notify_changed (one dir)", notify_samples)
+        report("watcher picks up change", watch_samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--per-dir", type=int, default=100, help="files per leaf directory")
+    parser.add_argument("--watch", choices=["inotify", "poll"], default="inotify")
+    parser.add_argument("--poll-interval", type=float, default=0.2)
+    parser.add_argument("--repeat", type=int, default=1000, help="snapshot calls to time")
+    args = parser.parse_args()
+    run(args.files, args.per_dir, args.watch, args.poll_interval, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Measures how fast the memory database can be filled.
+
+Compares one commit per add_or_update_function call (with the old rollback journal and
+synchronous=FULL, and with WAL and synchronous=NORMAL) against Memory.bulk(). Per-call
+modes run on a sample and are extrapolated to the full count.
+
+    python -m benchmarks.bench_memory --functions 100000 --per-file 10
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from lib.agents.memory import Memory
+
+TAGS = ["database", "network", "ui", "logging", "auth", "parser", "cache", "io", "config", "test"]
+
+
+def rows(functions, per_file):
+    for i in range(functions):
+        file_path = f"src/module_{i // per_file}.cpp"
+        name = f"function_{i}"
+        yield (file_path, name, f"int {name}(int value)", f"Computes value {i} for module {i // per_file}",
+               [TAGS[i % len(TAGS)], TAGS[(i * 7) % len(TAGS)]])
+
+
+def open_memory(path, legacy):
+    memory = Memory(path)
+    if legacy:
+        memory.writer.execute("PRAGMA journal_mode = DELETE")
+        memory.writer.execute("PRAGMA synchronous = FULL")
+    return memory
+
+
+def per_call(directory, functions, per_file, sample, legacy):
+    memory = open_memory(os.path.join(directory, f"per_call_{legacy}.db"), legacy)
+    count = min(sample, functions)
+    start = time.perf_counter()
+    for i, (file_path, name, signature, description, tags) in enumerate(rows(count, per_file)):
+        if i % per_file == 0:
+            memory.add_or_update_file(file_path, tags)
+        memory.add_or_update_function(file_path, name, signature, description, tags)
+    elapsed = time.perf_counter() - start
+    return elapsed * functions / count, count
+
+
+def bulk(directory, functions, per_file):
+    memory = open_memory(os.path.join(directory, "bulk.db"), legacy=False)
+    start = time.perf_counter()
+    with memory.bulk() as batch:
+        for i, (file_path, name, signature, description, tags) in enumerate(rows(functions, per_file)):
+            if i % per_file == 0:
+                batch.add_file(file_path, tags)
+            batch.add_function(file_path, name, signature, description, tags)
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = sum(1 for _ in memory.query_by_tags(["database", "auth"], limit=1000))
+    hits = memory.search_functions("computes value 4242", k=10)
+    query_ms = (time.perf_counter() - start) * 1000
+    return elapsed, found, len(hits), query_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--functions", type=int, default=100_000)
+    parser.add_argument("--per-file", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=2000, help="calls timed in the per-call modes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        legacy, count = per_call(directory, args.functions, args.per_file, args.sample, legacy=True)
+        wal, _ = per_call(directory, args.functions, args.per_file, args.sample, legacy=False)
+        elapsed, found, hits, query_ms = bulk(directory, args.functions, args.per_file)
+
+    print(f"{args.functions} functions in {args.functions // args.per_file} files "
+          f"(per-call modes extrapolated from {count} calls)")
+    for label, seconds in [("per call, rollback journal, FULL", legacy),
+                           ("per call, WAL, NORMAL", wal),
+                           ("bulk(), WAL, NORMAL", elapsed)]:
+        print(f"  {label:<34} {seconds:9.2f} s  {args.functions / seconds:>10.0f} functions/s")
+    print(f"  queries after bulk load: {found} files by tag, {hits} search hits in {query_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
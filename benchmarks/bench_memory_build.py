@@ -0,0 +1,66 @@
+"""
+Measures memory-building throughput for different numbers of tagging workers.
+
+Tags a synthetic C++ project with a fake model that answers after --latency seconds,
+then re-runs the build on the unchanged project to show the cost of an incremental pass.
+
+    python -m benchmarks.bench_memory_build --files 400 --latency 0.05 --workers 1 4 8
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from lib.agents.fake_client import FakeClient
+from lib.agents.mem_agent import create_memory_builder_agent, MEMORY_BUILDER_MODEL
+from lib.agents.memory import Memory
+from lib.agents.memory_builder import MemoryBuilder
+
+
+def make_project(root, files):
+    for i in range(files):
+        directory = os.path.join(root, f"module_{i // 50}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"source_{i}.cpp"), "w") as f:
+            f.write(f"#include <vector>\n\nint compute_{i}(const std::vector<int>& values);\n" * 20)
+
+
+def tagger(messages):
+    last = messages[-1]
+    if last["role"] == "tool":
+        return "done"
+    path = last["content"].split("\n", 1)[0].removeprefix("File path: ")
+    return {"tool_calls": [{"name": "add_or_update_file", "arguments": {"path": path, "tags": ["compute", "vector"]}}]}
+
+
+def build(root, db_path, workers, latency):
+    builder = MemoryBuilder(root, Memory(db_path), create_memory_builder_agent, MEMORY_BUILDER_MODEL,
+                            workers=workers)
+    with contextlib.redirect_stdout(io.StringIO()):
+        full = builder.build(FakeClient([tagger], latency=latency, loop=True))
+        incremental = builder.build(FakeClient([]))
+    return full, incremental
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per fake completion")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = os.path.join(directory, "project")
+        make_project(root, args.files)
+        print(f"{args.files} files, {args.latency * 1000:.0f} ms per completion, 2 completions per file")
+        for workers in args.workers:
+            full, incremental = build(root, os.path.join(directory, f"memory_{workers}.db"), workers, args.latency)
+            print(f"  {workers:>2} workers: {full['seconds']:7.2f} s  {full['files_per_minute']:>8.0f} files/min "
+                  f"{full['tokens_per_minute']:>10.0f} tokens/min   unchanged re-run {incremental['seconds']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
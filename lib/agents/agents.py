@@ -2,11 +2,16 @@ import inspect
 import json
 import re
 import logging
+import time
 
 import typing
 from typing import get_origin, get_args
 from typing import List, Dict
 
+from .tracing import span
+from .router import default_validator
+from .tokens import token_counter, ContextLimitError
+
 """
 Docstring format for automatic parsing:
 
@@ -168,14 +173,28 @@ def find_function_by_name(tools, func_name):
     return None
 
 class Agent:
+    # Per-request budgets. None disables a budget; request() accepts overrides.
     max_handle_tool_calls = 5
+    max_request_seconds = None
+    max_request_tokens = None
+    # Tokens kept free for the reply when checking a request against the model's context.
+    reply_token_reserve = 1024
 
-    def __init__(self, name, model, system_prompt=None, system_prompt_file=None, tools = []):
+    def __init__(self, name, model, system_prompt=None, system_prompt_file=None, tools = [], router=None, validator=None, prefetcher=None):
         self.token_usage = 0
         self.cached_token_usage = 0
         self.handle_tool_calls_count = 0
+        self.request_tool_errors = 0
+        self.last_stop_reason = None
         self.name = name
         self.model = model
+        self.router = router
+        self.routing = router is not None
+        self.validator = validator or default_validator
+        self.forced_model = None
+        self.request_models = set()
+        self.request_tools = set()
+        self.prefetcher = prefetcher
         self.tools = tools
         self.tools_dict = functions_to_dict(tools)
         self.log_info(f"Initialized with model: {self.model}")
@@ -194,24 +213,172 @@ class Agent:
         self.additional_system_prompt = prompt
         self.update_system_message()
 
-    def log_info(self, message):
-        logging.info(f"[{self.name}] {message}")
+    def log_prefix(self, args):
+        prefix = f"[{self.name}] "
+        return prefix.replace("%", "%%") if args else prefix
+
+    def log_info(self, message, *args):
+        """
+        Logs a message. Pass large payloads as %-style args rather than in an f-string,
+        so formatting them happens on the logging thread instead of the request path.
+        """
+        logging.info(self.log_prefix(args) + message, *args)
 
-    def log_error(self, message):
-        logging.error(f"[{self.name}] {message}")
+    def log_error(self, message, *args):
+        logging.error(self.log_prefix(args) + message, *args)
 
-    def log_warning(self, message):
-        logging.warning(f"[{self.name}] {message}")
+    def log_warning(self, message, *args):
+        logging.warning(self.log_prefix(args) + message, *args)
 
     def set_model(self, model):
         self.model = model
+        self.routing = False
         self.log_info(f"Model set to: {self.model}")
 
-    def request(self, client, message):
+    def set_auto_model(self):
+        if self.router is None:
+            raise ValueError(f"Agent {self.name} has no model router.")
+        self.routing = True
+        self.log_info(f"Model routing enabled: {self.router.fast_model} / {self.router.strong_model}")
+
+    def select_model(self):
+        if self.forced_model:
+            return self.forced_model
+        if not self.routing:
+            return self.model
+        model, reason = self.router.choose(self.messages, self.handle_tool_calls_count)
+        self.log_info(f"Routed step {self.handle_tool_calls_count} to {model} ({reason})")
+        return model
+
+    def request(self, client, message, max_steps=None, max_seconds=None, max_tokens=None):
+        """
+        Sends a user message and runs the tool loop until the model answers or a budget runs out.
+
+        :param max_steps: Maximum tool-call rounds, defaults to max_handle_tool_calls.
+        :param max_seconds: Wall-clock budget for the request, defaults to max_request_seconds.
+        :param max_tokens: Token budget for the request, defaults to max_request_tokens.
+        :return: The assistant response, or a partial response when a budget ran out.
+                 The reason the loop ended is stored in last_stop_reason.
+
+        With model routing enabled, a request answered only by the fast model that fails
+        validation is rolled back and retried once on the strong model, unless it ran one of
+        the router's mutating tools.
+        """
+        budgets = {
+            "max_steps": self.max_handle_tool_calls if max_steps is None else max_steps,
+            "max_seconds": self.max_request_seconds if max_seconds is None else max_seconds,
+            "max_tokens": self.max_request_tokens if max_tokens is None else max_tokens,
+        }
+        history_length = len(self.messages)
+        self.log_info("User request: %s", message)
+
+        with span("agent.request", agent=self.name) as request_span:
+            context = None
+            if self.prefetcher:
+                with span("agent.prefetch", agent=self.name):
+                    context = self.prefetcher.prefetch(message)
+
+            response = self.run_request(client, message, budgets, context)
+
+            if self.routing:
+                valid = self.validator(self, response)
+                for model in self.request_models:
+                    self.router.record(model, valid)
+                escalate = not valid and self.router.strong_model not in self.request_models
+                if escalate and not self.router.can_escalate(self.request_tools):
+                    # Running the request again would repeat the side effects of these tools.
+                    self.log_warning(f"Not escalating to {self.router.strong_model}: "
+                                     f"{sorted(self.request_tools & self.router.mutating_tools)} already ran")
+                    escalate = False
+                if escalate:
+                    self.log_warning(f"Escalating to {self.router.strong_model} after failed attempt with {sorted(self.request_models)}")
+                    del self.messages[history_length:]
+                    self.forced_model = self.router.strong_model
+                    try:
+                        response = self.run_request(client, message, budgets, context)
+                    finally:
+                        self.forced_model = None
+                    self.router.record(self.router.strong_model, self.validator(self, response))
+                    request_span.set(escalated=True)
+
+            if self.last_stop_reason == "context":
+                # The user turn that did not fit is dropped so later requests can be sent. Tool
+                # calls it already ran stay in the history, closed by the stop note.
+                del self.messages[history_length]
+                if len(self.messages) > history_length:
+                    self.messages.append({"role": "assistant", "content": response})
+
+            if self.prefetcher:
+                self.prefetcher.finish_request()
+            request_span.set(stop_reason=self.last_stop_reason, steps=self.handle_tool_calls_count,
+                             models=sorted(self.request_models))
+        return response
+
+    def run_request(self, client, message, budgets, context=None):
+        context_message = {"role": "system", "content": context} if context else None
+        if context_message:
+            self.messages.append(context_message)
         self.messages.append({"role": "user", "content": message})
         self.handle_tool_calls_count = 0
-        self.log_info(f"User request: {message}")
-        return self.create_completion(client)
+        self.request_tool_errors = 0
+        self.request_models = set()
+        self.request_tools = set()
+        try:
+            return self.run_tool_loop(client, **budgets)
+        finally:
+            # Prefetched context only serves the current request.
+            if context_message:
+                self.messages = [m for m in self.messages if m is not context_message]
+
+    def exhausted_budget(self, started_at, tokens_at_start, max_steps, max_seconds, max_tokens):
+        if max_steps is not None and self.handle_tool_calls_count >= max_steps:
+            return "steps"
+        if max_seconds is not None and time.monotonic() - started_at >= max_seconds:
+            return "time"
+        if max_tokens is not None and self.token_usage - tokens_at_start >= max_tokens:
+            return "tokens"
+        return None
+
+    def run_tool_loop(self, client, max_steps=None, max_seconds=None, max_tokens=None):
+        started_at = time.monotonic()
+        tokens_at_start = self.token_usage
+        partial_responses = []
+
+        while True:
+            budget = self.exhausted_budget(started_at, tokens_at_start, max_steps, max_seconds, max_tokens)
+            if budget:
+                self.last_stop_reason = budget
+                self.log_warning(f"Request stopped: {budget} budget exhausted after {self.handle_tool_calls_count} tool steps, "
+                                 f"{self.token_usage - tokens_at_start} tokens, {time.monotonic() - started_at:.1f}s")
+                response = "\n".join(partial_responses + [f"[Stopped: {budget} budget exhausted]"])
+                self.messages.append({"role": "assistant", "content": response})
+                return response
+
+            model = self.select_model()
+            self.request_models.add(model)
+            try:
+                completion = self.create_completion(client, model)
+            except ContextLimitError as e:
+                self.last_stop_reason = "context"
+                self.log_warning(f"Request stopped before sending: {e}")
+                # request() drops the user turn and decides what else is kept.
+                return "\n".join(partial_responses + [f"[Stopped: {e}]"])
+            choice = completion.choices[0]
+
+            if choice.finish_reason == "tool_calls":
+                self.log_info("The model has initiated a tool call.")
+                self.messages.append(choice.message.model_dump(exclude_none=True))
+                if choice.message.content:
+                    partial_responses.append(choice.message.content)
+                self.handle_tool_calls(choice.message.tool_calls)
+                self.handle_tool_calls_count += 1
+                continue
+
+            response = choice.message.content
+            self.messages.append({"role": "assistant", "content": response})
+            self.log_info("Assistant response: %s", response)
+            self.last_stop_reason = "completed"
+            return response
 
     def get_user_assistant_messages(self):
         return [
@@ -220,33 +387,34 @@ class Agent:
             if msg.get('role') in {'user', 'assistant'} and msg.get('content')
         ]
 
-    def create_completion(self, client):
-        if self.tools_dict:
-            completion = client.chat.completions.create(
-                model=self.model,
-                messages=self.messages,
-                tools=self.tools_dict
-            )
-        else:
-            completion = client.chat.completions.create(
-                model=self.model,
-                messages=self.messages,
-            )
+    def context_usage(self, model=None):
+        """
+        Returns (prompt tokens, context limit) for the current conversation.
+        """
+        return token_counter.usage(self.messages, model or self.model, self.tools_dict)
+
+    def create_completion(self, client, model=None):
+        model = model or self.model
+        token_counter.check_request(self.messages, model, self.tools_dict, self.reply_token_reserve)
+        with span("llm.completion", agent=self.name, model=model) as completion_span:
+            if self.tools_dict:
+                completion = client.chat.completions.create(
+                    model=model,
+                    messages=self.messages,
+                    tools=self.tools_dict
+                )
+            else:
+                completion = client.chat.completions.create(
+                    model=model,
+                    messages=self.messages,
+                )
+            completion_span.set(tokens=completion.usage.total_tokens)
 
         self.token_usage += completion.usage.total_tokens
         self.cached_token_usage += completion.usage.cached_tokens if 'cached_tokens' in completion.usage else 0
         self.log_info(f"Token usage updated: {completion.usage.total_tokens}, Total tokens used: {self.token_usage}, Cached tokens: {self.cached_token_usage}")
 
-        if completion.choices[0].finish_reason == "tool_calls":
-            self.log_info("The model has initiated a tool call.")
-            self.messages.append(completion.choices[0].message.dict())
-            return self.handle_tool_calls(client, completion.choices[0].message.tool_calls)
-
-        response = completion.choices[0].message.content
-        self.messages.append({"role": "assistant", "content": response})
-        self.log_info(f"Assistant response: {response}")
-
-        return response
+        return completion
     
     def combined_system_prompt(self):
         combined_prompt = self.system_prompt
@@ -272,30 +440,40 @@ class Agent:
         self.clear()
         self.messages.extend(user_assistans_messages)
     
-    def handle_tool_calls(self, client, tool_calls):
-        if self.handle_tool_calls_count > self.max_handle_tool_calls:
-            self.log_error(f"Exceeded maximum tool calls limit: {self.handle_tool_calls_count}")
-            return ""
-
+    def handle_tool_calls(self, tool_calls):
         for tool_call in tool_calls:
             function = find_function_by_name(self.tools, tool_call.function.name)
             if not function:
                 self.log_error("Tool call failed: Function not found.")
+                self.messages.append({
+                    "role": "tool",
+                    "content": json.dumps(f"Error: unknown tool {tool_call.function.name}"),
+                    "tool_call_id": tool_call.id
+                })
                 continue
 
-            arguments = json.loads(tool_call.function.arguments)
-            if isinstance(arguments, list):
-                ret = function(*arguments)
-            elif isinstance(arguments, dict):
-                ret = function(**arguments)
-            else:
-                self.log_error("Invalid arguments format received for the tool call.")
-            self.log_info(f"Call tool {tool_call.function.name} with arguments: {arguments}")
-            self.log_info(f"Tool {tool_call.function.name} result: {ret}")
+            with span(f"tool.{tool_call.function.name}", agent=self.name):
+                try:
+                    arguments = json.loads(tool_call.function.arguments)
+                    if self.prefetcher:
+                        self.prefetcher.observe_tool_call(tool_call.function.name, arguments)
+                    self.request_tools.add(tool_call.function.name)
+                    if isinstance(arguments, list):
+                        ret = function(*arguments)
+                    elif isinstance(arguments, dict):
+                        ret = function(**arguments)
+                    else:
+                        self.log_error("Invalid arguments format received for the tool call.")
+                        ret = "Error: invalid arguments format"
+                        self.request_tool_errors += 1
+                except Exception as e:
+                    self.log_error(f"Tool {tool_call.function.name} raised {type(e).__name__}: {e}")
+                    ret = f"Error: {type(e).__name__}: {e}"
+                    self.request_tool_errors += 1
+            self.log_info("Call tool %s with arguments: %s", tool_call.function.name, tool_call.function.arguments)
+            self.log_info("Tool %s result: %s", tool_call.function.name, ret)
             self.messages.append({
                 "role": "tool",
                 "content": json.dumps(ret),
                 "tool_call_id": tool_call.id
-            })
-
-        return self.create_completion(client)
\ No newline at end of file
+            })
\ No newline at end of file
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import logging
+import os
+
+from .client import ClientWrapper
+
+MODES = ("record", "replay", "auto")
+
+
+class CassetteMiss(KeyError):
+    pass
+
+
+def request_key(model, messages, tools=None):
+    """
+    Returns a stable hash of the parts of a request that determine the response.
+    """
+    payload = {"model": model, "messages": messages, "tools": tools or []}
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def completion_to_dict(completion):
+    if hasattr(completion, "model_dump"):
+        return completion.model_dump(mode="json")
+    return completion
+
+
+def completion_from_dict(data):
+    from openai.types.chat import ChatCompletion
+    return ChatCompletion.model_validate(data)
+
+
+class Cassette:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def has(self, key):
+        return os.path.exists(self.path_for(key))
+
+    def load(self, key):
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            raise CassetteMiss(key)
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["response"]
+
+    def save(self, key, request, response):
+        path = self.path_for(key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"request": request, "response": response}, f, ensure_ascii=False, indent=1, default=str)
+        os.replace(tmp_path, path)
+
+
+class CassetteClient(ClientWrapper):
+    """
+    Records ``chat.completions.create`` calls to disk and replays them offline.
+
+    In 'record' mode every request goes to the wrapped client and the response is stored.
+    In 'replay' mode responses come only from disk and a missing entry raises CassetteMiss.
+    In 'auto' mode stored responses are replayed and the rest are recorded.
+    """
+
+    def __init__(self, client, directory, mode="auto"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if client is None and mode != "replay":
+            raise ValueError("A client is required unless the cassette is in replay mode.")
+        super().__init__(client)
+        self.cassette = Cassette(directory)
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+
+    def create(self, **kwargs):
+        key = request_key(kwargs.get("model"), kwargs.get("messages"), kwargs.get("tools"))
+
+        if self.mode == "replay" or (self.mode == "auto" and self.cassette.has(key)):
+            response = self.cassette.load(key)
+            self.hits += 1
+            logging.info(f"[Cassette] Replayed {key[:12]}")
+            return completion_from_dict(response)
+
+        completion = self.client.chat.completions.create(**kwargs)
+        self.misses += 1
+        self.cassette.save(key, kwargs, completion_to_dict(completion))
+        logging.info(f"[Cassette] Recorded {key[:12]}")
+        return completion
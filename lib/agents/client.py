@@ -0,0 +1,67 @@
+import os
+from types import SimpleNamespace
+
+
+class ClientWrapper:
+    """
+    Base class for objects that stand in for an OpenAI client.
+
+    Agents only ever call ``client.chat.completions.create(**kwargs)``, so a wrapper
+    exposes the same attribute path and routes it to ``create``.
+    """
+
+    def __init__(self, client=None):
+        self.client = client
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        return self.client.chat.completions.create(**kwargs)
+
+
+_client = None
+
+
+def _int_env(name, default=None):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def create_client():
+    """
+    Builds the client shared by all agents.
+
+    Environment variables:
+    DEVAGENT_CASSETTE_DIR: directory with recorded completions; enables the cassette layer
+    DEVAGENT_CASSETTE_MODE: 'record', 'replay' or 'auto' (default 'auto')
+    DEVAGENT_MAX_IN_FLIGHT: maximum concurrent API requests (default 4)
+    DEVAGENT_MAX_RETRIES: retries for 429 and transient errors (default 6)
+    DEVAGENT_RPM, DEVAGENT_TPM: initial request/token budgets per minute, otherwise learned from headers
+    """
+    cassette_dir = os.getenv("DEVAGENT_CASSETTE_DIR")
+    cassette_mode = os.getenv("DEVAGENT_CASSETTE_MODE", "auto")
+
+    if cassette_dir and cassette_mode == "replay":
+        client = None
+    else:
+        from openai import OpenAI
+        from .rate_limit import RateLimitedClient
+        client = RateLimitedClient(
+            OpenAI(max_retries=0),
+            max_retries=_int_env("DEVAGENT_MAX_RETRIES", 6),
+            requests_per_minute=_int_env("DEVAGENT_RPM"),
+            tokens_per_minute=_int_env("DEVAGENT_TPM"),
+            max_in_flight=_int_env("DEVAGENT_MAX_IN_FLIGHT", 4),
+        )
+
+    if cassette_dir:
+        from .cassette import CassetteClient
+        client = CassetteClient(client, cassette_dir, mode=cassette_mode)
+
+    return client
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = create_client()
+    return _client
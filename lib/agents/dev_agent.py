@@ -1,34 +1,55 @@
 from .agents import Agent
-from openai import OpenAI
+from .client import get_client
+from .router import ModelRouter
+from .prefetch import Prefetcher
+from .memory import memory
+from .patching import apply_patch_text
+from .file_reader import reader, parse_path_spec
+from .file_tree import FileTreeService
+from .tree_render import render_tree
+from .retrieval import RetrievalIndex
+from .tracing import traced
 import os
 import json
 from typing import List, Dict, Any
 
-client = OpenAI()
+client = get_client()
 
 ROOT_DIRECTORY = os.getenv("PROJECT_PATH", os.getcwd())
+file_tree = FileTreeService(ROOT_DIRECTORY)
+FILE_TREE_TOKENS = int(os.getenv("DEVAGENT_TREE_TOKENS", "3000"))
+retrieval_index = RetrievalIndex(ROOT_DIRECTORY, "data/retrieval_index.npz", list_files=file_tree.iter_files)
+file_tree.add_listener(retrieval_index.notify_changed)
 
 def get_files_content(file_paths: List[str]):
     """
     Reads the content of multiple files in the project.
     This function can handle multiple files at once and returns their content as JSON.
+    Large files are returned in windows; use a line range to page through them.
+    Binary files are detected and their content is omitted.
 
     :param file_paths: A list of relative paths to the files within the project.
-                       Each path should be a string representing the file location.
+                       Each entry is 'path' for the whole file, 'path:START-END' for lines START to END
+                       (1-based, inclusive, either bound optional, e.g. 'app.log:500-'),
+                       or 'path@START-END' for a byte range.
     :return: A JSON string containing objects with keys:
-             file_path: The relative path of the file
-             content: The content of the file
+             file_path: The requested path
+             content: The content of the file or of the requested range
+             total_lines: Number of lines in the whole file
+             start_line: First returned line
+             end_line: Last returned line
+             truncated: True if the size cap cut the result; 'next' holds the path spec to read next
     """
     results = []
-    for file_path in file_paths:
+    for spec in file_paths:
+        file_path, kind, start, end = parse_path_spec(spec)
         abs_path = os.path.join(ROOT_DIRECTORY, file_path)
-        print('get_files_content', abs_path)
+        print('get_files_content', abs_path, kind or "", start or "", end or "")
         try:
-            with open(abs_path, 'r') as file:
-                content = file.read()
-        except FileNotFoundError:
-            content = ""
-        results.append({"file_path": file_path, "content": content})
+            result = reader.read(abs_path, kind, start, end, path=file_path)
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            result = {"content": "", "error": "file not found"}
+        results.append({"file_path": spec, **result})
     return json.dumps(results)
 
 def set_files_content(files: List[Dict[str, Any]]):
@@ -46,6 +67,29 @@ def set_files_content(files: List[Dict[str, Any]]):
         os.makedirs(os.path.dirname(abs_path), exist_ok=True)
         with open(abs_path, 'w') as file:
             file.write(f["content"])
+        file_tree.notify_changed(f["file_path"])
+
+def apply_patch(patch: str):
+    """
+    Applies edits to one or more existing files without rewriting them in full.
+    Prefer this over set_files_content for changes to existing files.
+    The patch may contain unified diff sections (--- a/path, +++ b/path, @@ hunks with context lines)
+    and search/replace blocks: a line '*** path', then '<<<<<<< SEARCH', the exact old lines,
+    '=======', the new lines and '>>>>>>> REPLACE'. An empty SEARCH section appends to or creates the file.
+    Context is matched even if line numbers or indentation are slightly off.
+    Hunks that apply are written; failed hunks are reported, so resend only those.
+
+    :param patch: The patch text for all files to change.
+    :return: A JSON string with keys:
+             ok: Whether every hunk was applied
+             files: Applied hunks per file
+             errors: Failed hunks with file, hunk number and reason
+    """
+    result = apply_patch_text(patch, ROOT_DIRECTORY)
+    for f in result["files"]:
+        file_tree.notify_changed(f["file"])
+    print('apply_patch', [f["file"] for f in result["files"]], len(result["errors"]), "errors")
+    return json.dumps(result)
 
 def update_file_content(file_path, target_string, replacement_string):
     """
@@ -68,29 +112,64 @@ def update_file_content(file_path, target_string, replacement_string):
     except Exception as e:
         print(f"An error occurred: {e}")
 
+@traced("fs.get_file_tree")
 def get_file_tree():
     """
-    Recursively gets the file tree of a given directory.
+    Gets the file tree of the project, skipping .gitignored paths.
     Returns a nested dictionary representing the directory structure,
     where files have value None and directories have nested dicts.
+    The tree is cached and kept current by a file watcher; treat it as read-only.
+    """
+    return file_tree.snapshot()
+
+def get_directory_tree(directory: str):
     """
-    file_tree = {}
-    exclude_dirs = [".git", "__pycache__"]
-    
-    for root, dirs, files in os.walk(ROOT_DIRECTORY):
-        dirs[:] = [d for d in dirs if d not in exclude_dirs]
+    Lists the files and subdirectories of one project directory.
+    Use it for directories shown collapsed in the project file tree, e.g. 'tests/ (312 files, *.cpp)'.
 
-        current_dir = file_tree
-        relative_path = os.path.relpath(root, ROOT_DIRECTORY)
-        
-        if relative_path != ".":
-            for folder in relative_path.split(os.sep):
-                current_dir = current_dir.setdefault(folder, {})
-        
-        current_dir.update({d: {} for d in dirs})
-        current_dir.update({f: None for f in files})
+    :param directory: Directory path relative to the project root, e.g. "src/tests".
+    :return: The directory listing in the same indented format as the project file tree.
+    """
+    node = get_file_tree()
+    for part in directory.replace(os.sep, "/").strip("/").split("/"):
+        if part in ("", "."):
+            continue
+        node = node.get(part) if isinstance(node, dict) else None
+        if node is None:
+            return f"Directory not found: {directory}"
+    return render_tree(node, FILE_TREE_TOKENS) or "(empty)"
 
-    return file_tree
+def search_memory(query: str, k: int):
+    """
+    Searches the project memory for functions by name, signature, description and tags.
+    Use it to find relevant code in one call before reading files.
+
+    :param query: Words to look for, e.g. "open database connection".
+    :param k: Maximum number of results, e.g. 10.
+    :return: A JSON list of matches, best first, with file_path, name, signature, description, tags and score.
+    """
+    try:
+        k = max(1, min(int(k), 50))
+    except (TypeError, ValueError):
+        k = 10
+    return json.dumps(memory.search_functions(query, k))
+
+def retrieve(query: str, k: int):
+    """
+    Finds the code chunks (functions, methods, classes or parts of files) most relevant to a query,
+    ranked by BM25 over identifiers split at camelCase and snake_case boundaries.
+
+    :param query: Words or identifiers to look for, e.g. "database connection retry".
+    :param k: Maximum number of chunks, e.g. 10.
+    :return: A JSON list of chunks, best first, with file_path, start_line, end_line, name and score.
+             Read a chunk with get_files_content using 'file_path:start_line-end_line'.
+    """
+    try:
+        k = max(1, min(int(k), 50))
+    except (TypeError, ValueError):
+        k = 10
+    retrieval_index.update()
+    return json.dumps(retrieval_index.search(query, k))
 
 developer = Agent(
     name="Agent 007",
@@ -99,10 +178,12 @@ developer = Agent(
     You are a programming developer working on a software project.
 
     Steps:
-    1. Identify all files that need modification.
-    2. Ask for all required files at once using get_files_content.
+    1. Identify all files that need modification; use retrieve or search_memory to locate code when unsure where it lives.
+    2. Ask for all required files at once using get_files_content; read only the line ranges you need.
     3. Modify the content as needed.
-    4. Save all modified files at once using set_files_content.
+    4. Save all changes at once: use apply_patch for edits to existing files,
+       and set_files_content only for new files or complete rewrites.
+    5. If apply_patch reports failed hunks, resend only those hunks.
 
     Rules:
     - Do not include comments in the code.
@@ -112,5 +193,20 @@ developer = Agent(
     Goal:
     Efficiently locate, edit, and update files in the project without asking for files one by one.
     """,
-    tools=[get_files_content, set_files_content]
+    tools=[get_files_content, set_files_content, apply_patch, get_directory_tree, search_memory, retrieve],
+    router=ModelRouter(
+        fast_model="gpt-5-mini",
+        strong_model="gpt-5",
+        strong_tools=("set_files_content", "apply_patch"),
+        mutating_tools=("set_files_content", "apply_patch"),
+        stats_path="data/router_stats.json",
+    ),
+    prefetcher=Prefetcher(ROOT_DIRECTORY, memory=memory, list_files=file_tree.iter_files)
 )
+
+def render_file_tree(token_budget=FILE_TREE_TOKENS):
+    """
+    Renders the project file tree for the system prompt, expanding recently touched areas.
+    """
+    focus = developer.prefetcher.recent_paths() + file_tree.recent_dirs()
+    return render_tree(get_file_tree(), token_budget, focus)
@@ -0,0 +1,209 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .client import ClientWrapper
+
+"""
+Scripted stand-ins for the OpenAI API, used for offline tests and benchmarks.
+
+A script is a list of steps. Each step is a string (a final assistant answer), a callable
+that receives the request messages and returns a step, or a dictionary with keys:
+    content: assistant answer text
+    tool_calls: list of {"name": ..., "arguments": {...}} dictionaries
+    latency: seconds to wait before answering, overrides the client default
+    status: HTTP status to answer with instead of a completion (HTTP stand-in only)
+    headers: extra response headers (HTTP stand-in only)
+"""
+
+
+def estimate_tokens(payload) -> int:
+    return max(1, len(json.dumps(payload, default=str)) // 4)
+
+
+def completion_payload(step, model="fake-model", messages=None, index=0) -> dict:
+    if isinstance(step, str):
+        step = {"content": step}
+
+    tool_calls = [
+        {
+            "id": f"call_{index}_{i}",
+            "type": "function",
+            "function": {
+                "name": call["name"],
+                "arguments": call["arguments"] if isinstance(call.get("arguments"), str)
+                else json.dumps(call.get("arguments", {})),
+            },
+        }
+        for i, call in enumerate(step.get("tool_calls") or [])
+    ]
+
+    message = {"role": "assistant", "content": step.get("content")}
+    if tool_calls:
+        message["tool_calls"] = tool_calls
+
+    prompt_tokens = estimate_tokens(messages or [])
+    completion_tokens = estimate_tokens(message)
+    return {
+        "id": f"chatcmpl-fake-{index}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "finish_reason": "tool_calls" if tool_calls else "stop",
+            "message": message,
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def resolve_step(step, messages) -> dict:
+    if callable(step):
+        step = step(messages or [])
+    return {"content": step} if isinstance(step, str) else step
+
+
+class Script:
+    def __init__(self, steps, loop=False):
+        self.steps = list(steps)
+        self.loop = loop
+        self.index = 0
+        self.lock = threading.Lock()
+
+    def next(self):
+        with self.lock:
+            if self.index >= len(self.steps):
+                if not self.loop or not self.steps:
+                    raise IndexError("Fake LLM script is exhausted.")
+                self.index = 0
+            index = self.index
+            self.index += 1
+        return index, self.steps[index]
+
+
+class FakeClient(ClientWrapper):
+    """
+    In-process client that answers ``chat.completions.create`` from a script.
+
+    :param script: List of steps, see module notes.
+    :param latency: Seconds to sleep per request, simulating model time.
+    :param loop: Restart the script when it runs out instead of raising IndexError.
+    """
+
+    def __init__(self, script, latency=0.0, loop=False):
+        super().__init__()
+        self.script = Script(script, loop=loop)
+        self.latency = latency
+        self.requests = []
+
+    def create(self, **kwargs):
+        from .cassette import completion_from_dict
+
+        self.requests.append({**kwargs, "messages": list(kwargs.get("messages") or [])})
+        index, step = self.script.next()
+        step = resolve_step(step, kwargs.get("messages"))
+        latency = step.get("latency", self.latency)
+        if latency:
+            time.sleep(latency)
+        return completion_from_dict(
+            completion_payload(step, kwargs.get("model", "fake-model"), kwargs.get("messages"), index)
+        )
+
+
+class _FakeOpenAIHandler(BaseHTTPRequestHandler):
+    server_version = "FakeOpenAI/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server.owner
+        server.requests.append(request)
+
+        try:
+            index, step = server.script.next()
+        except IndexError as e:
+            self._send_json(500, {"error": {"message": str(e), "type": "server_error"}})
+            return
+        step = resolve_step(step, request.get("messages"))
+
+        latency = step.get("latency", server.latency)
+        if latency:
+            time.sleep(latency)
+
+        headers = dict(server.headers)
+        headers.update(step.get("headers", {}))
+        status = step.get("status", 200)
+        if status != 200:
+            self._send_json(status, {"error": {"message": f"Scripted status {status}", "type": "fake_error"}}, headers)
+            return
+
+        self._send_json(200, completion_payload(step, request.get("model", "fake-model"), request.get("messages"), index), headers)
+
+
+class FakeOpenAIServer:
+    """
+    Local OpenAI-compatible HTTP stand-in serving ``POST /v1/chat/completions`` from a script.
+
+    Use as a context manager and point a real client at ``base_url``:
+        with FakeOpenAIServer(["hi"]) as server:
+            client = OpenAI(base_url=server.base_url, api_key="fake")
+
+    :param script: List of steps, see module notes.
+    :param latency: Seconds to sleep per request.
+    :param headers: Headers added to every response, e.g. rate-limit headers.
+    """
+
+    def __init__(self, script, latency=0.0, loop=False, headers=None, host="127.0.0.1", port=0):
+        self.script = Script(script, loop=loop)
+        self.latency = latency
+        self.headers = headers or {}
+        self.requests = []
+        self.httpd = ThreadingHTTPServer((host, port), _FakeOpenAIHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.owner = self
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread:
+            self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
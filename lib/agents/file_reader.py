@@ -0,0 +1,188 @@
+import mmap
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+
+MAX_READ_BYTES = 256 * 1024
+BINARY_SNIFF_BYTES = 8192
+RANGE_PATTERN = re.compile(r"^(?P<path>.+?)(?:(?P<kind>[:@])(?P<start>\d+)?-(?P<end>\d+)?|:(?P<line>\d+))$")
+
+
+def parse_path_spec(spec: str):
+    """
+    Splits 'path', 'path:START-END' (1-based inclusive lines) or 'path@START-END'
+    (0-based byte offsets, END exclusive) into (path, kind, start, end).
+    Either bound may be omitted, e.g. 'log.txt:100-' reads from line 100 to the end.
+    """
+    match = RANGE_PATTERN.match(spec)
+    if not match:
+        return spec, None, None, None
+    if match.group("line"):
+        line = int(match.group("line"))
+        return match.group("path"), "lines", line, line
+    start = match.group("start")
+    end = match.group("end")
+    kind = "lines" if match.group("kind") == ":" else "bytes"
+    return match.group("path"), kind, int(start) if start else None, int(end) if end else None
+
+
+def is_binary(sample: bytes) -> bool:
+    if b"\0" in sample:
+        return True
+    try:
+        sample.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut at the end of the sample is not a sign of binary data.
+        return e.start < len(sample) - 3
+    return False
+
+
+def character_boundary(mm, start, end):
+    """
+    Moves a cut at end back to the start of the UTF-8 character it would split.
+    """
+    boundary = end
+    while boundary > start and boundary < len(mm) and mm[boundary] & 0xC0 == 0x80:
+        boundary -= 1
+    return boundary if boundary > start else end
+
+
+class LineIndex:
+    """
+    Byte offsets of line starts in a file, built once per (size, mtime).
+    """
+
+    def __init__(self, mm, size):
+        self.starts = array("Q", [0])
+        position = mm.find(b"\n")
+        while position != -1:
+            self.starts.append(position + 1)
+            position = mm.find(b"\n", position + 1)
+        if self.starts[-1] == size and len(self.starts) > 1:
+            self.starts.pop()
+        self.size = size
+
+    @property
+    def total_lines(self):
+        return len(self.starts) if self.size else 0
+
+    def line_span(self, start_line, end_line):
+        start = self.starts[start_line - 1]
+        end = self.starts[end_line] if end_line < len(self.starts) else self.size
+        return start, end
+
+    def line_at_offset(self, offset):
+        low, high = 0, len(self.starts) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.starts[middle] <= offset:
+                low = middle
+            else:
+                high = middle - 1
+        return low + 1
+
+
+class FileReader:
+    """
+    Serves whole files, line windows and byte windows through mmap. Line windows use a
+    cached newline index, so reading a slice of a large file costs O(window).
+    """
+
+    def __init__(self, max_read_bytes=MAX_READ_BYTES, max_indexes=64):
+        self.max_read_bytes = max_read_bytes
+        self.max_indexes = max_indexes
+        self.indexes = OrderedDict()
+        self.lock = threading.Lock()
+
+    def line_index(self, path, stat, mm):
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            index = self.indexes.get(path)
+            if index is not None and index[0] == key:
+                self.indexes.move_to_end(path)
+                return index[1]
+        built = LineIndex(mm, stat.st_size)
+        with self.lock:
+            self.indexes[path] = (key, built)
+            while len(self.indexes) > self.max_indexes:
+                self.indexes.popitem(last=False)
+        return built
+
+    def read(self, abs_path, kind=None, start=None, end=None, path=None) -> dict:
+        """
+        Reads a file, a line range or a byte range, at most max_read_bytes. A cut result has
+        truncated=True and 'next' holds the spec to read next, e.g. 'app.log:120-', or
+        'app.log@262144-' when a single line is longer than the cap.
+
+        :param path: Path written in the 'next' spec, defaults to abs_path.
+        """
+        path = path or abs_path
+        stat = os.stat(abs_path)
+        result = {"size": stat.st_size}
+        if stat.st_size == 0:
+            result.update(content="", total_lines=0, start_line=0, end_line=0, truncated=False)
+            return result
+
+        with open(abs_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if is_binary(mm[:BINARY_SNIFF_BYTES]):
+                result.update(binary=True, content="")
+                return result
+
+            index = self.line_index(abs_path, stat, mm)
+            total = index.total_lines
+            result["total_lines"] = total
+
+            if kind == "bytes":
+                byte_start = min(start or 0, stat.st_size)
+                requested_end = min(end if end is not None else stat.st_size, stat.st_size)
+                byte_end = min(requested_end, byte_start + self.max_read_bytes)
+                if byte_end < requested_end:
+                    byte_end = character_boundary(mm, byte_start, byte_end)
+                result.update(
+                    content=mm[byte_start:byte_end].decode("utf-8", errors="replace"),
+                    start_byte=byte_start,
+                    end_byte=byte_end,
+                    start_line=index.line_at_offset(byte_start),
+                    end_line=index.line_at_offset(max(byte_start, byte_end - 1)),
+                    truncated=byte_end < requested_end,
+                )
+                if result["truncated"]:
+                    result["next"] = f"{path}@{byte_end}-{end if end is not None else ''}"
+                return result
+
+            first = max(1, start or 1)
+            last = min(total, end if end is not None else total)
+            if first > last:
+                result.update(content="", start_line=first, end_line=last, truncated=False,
+                              error=f"line range {first}-{last} is outside 1-{total}")
+                return result
+
+            byte_start, byte_end = index.line_span(first, last)
+            range_end = byte_end if end is not None else ""
+            truncated = False
+            line_cut = False
+            if byte_end - byte_start > self.max_read_bytes:
+                last = max(first, index.line_at_offset(byte_start + self.max_read_bytes) - 1)
+                byte_start, byte_end = index.line_span(first, last)
+                if byte_end - byte_start > self.max_read_bytes:
+                    # A single line longer than the cap: the rest of it is read by byte offset.
+                    byte_end = character_boundary(mm, byte_start, byte_start + self.max_read_bytes)
+                    line_cut = True
+                truncated = True
+
+            result.update(
+                content=mm[byte_start:byte_end].decode("utf-8", errors="replace"),
+                start_line=first,
+                end_line=last,
+                truncated=truncated,
+            )
+            if line_cut:
+                result["next"] = f"{path}@{byte_end}-{range_end}"
+            elif truncated:
+                result["next"] = f"{path}:{last + 1}-{end if end is not None else ''}"
+            return result
+
+
+reader = FileReader()
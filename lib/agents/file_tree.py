@@ -0,0 +1,529 @@
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import re
+import select
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_EXCLUDE_DIRS = (".git", "__pycache__")
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF
+              | IN_MOVE_SELF | IN_CLOSE_WRITE | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def translate_gitignore_pattern(pattern):
+    """
+    Converts one .gitignore line into (regex, negate, dir_only), or None for blanks and comments.
+    The regex matches paths relative to the directory holding the .gitignore.
+    """
+    pattern = pattern.rstrip("\n").rstrip("\r")
+    if not pattern.strip() or pattern.startswith("#"):
+        return None
+    if not pattern.endswith("\\ "):
+        pattern = pattern.rstrip()
+
+    negate = pattern.startswith("!")
+    if negate:
+        pattern = pattern[1:]
+    if pattern.startswith(("\\#", "\\!")):
+        pattern = pattern[1:]
+
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex += "/.*"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif c == "*":
+            regex += "[^/]*"
+            i += 1
+        elif c == "?":
+            regex += "[^/]"
+            i += 1
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex += re.escape(c)
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex += f"[{body}]"
+                i = end + 1
+        elif c == "\\" and i + 1 < len(pattern):
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            regex += re.escape(c)
+            i += 1
+
+    prefix = "^" if anchored else "^(?:.*/)?"
+    return re.compile(prefix + regex + "$"), negate, dir_only
+
+
+def load_gitignore(root, rel_dir):
+    path = os.path.join(root, rel_dir, ".gitignore")
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            lines = f.readlines()
+    except OSError:
+        return []
+    rules = []
+    for line in lines:
+        translated = translate_gitignore_pattern(line)
+        if translated:
+            rules.append((rel_dir, *translated))
+    return rules
+
+
+def is_ignored(rules, rel_path, is_dir):
+    # The last matching rule wins, so scan from the end and stop at the first match.
+    for base, regex, negate, dir_only in reversed(rules):
+        if dir_only and not is_dir:
+            continue
+        if base:
+            if not rel_path.startswith(base + "/"):
+                continue
+            candidate = rel_path[len(base) + 1:]
+        else:
+            candidate = rel_path
+        if regex.match(candidate):
+            return not negate
+    return False
+
+
+def join_rel(rel_dir, name):
+    return f"{rel_dir}/{name}" if rel_dir else name
+
+
+def parent_rel(rel_dir):
+    return rel_dir.rpartition("/")[0]
+
+
+class _Inotify:
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+    def add(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        return wd
+
+    def remove(self, wd):
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode("utf-8", errors="replace")
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileTreeService:
+    """
+    Keeps the project file tree in memory and hands out the current snapshot in O(1).
+
+    The tree is built once with os.scandir, skipping excluded and .gitignored paths, and
+    kept current by inotify on Linux or by polling directory mtimes elsewhere (or when
+    inotify watches run out). Only changed directories are rescanned, and the dictionaries
+    on the path to them are copied, so snapshots handed out earlier never change.
+    Snapshots must be treated as read-only.
+
+    :param root: Project root directory.
+    :param exclude_dirs: Directory names that are never listed.
+    :param use_gitignore: Skip paths matched by .gitignore files.
+    :param watch: 'inotify', 'poll', or None to only update through notify_changed().
+    :param poll_interval: Seconds between polls.
+
+    Listeners added with add_listener() are called with the set of paths that were written,
+    created or removed, or with None when any file may have changed (a rebuild or a polled
+    rescan). Polling does not see writes to existing files; notify_changed() reports those.
+    """
+
+    def __init__(self, root, exclude_dirs=DEFAULT_EXCLUDE_DIRS, use_gitignore=True, watch="inotify", poll_interval=1.0):
+        self.root = os.path.abspath(root)
+        self.exclude_dirs = set(exclude_dirs)
+        self.use_gitignore = use_gitignore
+        self.watch_mode = watch
+        self.poll_interval = poll_interval
+        self.lock = threading.RLock()
+        self.tree = None
+        self.dirs = {}
+        self.dir_mtimes = {}
+        self.rules = {}
+        self.gitignore_mtimes = {}
+        self.inotify = None
+        self.watches = {}
+        self.watch_dirs = {}
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.version = 0
+        self.recent_changes = OrderedDict()
+        self.listeners = []
+
+    # Scanning
+
+    def gitignore_mtime(self, rel_dir):
+        try:
+            return os.stat(os.path.join(self.root, rel_dir, ".gitignore")).st_mtime_ns
+        except OSError:
+            return None
+
+    def add_watch(self, rel_dir):
+        if not self.inotify:
+            return
+        try:
+            wd = self.inotify.add(os.path.join(self.root, rel_dir))
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                logging.warning("[FileTree] inotify watch limit reached, falling back to polling")
+                self.inotify.close()
+                self.inotify = None
+                self.watches.clear()
+                self.watch_dirs.clear()
+                self.watch_mode = "poll"
+            return
+        self.watches[wd] = rel_dir
+        self.watch_dirs[rel_dir] = wd
+
+    def scan_shallow(self, rel_dir, parent_rules):
+        abs_dir = os.path.join(self.root, rel_dir)
+        rules = parent_rules
+        if self.use_gitignore:
+            own_rules = load_gitignore(self.root, rel_dir)
+            if own_rules:
+                rules = parent_rules + own_rules
+        subdirs, files = [], []
+        with os.scandir(abs_dir) as entries:
+            self.dir_mtimes[rel_dir] = os.stat(abs_dir).st_mtime_ns
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue
+                if is_dir and entry.name in self.exclude_dirs:
+                    continue
+                if rules and is_ignored(rules, join_rel(rel_dir, entry.name), is_dir):
+                    continue
+                if is_dir:
+                    subdirs.append((entry.name, True, entry.is_symlink()))
+                else:
+                    files.append((entry.name, False, False))
+        self.rules[rel_dir] = rules
+        return sorted(subdirs) + sorted(files)
+
+    def scan(self, rel_dir, parent_rules):
+        entries = self.scan_shallow(rel_dir, parent_rules)
+        if self.use_gitignore:
+            self.gitignore_mtimes[rel_dir] = self.gitignore_mtime(rel_dir)
+        self.add_watch(rel_dir)
+
+        rules = self.rules[rel_dir]
+        node = {}
+        for name, is_dir, is_symlink in entries:
+            if not is_dir:
+                node[name] = None
+            elif is_symlink:
+                node[name] = {}
+            else:
+                try:
+                    node[name] = self.scan(join_rel(rel_dir, name), rules)
+                except (FileNotFoundError, NotADirectoryError, PermissionError):
+                    node[name] = {}
+        self.dirs[rel_dir] = node
+        return node
+
+    def forget(self, rel_dir):
+        prefix = rel_dir + "/"
+        for mapping in (self.dirs, self.dir_mtimes, self.rules, self.gitignore_mtimes):
+            for key in [k for k in mapping if k == rel_dir or k.startswith(prefix)]:
+                del mapping[key]
+        for key in [k for k in self.watch_dirs if k == rel_dir or k.startswith(prefix)]:
+            wd = self.watch_dirs.pop(key)
+            self.watches.pop(wd, None)
+            if self.inotify:
+                self.inotify.remove(wd)
+
+    def build(self):
+        with self.lock:
+            if self.inotify:
+                for wd in list(self.watches):
+                    self.inotify.remove(wd)
+            self.dirs, self.dir_mtimes, self.rules, self.gitignore_mtimes = {}, {}, {}, {}
+            self.watches, self.watch_dirs = {}, {}
+            self.tree = self.scan("", [])
+            self.version += 1
+        self.notify_listeners(None)
+        return self.tree
+
+    def replace_node(self, rel_dir, node):
+        """
+        Installs a new node for rel_dir by copying the dictionaries of its ancestors.
+        """
+        self.dirs[rel_dir] = node
+        while rel_dir:
+            name = rel_dir.rpartition("/")[2]
+            rel_dir = parent_rel(rel_dir)
+            parent = dict(self.dirs[rel_dir])
+            parent[name] = node
+            self.dirs[rel_dir] = parent
+            node = parent
+        self.tree = node
+
+    def rescan(self, rel_dir):
+        """
+        Refreshes one directory, reusing unchanged subdirectories.
+        """
+        with self.lock:
+            while rel_dir and rel_dir not in self.dirs:
+                rel_dir = parent_rel(rel_dir)
+            if rel_dir not in self.dirs:
+                return
+
+            if self.use_gitignore and self.gitignore_mtime(rel_dir) != self.gitignore_mtimes.get(rel_dir):
+                self.build()
+                return
+
+            old_node = self.dirs[rel_dir]
+            parent_rules = self.rules.get(parent_rel(rel_dir), []) if rel_dir else []
+            try:
+                fresh = self.scan_shallow(rel_dir, parent_rules)
+            except (FileNotFoundError, NotADirectoryError):
+                self.forget(rel_dir)
+                if rel_dir:
+                    self.rescan(parent_rel(rel_dir))
+                return
+
+            rules = self.rules[rel_dir]
+            node = {}
+            for name, is_dir, is_symlink in fresh:
+                child = join_rel(rel_dir, name)
+                if not is_dir:
+                    node[name] = None
+                elif is_symlink:
+                    node[name] = {}
+                elif isinstance(old_node.get(name), dict) and child in self.dirs:
+                    node[name] = self.dirs[child]
+                else:
+                    try:
+                        node[name] = self.scan(child, rules)
+                    except (FileNotFoundError, NotADirectoryError, PermissionError):
+                        node[name] = {}
+
+            for name, value in old_node.items():
+                if isinstance(value, dict) and node.get(name) is None:
+                    self.forget(join_rel(rel_dir, name))
+
+            self.replace_node(rel_dir, node)
+            self.version += 1
+            self.recent_changes[rel_dir] = time.time()
+            self.recent_changes.move_to_end(rel_dir)
+            while len(self.recent_changes) > 64:
+                self.recent_changes.popitem(last=False)
+
+    # Public API
+
+    def snapshot(self):
+        """
+        Returns the current tree: a nested dictionary where files have value None and
+        directories have nested dictionaries as their values.
+        """
+        tree = self.tree
+        if tree is None:
+            with self.lock:
+                if self.tree is None:
+                    self.start()
+                tree = self.tree
+        return tree
+
+    def notify_changed(self, rel_path):
+        """
+        Updates the tree right away after a tool wrote, created, removed or renamed rel_path.
+        """
+        rel_path = os.path.normpath(rel_path).replace(os.sep, "/").lstrip("/")
+        if self.tree is not None:
+            self.rescan(parent_rel(rel_path) if rel_path != "." else "")
+        self.notify_listeners({rel_path})
+
+    def add_listener(self, callback):
+        """
+        Calls callback(paths) after changes, see the class notes. Callbacks run on the watcher
+        thread or the thread that called notify_changed(), so they should return quickly.
+        """
+        self.listeners.append(callback)
+
+    def notify_listeners(self, paths):
+        for callback in list(self.listeners):
+            try:
+                callback(paths)
+            except Exception as e:
+                logging.error(f"[FileTree] Change listener failed: {type(e).__name__}: {e}")
+
+    def recent_dirs(self, seconds=3600):
+        """
+        Returns directories whose entries changed within the last seconds, newest first.
+        """
+        cutoff = time.time() - seconds
+        with self.lock:
+            return [d for d, t in reversed(self.recent_changes.items()) if t >= cutoff and d]
+
+    def iter_files(self):
+        stack = [("", self.snapshot())]
+        while stack:
+            rel_dir, node = stack.pop()
+            for name, value in node.items():
+                path = join_rel(rel_dir, name)
+                if value is None:
+                    yield path
+                else:
+                    stack.append((path, value))
+
+    # Watching
+
+    def start(self):
+        with self.lock:
+            if self.watch_mode == "inotify" and self.inotify is None:
+                try:
+                    self.inotify = _Inotify()
+                except (OSError, AttributeError):
+                    self.watch_mode = "poll"
+            if self.tree is None:
+                self.build()
+            if self.watch_mode and self.thread is None:
+                self.stop_event.clear()
+                self.thread = threading.Thread(target=self.watch_loop, name="file-tree-watcher", daemon=True)
+                self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        with self.lock:
+            if self.inotify:
+                self.inotify.close()
+                self.inotify = None
+
+    def watch_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                if self.inotify:
+                    self.process_inotify()
+                else:
+                    self.stop_event.wait(self.poll_interval)
+                    self.poll()
+            except Exception as e:
+                logging.error(f"[FileTree] Watcher error: {e}")
+                self.stop_event.wait(self.poll_interval)
+
+    def process_inotify(self):
+        events = self.inotify.read_events(0.2)
+        if not events:
+            return
+        # Let bursts such as checkouts settle before rescanning.
+        time.sleep(0.05)
+        events += self.inotify.read_events(0)
+
+        dirty = set()
+        changed = set()
+        rebuild = False
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                rebuild = True
+                continue
+            rel_dir = self.watches.get(wd)
+            if rel_dir is None:
+                continue
+            if name:
+                path = join_rel(rel_dir, name)
+                if not is_ignored(self.rules.get(rel_dir, []), path, bool(mask & IN_ISDIR)):
+                    changed.add(path)
+            if mask & IN_CLOSE_WRITE and name != ".gitignore":
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                dirty.add(parent_rel(rel_dir) if rel_dir else "")
+            else:
+                dirty.add(rel_dir)
+
+        if rebuild:
+            self.build()
+            return
+        for rel_dir in sorted(dirty, key=lambda d: d.count("/") if d else -1):
+            self.rescan(rel_dir)
+        if changed:
+            self.notify_listeners(changed)
+
+    def poll(self):
+        with self.lock:
+            dir_mtimes = list(self.dir_mtimes.items())
+            gitignores = list(self.gitignore_mtimes.items())
+
+        for rel_dir, mtime in gitignores:
+            if self.gitignore_mtime(rel_dir) != mtime:
+                self.build()
+                return
+
+        dirty = []
+        for rel_dir, mtime in dir_mtimes:
+            try:
+                current = os.stat(os.path.join(self.root, rel_dir)).st_mtime_ns
+            except OSError:
+                current = None
+            if current != mtime:
+                dirty.append(rel_dir)
+        for rel_dir in sorted(dirty, key=lambda d: d.count("/") if d else -1):
+            self.rescan(rel_dir)
+        if dirty:
+            self.notify_listeners(None)
@@ -0,0 +1,81 @@
+import logging
+import re
+
+"""
+Lists the functions and methods of a source file from the tree-sitter parsers, for the
+functions table that Memory.search_functions searches.
+"""
+
+HEADER_EXTENSIONS = (".h", ".hh", ".hpp", ".hxx", ".inl")
+SOURCE_EXTENSIONS = (".c", ".cc", ".cpp", ".cxx")
+WORD_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+# Handler categories stored as functions.
+FUNCTION_CATEGORIES = ("functions", "funcs", "methods")
+MAX_SIGNATURE_CHARS = 200
+
+
+def split_identifier(name: str):
+    """
+    Lowercase words of an identifier, path or module name: 'QSqlDatabase' gives q, sql, database.
+    """
+    words = []
+    for part in re.split(r"[^A-Za-z0-9]+", name):
+        words.extend(word.lower() for word in WORD_PATTERN.findall(part))
+    return words
+
+
+def create_parser(path):
+    if path.endswith(HEADER_EXTENSIONS):
+        from lib.code_manager.parsers.cpp_parser import CppParser
+        return CppParser()
+    if path.endswith(SOURCE_EXTENSIONS):
+        from lib.code_manager.parsers.cpp_source_parser import CppSourceParser
+        return CppSourceParser()
+    if path.endswith(".py"):
+        from lib.code_manager.parsers.python_parser import PythonParser
+        return PythonParser()
+    return None
+
+
+def signature_of(code: str) -> str:
+    """
+    The declaration part of a function's code: up to the body in C++, the def line in Python.
+    """
+    first_line = code.split("\n", 1)[0]
+    if first_line.rstrip().endswith(":"):
+        head = first_line.rstrip()[:-1]
+    else:
+        head = code.split("{", 1)[0].split(";", 1)[0]
+    return " ".join(head.split())[:MAX_SIGNATURE_CHARS]
+
+
+def function_entries(handlers):
+    """
+    Returns [(name, signature, tags)] of the function and method handlers; methods are named
+    Class::method and tagged with the words of their name, so word queries find camelCase names.
+    """
+    functions = {}
+    for category in FUNCTION_CATEGORIES:
+        for handler in (handlers or {}).get(category, []):
+            if not handler.name or handler.name == "Q_PROPERTY":
+                continue
+            class_name = getattr(handler, "class_name", None)
+            name = f"{class_name}::{handler.name}" if class_name else handler.name
+            words = [word for word in split_identifier(name) if len(word) > 1]
+            functions.setdefault(name, (signature_of(handler.get_code()), words))
+    return [(name, signature, words) for name, (signature, words) in functions.items()]
+
+
+def extract_functions(path: str, code: str):
+    """
+    Returns the functions of a file as function_entries does, or None when it cannot be parsed.
+    """
+    try:
+        parser = create_parser(path)
+        if parser is None:
+            return None
+        parser.parse(code)
+        return function_entries(parser.parse_handlers())
+    except Exception as e:
+        logging.warning(f"[Functions] Parsing {path} failed: {type(e).__name__}: {e}")
+        return None
@@ -1,31 +1,49 @@
 from .agents import Agent
-import os, subprocess
+from .client import get_client
+from .git_diff import DiffPipeline
+from .git_repository import GitRepository
+import os
+
+repository = GitRepository()
+diff_pipeline = DiffPipeline(repository=repository)
 
 def get_git_diff():
     """
     Retrieves the Git diff for the current directory.
     Shows the changes that have been made but not yet committed.
+    Lockfiles, generated and binary files are only listed; large file diffs are summarized.
     """
-    subprocess.run(['git', 'add', '.'], check=True)
-    result = subprocess.run(['git', 'diff', '--staged'], capture_output=True, text=True)
-    print(result.stdout)
-    return result.stdout
+    repository.run('add', '.')
+    overview = diff_pipeline.build(get_client())
+    print(overview)
+    return overview
 
 def get_git_status():
     """
     Retrieves the Git status for the current directory.
-    Shows the status.
+    Shows the branch, its upstream and one line per changed, renamed or untracked file.
     """
-    result = subprocess.run(['git', 'status'], capture_output=True, text=True)
-    print(result.stdout)
-    return result.stdout
+    status = repository.status()
+    branch = status["branch"]
+    lines = [f"On branch {branch.get('head', '?')}"]
+    if "upstream" in branch:
+        lines[0] += f" ({branch['upstream']}: ahead {branch.get('ahead', 0)}, behind {branch.get('behind', 0)})"
+    for entry in status["entries"]:
+        if entry["kind"] == "untracked":
+            lines.append(f"?? {entry['path']}")
+        elif entry["kind"] == "renamed":
+            lines.append(f"{entry['index']}{entry['worktree']} {entry['orig_path']} -> {entry['path']}")
+        elif entry["kind"] != "ignored":
+            lines.append(f"{entry['index']}{entry['worktree']} {entry['path']}")
+    print("\n".join(lines))
+    return "\n".join(lines)
 
 def commit_changes(message):
     """
     Stages all changes and commits them with the given message.
     Commits all modifications (including new, modified, or deleted files).
     """
-    subprocess.run(['git', 'commit', '-m', message], check=True)
+    repository.run('commit', '-m', message)
 
 giter = Agent(
     name="Git Agent", 
@@ -40,6 +58,7 @@ giter = Agent(
 
     Rules:  
     - Always analyze the diff before committing.  
+    - Use `get_git_status()` only when you need the branch or the list of untracked files.  
     - Commit only when changes are correct and ready.  
     - Use concise, descriptive commit messages.  
     - Respond briefly — no explanations or Git diff in responses.
@@ -47,5 +66,5 @@ giter = Agent(
     Goal:  
     Automate reviewing and committing changes efficiently.
     """,
-    tools=[get_git_diff, commit_changes]
+    tools=[get_git_diff, get_git_status, commit_changes]
 )
\ No newline at end of file
@@ -0,0 +1,250 @@
+import fnmatch
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from .agents import Agent
+from .git_repository import GitRepository
+from .tracing import span
+
+LOCKFILES = {
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "npm-shrinkwrap.json", "Cargo.lock", "poetry.lock",
+    "Pipfile.lock", "uv.lock", "composer.lock", "Gemfile.lock", "go.sum", "conan.lock", "packages.lock.json",
+}
+GENERATED_PATTERNS = (
+    "*.min.js", "*.min.css", "*.map", "*_pb2.py", "*_pb2_grpc.py", "*.pb.h", "*.pb.cc", "*.pb.go",
+    "moc_*.cpp", "ui_*.h", "qrc_*.cpp", "*.generated.*", "*.g.dart", "dist/*", "build/*", "*/build/*",
+)
+DIFF_HEADER = re.compile(r"^diff --git .*$", re.MULTILINE)
+# Escapes git uses in quoted paths, besides three-digit octal bytes.
+QUOTE_ESCAPES = {"a": 7, "b": 8, "t": 9, "n": 10, "v": 11, "f": 12, "r": 13, '"': 34, "\\": 92}
+# Paths per git command, to stay below command-line limits.
+PATHS_PER_COMMAND = 200
+
+SUMMARY_PROMPT = """
+    You summarize the diff of a single file for a commit message.
+    Reply with one to three short lines: what changed, and why if the diff makes it clear.
+    Do not quote code.
+    """
+
+
+def parse_numstat(output: str):
+    """
+    Parses `git diff --numstat -z` into (added, deleted, path, old_path) tuples.
+    Counts are None for binary files; old_path is set for renames only.
+    """
+    entries = []
+    fields = output.split("\0")
+    i = 0
+    while i < len(fields) - 1:
+        added, deleted, path = fields[i].split("\t", 2)
+        old_path = None
+        i += 1
+        if not path:
+            old_path, path = fields[i], fields[i + 1]
+            i += 2
+        entries.append((None if added == "-" else int(added), None if deleted == "-" else int(deleted), path, old_path))
+    return entries
+
+
+def skip_reason(path, added, deleted):
+    if added is None or deleted is None:
+        return "binary"
+    if os.path.basename(path) in LOCKFILES:
+        return "lockfile"
+    if any(fnmatch.fnmatch(path, pattern) for pattern in GENERATED_PATTERNS):
+        return "generated"
+    return None
+
+
+def unquote_path(text: str) -> str:
+    """
+    Decodes a path git wrapped in double quotes with C-style escapes; other text is returned as is.
+    """
+    if len(text) < 2 or text[0] != '"' or text[-1] != '"':
+        return text
+    body = text[1:-1]
+    decoded = bytearray()
+    i = 0
+    while i < len(body):
+        if body[i] == "\\" and i + 1 < len(body):
+            if body[i + 1] in "01234567":
+                decoded.append(int(body[i + 1:i + 4], 8))
+                i += 4
+            else:
+                decoded.append(QUOTE_ESCAPES.get(body[i + 1], ord(body[i + 1])))
+                i += 2
+        else:
+            decoded += body[i].encode("utf-8")
+            i += 1
+    return decoded.decode("utf-8", errors="replace")
+
+
+def header_path(header: str, paths):
+    """
+    The new path of a `diff --git` header line, matched against the expected paths so that
+    paths containing " b/" are not split in the wrong place. None if nothing matches.
+    """
+    quoted_start = header.rfind(' "b/')
+    if header.endswith('"') and quoted_start != -1:
+        path = unquote_path(header[quoted_start + 1:])[2:]
+        return path if path in paths else None
+    matches = [path for path in paths if header.endswith(" b/" + path)]
+    return max(matches, key=len) if matches else None
+
+
+def split_diff(output: str, paths):
+    """
+    Splits a multi-file diff into {path: diff} for the expected paths; sections of other paths are dropped.
+    """
+    diffs = {}
+    headers = list(DIFF_HEADER.finditer(output))
+    for header, next_header in zip(headers, headers[1:] + [None]):
+        path = header_path(header.group(0), paths)
+        if path is not None:
+            end = next_header.start() if next_header else len(output)
+            diffs[path] = output[header.start():end]
+    return diffs
+
+
+def cap_text(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    head = text[:max_chars]
+    head = head[:head.rfind("\n") + 1] or head
+    return head + f"... [{text.count(chr(10), len(head))} more lines cut]\n"
+
+
+def summarize_diff(client, path, diff, model="gpt-4o-mini") -> str:
+    summarizer = Agent(name="Diff Summarizer", model=model, system_prompt=SUMMARY_PROMPT)
+    return summarizer.request(client, f"File: {path}\n\n{diff}").strip()
+
+
+class DiffPipeline:
+    """
+    Produces the staged diff as a bounded tool result for the commit agent.
+
+    The file list comes from `git diff --staged --numstat`. Lockfiles, generated files and binaries
+    are only listed. Small diffs are included verbatim. Large ones are summarized in parallel (map), and
+    the commit agent writes the message from the combined overview (reduce).
+
+    :param cwd: Repository directory, used when no repository is given.
+    :param repository: GitRepository the git commands and staged blob size lookups go through.
+    :param max_blob_bytes: Staged files larger than this are only listed; their size is checked through
+                           the repository's persistent cat-file process, before any diff is generated.
+    :param max_file_chars: Diffs longer than this are summarized (or cut without a client).
+    :param max_total_chars: Budget for verbatim diffs; the smallest diffs are included first and
+                            the remaining ones are summarized too.
+    :param max_summary_input_chars: Part of a large diff sent to the summarizer.
+    :param workers: Summaries requested in parallel.
+    :param summarize: Callable (client, path, diff) returning a summary.
+    """
+
+    def __init__(self, cwd=None, repository=None, max_file_chars=6000, max_total_chars=24000,
+                 max_summary_input_chars=40000, max_blob_bytes=1024 * 1024, workers=4, summarize=summarize_diff):
+        self.repository = repository or GitRepository(cwd or ".")
+        self.max_blob_bytes = max_blob_bytes
+        self.max_file_chars = max_file_chars
+        self.max_total_chars = max_total_chars
+        self.max_summary_input_chars = max_summary_input_chars
+        self.workers = workers
+        self.summarize = summarize
+
+    def numstat(self):
+        return parse_numstat(self.repository.run("diff", "--staged", "--numstat", "-z", "-M"))
+
+    def staged_size(self, path):
+        info = self.repository.object_info(f":{path}")
+        return info["size"] if info else None
+
+    def diffs(self, entries, paths_per_command=PATHS_PER_COMMAND):
+        """
+        Returns {path: diff} for (path, old_path) entries. Renames need both paths in the pathspec
+        to be detected, so a rename's two paths always go to the same command.
+        """
+        diffs = {}
+        chunk = []
+        for path, old_path in entries:
+            pair = [path, old_path] if old_path else [path]
+            if chunk and len(chunk) + len(pair) > paths_per_command:
+                diffs.update(self.diff_chunk(chunk))
+                chunk = []
+            chunk += pair
+        if chunk:
+            diffs.update(self.diff_chunk(chunk))
+        return diffs
+
+    def diff_chunk(self, paths):
+        output = self.repository.run("-c", "core.quotePath=false", "diff", "--staged", "-M", "--", *paths)
+        return split_diff(output, set(paths))
+
+    def summarize_all(self, client, diffs):
+        """
+        Summarizes {path: diff} in parallel; a failed summary falls back to the cut diff.
+        """
+        def summarize(item):
+            path, diff = item
+            try:
+                return path, "summary: " + self.summarize(client, path, cap_text(diff, self.max_summary_input_chars))
+            except Exception as e:
+                logging.warning(f"[GitDiff] Summarizing {path} failed: {type(e).__name__}: {e}")
+                return path, cap_text(diff, self.max_file_chars)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return dict(pool.map(summarize, diffs.items()))
+
+    def build(self, client=None) -> str:
+        """
+        Returns the overview: totals, skipped files, verbatim small diffs and summaries of large ones.
+        Without a client large diffs are cut instead of summarized.
+        """
+        with span("git.diff_pipeline") as pipeline_span:
+            entries = self.numstat()
+            if not entries:
+                return "No staged changes."
+
+            kept, skipped = [], []
+            for added, deleted, path, old_path in entries:
+                reason = skip_reason(path, added, deleted)
+                if reason is None:
+                    size = self.staged_size(path)
+                    if size is not None and size > self.max_blob_bytes:
+                        reason = f"{size} bytes"
+                if reason:
+                    counts = "" if added is None else f", +{added} -{deleted}"
+                    skipped.append(f"{path} ({reason}{counts})")
+                else:
+                    kept.append((path, old_path))
+
+            diffs = self.diffs(kept)
+            verbatim, large = {}, {}
+            budget = self.max_total_chars
+            for diff in sorted(diffs.items(), key=lambda item: len(item[1])):
+                path, text = diff
+                if len(text) <= self.max_file_chars and len(text) <= budget:
+                    verbatim[path] = text
+                    budget -= len(text)
+                else:
+                    large[path] = text
+            if client is not None and large:
+                condensed = self.summarize_all(client, large)
+            else:
+                condensed = {path: cap_text(text, min(self.max_file_chars, max(budget, 500)))
+                             for path, text in large.items()}
+
+            added = sum(entry[0] for entry in entries if entry[0] is not None)
+            deleted = sum(entry[1] for entry in entries if entry[1] is not None)
+            parts = [f"{len(entries)} files changed, +{added} -{deleted}"]
+            if skipped:
+                parts.append("Not shown: " + "; ".join(skipped))
+            unmatched = [path for path, _ in kept if path not in diffs]
+            if unmatched:
+                parts.append("Diff not available: " + "; ".join(unmatched))
+            for path, _ in kept:
+                if path in verbatim:
+                    parts.append(verbatim[path].rstrip("\n"))
+                elif path in condensed:
+                    parts.append(f"=== {path} ({len(large[path])} characters of diff)\n{condensed[path].rstrip()}")
+            pipeline_span.set(files=len(entries), skipped=len(skipped), summarized=len(large))
+            return "\n\n".join(parts)
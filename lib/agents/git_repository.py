@@ -0,0 +1,200 @@
+import asyncio
+import subprocess
+import threading
+
+from .tracing import span
+
+
+class GitError(RuntimeError):
+    pass
+
+
+class BatchProcess:
+    """
+    A long-lived `git cat-file --batch` or `--batch-check` process. Requests are serialized by a lock;
+    the process is started on first use and restarted if it has exited.
+    """
+
+    def __init__(self, cwd, mode):
+        self.cwd = cwd
+        self.mode = mode
+        self.process = None
+        self.lock = threading.Lock()
+
+    def ensure_started(self):
+        if self.process is not None and self.process.poll() is not None:
+            self.close_locked()
+        if self.process is None:
+            self.process = subprocess.Popen(
+                ["git", "cat-file", self.mode], cwd=self.cwd,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            )
+
+    def request(self, name: str):
+        """
+        Returns the header fields (oid, type, size) and, in --batch mode, the object content;
+        None for missing or ambiguous names.
+        """
+        if "\n" in name:
+            raise ValueError(f"Object name contains a newline: {name!r}")
+        with self.lock:
+            self.ensure_started()
+            try:
+                self.process.stdin.write(name.encode("utf-8") + b"\n")
+                self.process.stdin.flush()
+                header = self.process.stdout.readline()
+                if not header:
+                    raise GitError(f"git cat-file {self.mode} exited")
+                fields = header.decode("utf-8").split()
+                if fields[-1] in ("missing", "ambiguous"):
+                    return None
+                oid, object_type, size = fields[0], fields[1], int(fields[2])
+                content = None
+                if self.mode == "--batch":
+                    content = self.process.stdout.read(size + 1)[:size]
+                return {"oid": oid, "type": object_type, "size": size}, content
+            except (BrokenPipeError, GitError):
+                self.close_locked()
+                raise GitError(f"git cat-file {self.mode} failed for {name!r}")
+            except BaseException:
+                # An interrupted request leaves its reply unread; the next request would read it.
+                self.close_locked()
+                raise
+
+    def close_locked(self):
+        if self.process is not None:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+            self.process.wait()
+            self.process.stdout.close()
+            self.process = None
+
+    def close(self):
+        with self.lock:
+            self.close_locked()
+
+
+def parse_status(output: str):
+    """
+    Parses `git status --porcelain=v2 --branch -z` into {"branch": {...}, "entries": [...]}.
+
+    Entries have "kind" (changed, renamed, unmerged, untracked, ignored), "path", and for tracked kinds
+    "index" and "worktree" status letters; renamed entries also have "orig_path" and "score".
+    """
+    branch = {}
+    entries = []
+    fields = output.split("\0")
+    i = 0
+    while i < len(fields):
+        line = fields[i]
+        i += 1
+        if not line:
+            continue
+        if line.startswith("# "):
+            key, _, value = line[2:].partition(" ")
+            if key == "branch.ab":
+                ahead, behind = value.split()
+                branch["ahead"], branch["behind"] = int(ahead), -int(behind)
+            else:
+                branch[key.removeprefix("branch.")] = value
+        elif line[0] == "1":
+            _, xy, submodule, _, _, _, head_oid, index_oid, path = line.split(" ", 8)
+            entries.append({"kind": "changed", "path": path, "index": xy[0], "worktree": xy[1],
+                            "submodule": submodule != "N...", "head_oid": head_oid, "index_oid": index_oid})
+        elif line[0] == "2":
+            _, xy, submodule, _, _, _, head_oid, index_oid, score, path = line.split(" ", 9)
+            entries.append({"kind": "renamed", "path": path, "orig_path": fields[i], "score": score,
+                            "index": xy[0], "worktree": xy[1], "submodule": submodule != "N...",
+                            "head_oid": head_oid, "index_oid": index_oid})
+            i += 1
+        elif line[0] == "u":
+            parts = line.split(" ", 10)
+            entries.append({"kind": "unmerged", "path": parts[10], "index": parts[1][0], "worktree": parts[1][1],
+                            "submodule": parts[2] != "N..."})
+        elif line[0] == "?":
+            entries.append({"kind": "untracked", "path": line[2:]})
+        elif line[0] == "!":
+            entries.append({"kind": "ignored", "path": line[2:]})
+    return {"branch": branch, "entries": entries}
+
+
+class GitRepository:
+    """
+    Answers repeated git questions without a fork per question: object lookups go to persistent
+    `git cat-file` processes. Methods are thread-safe and each has an `a`-prefixed async variant that
+    runs it on a worker thread.
+    """
+
+    def __init__(self, root="."):
+        self.root = root
+        self.batch = BatchProcess(root, "--batch")
+        self.batch_check = BatchProcess(root, "--batch-check")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.batch.close()
+        self.batch_check.close()
+
+    def run(self, *args) -> str:
+        """
+        Runs a one-off git command and returns its output.
+        """
+        with span("git.run", command=args[0] if args else ""):
+            result = subprocess.run(["git", *args], cwd=self.root, capture_output=True)
+        if result.returncode != 0:
+            raise GitError(result.stderr.decode("utf-8", errors="replace").strip())
+        return result.stdout.decode("utf-8", errors="replace")
+
+    def object_info(self, name: str):
+        """
+        Returns {"oid", "type", "size"} of an object name such as "HEAD", "HEAD:src/a.cpp" or a hash;
+        None if it does not exist.
+        """
+        result = self.batch_check.request(name)
+        return result[0] if result else None
+
+    def read_object(self, name: str):
+        """
+        Returns (info, content bytes) of an object; None if it does not exist.
+        """
+        return self.batch.request(name)
+
+    def read_file(self, path: str, rev: str = "HEAD"):
+        """
+        Returns the text of a file at a revision (":" for the index); None if it does not exist there.
+        """
+        name = f":{path}" if rev == ":" else f"{rev}:{path}"
+        result = self.read_object(name)
+        if result is None or result[0]["type"] != "blob":
+            return None
+        return result[1].decode("utf-8", errors="replace")
+
+    def status(self, untracked=True):
+        """
+        Returns the parsed `git status --porcelain=v2`; see parse_status.
+        """
+        args = ["status", "--porcelain=v2", "--branch", "-z"]
+        args.append("--untracked-files=all" if untracked else "--untracked-files=no")
+        return parse_status(self.run(*args))
+
+    async def arun(self, *args) -> str:
+        return await asyncio.to_thread(self.run, *args)
+
+    async def aobject_info(self, name: str):
+        return await asyncio.to_thread(self.object_info, name)
+
+    async def aread_object(self, name: str):
+        return await asyncio.to_thread(self.read_object, name)
+
+    async def aread_file(self, path: str, rev: str = "HEAD"):
+        return await asyncio.to_thread(self.read_file, path, rev)
+
+    async def astatus(self, untracked=True):
+        return await asyncio.to_thread(self.status, untracked)
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import os
+
+
+def fingerprint(message) -> str:
+    encoded = json.dumps(message, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+class ConversationJournal:
+    """
+    Append-only JSONL journal of an agent's conversation.
+
+    Each turn appends only the messages added since the previous sync. When the history
+    was rewritten instead (clear, soft_reset, a rolled-back attempt), a single 'reset'
+    record with the full history is appended. The file is compacted into one 'reset'
+    record by an atomic rename once enough records pile up. The system message is not
+    journaled; it is rebuilt by the agent on resume.
+
+    Records:
+        {"op": "append", "message": {...}}
+        {"op": "reset", "messages": [...]}
+    """
+
+    def __init__(self, path="data/conversation.jsonl", compact_after=500):
+        self.path = path
+        self.compact_after = compact_after
+        self.synced = None
+        self.last_fingerprint = None
+        self.records = 0
+
+    @staticmethod
+    def history(messages):
+        if messages and messages[0].get("role") == "system":
+            return messages[1:]
+        return messages
+
+    def write_records(self, records, mode="a"):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        lines = "".join(json.dumps(record, default=str) + "\n" for record in records)
+        with open(self.path, mode, encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+
+    def mark_synced(self, history):
+        self.synced = len(history)
+        self.last_fingerprint = fingerprint(history[-1]) if history else None
+
+    def sync(self, messages):
+        """
+        Journals the messages added since the last sync. Returns the number of records written.
+        """
+        history = self.history(messages)
+
+        if self.synced is None:
+            self.compact(messages)
+            return 1
+
+        unchanged_prefix = (
+            len(history) >= self.synced
+            and (self.synced == 0 or fingerprint(history[self.synced - 1]) == self.last_fingerprint)
+        )
+        if unchanged_prefix:
+            records = [{"op": "append", "message": m} for m in history[self.synced:]]
+        else:
+            records = [{"op": "reset", "messages": history}]
+
+        if records:
+            self.write_records(records)
+            self.records += len(records)
+        self.mark_synced(history)
+
+        if self.records >= self.compact_after:
+            self.compact(messages)
+        return len(records)
+
+    def compact(self, messages):
+        """
+        Atomically rewrites the journal as a single record holding the current history.
+        """
+        history = self.history(messages)
+        tmp_path = self.path + ".tmp"
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "reset", "messages": history}, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.records = 1
+        self.mark_synced(history)
+
+    def load(self):
+        """
+        Replays the journal and returns the conversation history without the system message.
+        A torn last line from a crash mid-write is skipped and cut off the file, so later
+        appends start on a fresh line.
+        """
+        history = []
+        records = 0
+        if not os.path.exists(self.path):
+            return history
+
+        valid_end = 0
+        with open(self.path, "rb") as f:
+            for number, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line) if line.strip() else None
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    logging.warning(f"[Journal] Skipping unreadable record at {self.path}:{number}")
+                    continue
+                valid_end = f.tell()
+                if record is None:
+                    continue
+                records += 1
+                if record.get("op") == "append":
+                    history.append(record["message"])
+                elif record.get("op") == "reset":
+                    history = list(record["messages"])
+
+        with open(self.path, "r+b") as f:
+            if valid_end < os.path.getsize(self.path):
+                f.truncate(valid_end)
+            if valid_end:
+                f.seek(valid_end - 1)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+
+        self.records = records
+        self.mark_synced(history)
+        return history
+
+    def restore(self, agent):
+        """
+        Rebuilds the agent's conversation from the journal, keeping its current system prompt.
+        """
+        history = self.load()
+        agent.clear()
+        agent.messages.extend(history)
+        if self.records >= self.compact_after:
+            self.compact(agent.messages)
+        return len(history)
@@ -0,0 +1,177 @@
+import logging
+import os
+import re
+from collections import Counter
+
+from .function_extractor import (HEADER_EXTENSIONS, SOURCE_EXTENSIONS, create_parser, function_entries,
+                                 split_identifier)
+
+"""
+Tags source files without an LLM, from includes, imports, class names, Q_PROPERTYs and
+the identifier vocabulary extracted by the tree-sitter parsers.
+
+Every keyword hit adds evidence to a tag, weighted by where it was found: an include of
+<QSqlDatabase> says more about a file than a local variable called 'query'.
+"""
+
+TAG_KEYWORDS = {
+    "qt": {"qt", "qobject", "qwidget", "qstring", "qapplication", "qml", "qquick", "signal", "slot", "emit"},
+    "database": {"sql", "sqlite", "sqlite3", "database", "db", "postgres", "mysql", "orm", "sqlalchemy", "transaction"},
+    "logging": {"log", "logger", "logging", "qdebug", "spdlog", "glog"},
+    "network": {"network", "socket", "http", "https", "tcp", "udp", "url", "curl", "requests", "websocket", "rest"},
+    "ui": {"widget", "widgets", "window", "dialog", "button", "gui", "layout", "painter", "view", "menu"},
+    "auth": {"auth", "login", "logout", "password", "credential", "credentials", "oauth", "permission"},
+    "json": {"json", "qjsonobject", "qjsondocument", "nlohmann"},
+    "xml": {"xml", "qdom", "tinyxml", "lxml"},
+    "filesystem": {"file", "files", "fstream", "filesystem", "qfile", "qdir", "directory", "pathlib", "shutil"},
+    "threading": {"thread", "threads", "mutex", "atomic", "qthread", "threading", "concurrent", "asyncio", "future"},
+    "test": {"test", "tests", "gtest", "gmock", "qtest", "pytest", "unittest", "mock", "catch"},
+    "config": {"config", "configuration", "settings", "qsettings", "options", "ini", "yaml", "toml"},
+    "parser": {"parser", "parse", "lexer", "tokenizer", "ast", "grammar"},
+    "cache": {"cache", "caching", "lru", "memoize"},
+    "crypto": {"crypto", "cipher", "encrypt", "decrypt", "sha256", "openssl", "hashlib"},
+    "graphics": {"opengl", "vulkan", "shader", "render", "renderer", "texture", "qpainter", "canvas"},
+    "time": {"time", "timer", "qtimer", "chrono", "datetime", "clock", "timestamp"},
+    "serialization": {"serialize", "deserialize", "serializer", "protobuf", "pickle", "qdatastream"},
+    "cli": {"argparse", "argv", "cli", "command", "getopt"},
+}
+KEYWORD_TAGS = {}
+for _tag, _keywords in TAG_KEYWORDS.items():
+    for _keyword in _keywords:
+        KEYWORD_TAGS.setdefault(_keyword, set()).add(_tag)
+
+# Evidence per keyword hit, by where the keyword was found.
+SOURCE_WEIGHTS = {"include": 3.0, "class": 2.0, "property": 1.0, "symbol": 1.0, "word": 0.25}
+# Identifier vocabulary alone adds at most this much to a tag.
+MAX_WORD_EVIDENCE = 2.0
+# A tag needs this much evidence to be kept.
+TAG_THRESHOLD = 2.0
+# Evidence over all kept tags that counts as full confidence.
+CONFIDENT_EVIDENCE = 8.0
+MAX_CLASS_TAGS = 5
+
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+INCLUDE_PATTERN = re.compile(r"""#\s*include\s*[<"]([^>"]+)[>"]""")
+IMPORT_PATTERN = re.compile(r"^\s*(?:from\s+([\w.]+)\s+import\s+([\w., ]+)|import\s+([\w., ]+))", re.MULTILINE)
+QT_MACROS = ("Q_OBJECT", "Q_GADGET", "Q_PROPERTY", "Q_INVOKABLE", "Q_SIGNALS", "Q_SLOTS")
+
+
+def name_terms(name: str):
+    """
+    The identifier itself, lowercased, followed by its words.
+    """
+    terms = [name.lower()] if name.isidentifier() else []
+    return terms + [word for word in split_identifier(name) if word not in terms]
+
+
+def import_names(statement: str):
+    """
+    Included paths and imported module and symbol names of an include or import statement.
+    """
+    names = INCLUDE_PATTERN.findall(statement)
+    for module, symbols, modules in IMPORT_PATTERN.findall(statement):
+        names.extend(n.strip().split(" as ")[0] for n in (module, *symbols.split(","), *modules.split(",")) if n.strip())
+    return names
+
+
+class LocalTagger:
+    """
+    Tags files from parser output and reports how confident it is.
+
+    Handler categories map to evidence sources: imports and includes, classes, properties and
+    the remaining named symbols (functions, methods, fields, variables). All other identifiers
+    in the code form the word vocabulary. Class names are added as tags as well, so prompts
+    mentioning a class find its file by exact tag match.
+
+    :param min_confidence: Files below this confidence should be tagged by the LLM.
+    """
+
+    def __init__(self, min_confidence=0.5):
+        self.min_confidence = min_confidence
+        self.parsers = {}
+
+    def parser(self, path):
+        extension = os.path.splitext(path)[1]
+        if extension not in self.parsers:
+            try:
+                self.parsers[extension] = create_parser(path)
+            except Exception as e:
+                logging.warning(f"[LocalTagger] No parser for {extension} files, using imports and vocabulary only: {e}")
+                self.parsers[extension] = None
+        return self.parsers[extension]
+
+    def parse(self, path, code):
+        """
+        Returns the parser handlers of a file by category, or None without a working parser.
+        """
+        parser = self.parser(path)
+        if parser is None:
+            return None
+        try:
+            parser.parse(code)
+            return parser.parse_handlers()
+        except Exception as e:
+            logging.warning(f"[LocalTagger] Parsing {path} failed: {type(e).__name__}: {e}")
+            return None
+
+    def extract(self, handlers, code):
+        """
+        Returns {source: [names]} for the evidence sources of SOURCE_WEIGHTS, except words.
+        """
+        found = {"include": [], "class": [], "property": [], "symbol": []}
+        if handlers is None:
+            found["include"] = import_names(code)
+            return found
+
+        for category, category_handlers in handlers.items():
+            names = [h.name for h in category_handlers if h.name and h.name != "Q_PROPERTY"]
+            if category in ("imports", "includes"):
+                found["include"].extend(n for statement in names for n in import_names(statement))
+            elif category == "classes":
+                found["class"].extend(names)
+            elif category == "properties":
+                found["property"].extend(names)
+            else:
+                found["symbol"].extend(names)
+        return found
+
+    def tag(self, path: str, code: str):
+        """
+        :return: (tags, confidence); tags are concept tags by evidence, then class names.
+                 Confidence is between 0 and 1.
+        """
+        return self.analyze(path, code)[:2]
+
+    def analyze(self, path: str, code: str):
+        """
+        Tags a file and lists its functions from a single parse.
+
+        :return: (tags, confidence, functions) with functions as returned by function_entries.
+        """
+        handlers = self.parse(path, code)
+        found = self.extract(handlers, code)
+        evidence = Counter()
+        for source, names in found.items():
+            for name in names:
+                for tag in {tag for term in name_terms(name) for tag in KEYWORD_TAGS.get(term, ())}:
+                    evidence[tag] += SOURCE_WEIGHTS[source]
+
+        words = Counter()
+        for identifier in IDENTIFIER_PATTERN.findall(code):
+            for term in name_terms(identifier):
+                for tag in KEYWORD_TAGS.get(term, ()):
+                    words[tag] += SOURCE_WEIGHTS["word"]
+        for tag, weight in words.items():
+            evidence[tag] += min(weight, MAX_WORD_EVIDENCE)
+        if any(macro in code for macro in QT_MACROS):
+            evidence["qt"] += SOURCE_WEIGHTS["include"]
+
+        kept = [(tag, score) for tag, score in evidence.most_common() if score >= TAG_THRESHOLD]
+        confidence = min(1.0, sum(score for _, score in kept) / CONFIDENT_EVIDENCE)
+        tags = [tag for tag, _ in kept]
+        for name in found["class"]:
+            if len(tags) >= len(kept) + MAX_CLASS_TAGS:
+                break
+            if name.lower() not in tags:
+                tags.append(name.lower())
+        return tags, round(confidence, 3), function_entries(handlers) if handlers is not None else None
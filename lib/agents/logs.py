@@ -0,0 +1,212 @@
+import glob
+import gzip
+import hashlib
+import logging
+import os
+import queue
+import shutil
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+def compress_file(source, dest):
+    tmp_path = dest + ".tmp"
+    with open(source, "rb") as f_in, gzip.open(tmp_path, "wb", compresslevel=6) as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.replace(tmp_path, dest)
+    os.remove(source)
+
+
+def process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class Compressor:
+    """
+    Gzips files on a single background thread.
+    """
+
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, source, dest):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name="log-compressor", daemon=True)
+                self.thread.start()
+        self.jobs.put((source, dest))
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                compress_file(*job)
+            except OSError as e:
+                logging.getLogger(__name__).warning(f"[Logs] Failed to compress {job[0]}: {e}")
+            finally:
+                self.jobs.task_done()
+
+    def join(self):
+        self.jobs.join()
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler whose backups are gzipped. On rollover the file is only renamed;
+    compression runs on the compressor thread. The next rollover waits for it, so backups
+    have their final names before they are shifted; that wait happens on the listener
+    thread, never on the thread that logged.
+    """
+
+    def __init__(self, filename, compressor, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.compressor = compressor
+        self.rotations = 0
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self.rotate_in_background
+        self.sweep_pending()
+
+    def sweep_pending(self):
+        """
+        Compresses backups left renamed but uncompressed by a process that exited mid-rotation.
+        Pending files of running processes are left to them.
+        """
+        pattern = os.path.join(os.path.dirname(self.baseFilename), "*.log.*.*.pending")
+        for pending in glob.glob(pattern):
+            try:
+                pid = int(pending.rsplit(".", 3)[1])
+            except ValueError:
+                continue
+            if pid == os.getpid() or process_exists(pid):
+                continue
+            self.compressor.submit(pending, pending[:-len(".pending")] + ".gz")
+
+    def doRollover(self):
+        self.compressor.join()
+        super().doRollover()
+
+    def rotate_in_background(self, source, dest):
+        if not os.path.exists(source):
+            return
+        self.rotations += 1
+        pending = f"{source}.{os.getpid()}.{self.rotations}.pending"
+        os.rename(source, pending)
+        self.compressor.submit(pending, dest)
+
+
+class PayloadFilter(logging.Filter):
+    """
+    Shortens long log messages. The full text is written once to
+    <payload_dir>/<sha256>.txt and the log line keeps the head of the text and the hash,
+    so repeated payloads (file contents, tool results) cost one file.
+    """
+
+    def __init__(self, payload_dir, max_chars=4000, head_chars=500):
+        super().__init__()
+        self.payload_dir = payload_dir
+        self.max_chars = max_chars
+        self.head_chars = head_chars
+
+    def store(self, text):
+        digest = hashlib.sha256(text.encode("utf-8", errors="replace")).hexdigest()
+        path = os.path.join(self.payload_dir, f"{digest}.txt")
+        if not os.path.exists(path):
+            os.makedirs(self.payload_dir, exist_ok=True)
+            with open(path, "w", encoding="utf-8", errors="replace") as f:
+                f.write(text)
+        return path
+
+    def filter(self, record):
+        message = record.getMessage()
+        if len(message) > self.max_chars:
+            try:
+                where = self.store(message)
+            except OSError:
+                where = "not stored"
+            record.msg = f"{message[:self.head_chars]}... [{len(message)} chars, full text: {where}]"
+            record.args = None
+        return True
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread. Only the message is
+    merged with its arguments before queuing, so arguments mutated after logging do not
+    change the record.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class LogSession:
+    """
+    Routes the root logger through a queue to a rotating, compressing file handler
+    running on a listener thread.
+
+    :param log_dir: Directory for log files, payloads and compressed backups.
+    :param prefix: Log file name prefix; the file is <prefix>_<start_time>.log.
+    :param max_payload_chars: Messages longer than this are stored by content hash.
+    """
+
+    def __init__(self, log_dir="log", start_time="", prefix="data", max_bytes=1024 * 1024,
+                 backup_count=3, max_payload_chars=4000, level=logging.INFO):
+        self.log_dir = log_dir
+        self.prefix = prefix
+        os.makedirs(log_dir, exist_ok=True)
+        self.path = os.path.join(log_dir, f"{prefix}_{start_time}.log")
+        self.compressor = Compressor()
+
+        self.file_handler = CompressingRotatingFileHandler(
+            self.path, self.compressor, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+        self.file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        self.file_handler.addFilter(PayloadFilter(os.path.join(log_dir, "payloads"), max_payload_chars))
+
+        self.queue = queue.SimpleQueue()
+        self.queue_handler = DeferredQueueHandler(self.queue)
+        self.listener = QueueListener(self.queue, self.file_handler, respect_handler_level=True)
+
+        root_logger = logging.getLogger()
+        for h in root_logger.handlers[:]:
+            root_logger.removeHandler(h)
+        root_logger.setLevel(level)
+        root_logger.addHandler(self.queue_handler)
+        self.listener.start()
+
+    def compress_old_logs(self):
+        """
+        Queues uncompressed logs left by earlier sessions, and plain rotated backups,
+        for background compression.
+        """
+        pattern = os.path.join(self.log_dir, f"{self.prefix}_*.log*")
+        for filepath in glob.glob(pattern):
+            if filepath == self.path or filepath.endswith((".gz", ".zip", ".tmp", ".pending")):
+                continue
+            if filepath.startswith(self.path + "."):
+                continue
+            self.compressor.submit(filepath, filepath + ".gz")
+
+    def stop(self):
+        """
+        Flushes queued records and waits for pending compression.
+        """
+        self.listener.stop()
+        logging.getLogger().removeHandler(self.queue_handler)
+        self.file_handler.close()
+        self.compressor.join()
@@ -1,30 +1,17 @@
+import os
+
 from .agents import Agent
+from .function_extractor import extract_functions
 from .memory import memory
+from .memory_builder import MemoryBuilder
+from .local_tagger import LocalTagger
 
 from typing import List, Dict
 
-def add_or_update_file(path, tags):
-    """
-    Adds or updates a file entry in the memory database.
-
-    :param path: The file path relative to project root.
-    :param tags: A list of lowercase tags describing the file content.
-
-    :return: None
-    """
-    if isinstance(tags, str):
-        tags = [tag.strip().lower() for tag in tags.split(",") if tag.strip()]
-    elif isinstance(tags, list):
-        tags = [tag.strip().lower() for tag in tags if isinstance(tag, str) and tag.strip()]
-    else:
-        tags = []
-    print("add_or_update_file", path, tags)
-    memory.add_or_update_file(path, tags)
-
-memory_builder_agent = Agent(
-    name="MemoryBuilder",
-    model="gpt-4o-mini",
-    system_prompt="""
+PROJECT_ROOT = os.getenv("PROJECT_PATH", os.getcwd())
+MEMORY_BUILDER_MODEL = "gpt-4o-mini"
+MEMORY_BUILDER_WORKERS = int(os.getenv("DEVAGENT_MEMORY_WORKERS", "4"))
+MEMORY_BUILDER_PROMPT = """
     You are an assistant that analyzes C++ source code file content.
 
     Your task:
@@ -40,6 +27,68 @@ memory_builder_agent = Agent(
 
     Do not include any functions or other details.
     Do not write any code or comments. Focus on concise, accurate metadata extraction.
-    """,
-    tools=[add_or_update_file]
-)
\ No newline at end of file
+    """
+
+def index_functions(path, root=PROJECT_ROOT):
+    """
+    Replaces the stored functions of a file with the ones its parser finds.
+    Files that cannot be read or parsed keep their entries.
+    """
+    try:
+        with open(os.path.join(root, path), "r", encoding="utf-8", errors="replace") as f:
+            code = f.read()
+    except OSError:
+        return
+    functions = extract_functions(path, code)
+    if functions is not None:
+        memory.replace_functions(path, [(name, signature, "", tags) for name, signature, tags in functions])
+
+def store_file(path, tags):
+    """
+    Stores the tags of a file together with the functions found in it.
+    """
+    memory.add_or_update_file(path, tags)
+    index_functions(path)
+
+def create_memory_builder_agent(store=store_file):
+    """
+    Creates a tagging agent whose add_or_update_file tool passes (path, tags) to store.
+    """
+    def add_or_update_file(path, tags):
+        """
+        Adds or updates a file entry in the memory database.
+
+        :param path: The file path relative to project root.
+        :param tags: A list of lowercase tags describing the file content.
+
+        :return: None
+        """
+        if isinstance(tags, str):
+            tags = [tag.strip().lower() for tag in tags.split(",") if tag.strip()]
+        elif isinstance(tags, list):
+            tags = [tag.strip().lower() for tag in tags if isinstance(tag, str) and tag.strip()]
+        else:
+            tags = []
+        print("add_or_update_file", path, tags)
+        store(path, tags)
+
+    return Agent(
+        name="MemoryBuilder",
+        model=MEMORY_BUILDER_MODEL,
+        system_prompt=MEMORY_BUILDER_PROMPT,
+        tools=[add_or_update_file]
+    )
+
+memory_builder_agent = create_memory_builder_agent()
+
+def build_memory(client, root, list_files=None, workers=MEMORY_BUILDER_WORKERS, local=True):
+    """
+    Tags new and changed source files under root and removes entries of deleted files.
+    With local, files are tagged from parser output and only those the local tagger is
+    unsure about go to `workers` concurrent memory builder agents.
+
+    :return: The build counts and throughput, see MemoryBuilder.build.
+    """
+    builder = MemoryBuilder(root, memory, create_memory_builder_agent, MEMORY_BUILDER_MODEL, list_files,
+                            local_tagger=LocalTagger() if local else None, workers=workers)
+    return builder.build(client)
@@ -1,124 +1,558 @@
+import json
+import logging
+import re
 import sqlite3
-from typing import List, Dict
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Iterator, Optional
+
+from .tracing import traced
+
+
+def normalize_tags(tags) -> List[str]:
+    """
+    Lowercases and deduplicates tags given as a list or a comma-separated string.
+    """
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    normalized = []
+    for tag in tags or []:
+        if not isinstance(tag, str):
+            continue
+        tag = tag.strip().lower()
+        if tag and tag not in normalized:
+            normalized.append(tag)
+    return normalized
+
+
+# Functions have an explicit integer key so the FTS index's rowids survive VACUUM.
+FUNCTIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS functions (
+        id INTEGER PRIMARY KEY,
+        file_path TEXT NOT NULL,
+        name TEXT NOT NULL,
+        signature TEXT,
+        description TEXT,
+        tags TEXT,
+        UNIQUE (file_path, name),
+        FOREIGN KEY (file_path) REFERENCES files(path) ON DELETE CASCADE
+    )
+"""
+
+
+def migrate_tag_tables(conn):
+    """
+    Version 1: exact-match tag tables, filled from the comma-separated tag columns.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS file_tags (
+            tag TEXT NOT NULL,
+            path TEXT NOT NULL,
+            PRIMARY KEY (tag, path)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS file_tags_path ON file_tags (path)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS function_tags (
+            tag TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            name TEXT NOT NULL,
+            PRIMARY KEY (tag, file_path, name)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS function_tags_function ON function_tags (file_path, name)")
+
+    for path, tags in conn.execute("SELECT path, tags FROM files").fetchall():
+        conn.executemany("INSERT OR IGNORE INTO file_tags (tag, path) VALUES (?, ?)",
+                         [(tag, path) for tag in normalize_tags(tags)])
+    for file_path, name, tags in conn.execute("SELECT file_path, name, tags FROM functions").fetchall():
+        conn.executemany("INSERT OR IGNORE INTO function_tags (tag, file_path, name) VALUES (?, ?, ?)",
+                         [(tag, file_path, name) for tag in normalize_tags(tags)])
+
+
+def create_search_triggers(conn, condition=""):
+    when = f"WHEN {condition} " if condition else ""
+    conn.execute(f"""
+        CREATE TRIGGER functions_fts_insert AFTER INSERT ON functions {when}BEGIN
+            INSERT INTO functions_fts (rowid, name, signature, description, tags)
+            VALUES (new.id, new.name, new.signature, new.description, new.tags);
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER functions_fts_delete AFTER DELETE ON functions {when}BEGIN
+            INSERT INTO functions_fts (functions_fts, rowid, name, signature, description, tags)
+            VALUES ('delete', old.id, old.name, old.signature, old.description, old.tags);
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER functions_fts_update AFTER UPDATE ON functions {when}BEGIN
+            INSERT INTO functions_fts (functions_fts, rowid, name, signature, description, tags)
+            VALUES ('delete', old.id, old.name, old.signature, old.description, old.tags);
+            INSERT INTO functions_fts (rowid, name, signature, description, tags)
+            VALUES (new.id, new.name, new.signature, new.description, new.tags);
+        END
+    """)
+
+
+def migrate_function_search(conn):
+    """
+    Version 2: FTS5 index over function names, signatures, descriptions and tags,
+    kept in sync with the functions table by triggers. Older functions tables keyed only
+    by (file_path, name) are rebuilt with an id column for the index to point at.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(functions)")]
+    if "id" not in columns:
+        conn.execute("ALTER TABLE functions RENAME TO functions_old")
+        conn.execute(FUNCTIONS_TABLE)
+        conn.execute("""
+            INSERT INTO functions (file_path, name, signature, description, tags)
+            SELECT file_path, name, signature, description, tags FROM functions_old
+        """)
+        conn.execute("DROP TABLE functions_old")
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE functions_fts USING fts5(
+                name, signature, description, tags,
+                content='functions', content_rowid='id',
+                tokenize='porter unicode61'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        logging.warning(f"[Memory] Full-text search unavailable, search_functions falls back to LIKE: {e}")
+        return
+    create_search_triggers(conn)
+    conn.execute("INSERT INTO functions_fts (functions_fts) VALUES ('rebuild')")
+
+
+def migrate_pausable_search(conn):
+    """
+    Version 3: lets bulk loads pause the search triggers and rebuild the index once,
+    which is several times faster than indexing row by row.
+    """
+    conn.execute("CREATE TABLE IF NOT EXISTS memory_state (key TEXT PRIMARY KEY, value) WITHOUT ROWID")
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'functions_fts'").fetchone():
+        return
+    for trigger in ("insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS functions_fts_{trigger}")
+    create_search_triggers(conn, "NOT EXISTS (SELECT 1 FROM memory_state WHERE key = 'search_paused')")
+
+
+def migrate_file_state(conn):
+    """
+    Version 4: content hash and tagging model per file, so unchanged files are not re-tagged.
+    """
+    conn.execute("ALTER TABLE files ADD COLUMN content_hash TEXT")
+    conn.execute("ALTER TABLE files ADD COLUMN model TEXT")
+
+
+# Schema migrations in order; PRAGMA user_version holds how many have been applied.
+MIGRATIONS = [
+    migrate_tag_tables,
+    migrate_function_search,
+    migrate_pausable_search,
+    migrate_file_state,
+]
+# bm25 weights for the functions_fts columns: name, signature, description, tags.
+SEARCH_WEIGHTS = (10.0, 4.0, 1.0, 3.0)
+SEARCH_TERM_PATTERN = re.compile(r"\w+")
+
+
+class MemoryBatch:
+    """
+    Buffers upserts for Memory.bulk() and writes them with executemany.
+    When the same file or function is written twice, the last write wins.
+
+    A flush that writes many functions compared to the table size pauses the search
+    triggers; the search index is then rebuilt once when the bulk transaction ends.
+    """
+
+    def __init__(self, memory, cursor, batch_size=10000, min_paused_rows=1000):
+        self.memory = memory
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.min_paused_rows = min_paused_rows
+        self.files = {}
+        self.functions = {}
+        self.states = {}
+        self.search_paused = False
+
+    def pause_search_if_large(self, rows):
+        if self.search_paused or rows < self.min_paused_rows or not self.memory.has_search_index():
+            return
+        existing = self.cursor.execute("SELECT COUNT(*) FROM functions").fetchone()[0]
+        if rows * 4 >= existing:
+            self.cursor.execute("INSERT OR REPLACE INTO memory_state (key, value) VALUES ('search_paused', 1)")
+            self.search_paused = True
+
+    def finish(self):
+        self.flush()
+        if self.search_paused:
+            self.cursor.execute("DELETE FROM memory_state WHERE key = 'search_paused'")
+            self.cursor.execute("INSERT INTO functions_fts (functions_fts) VALUES ('rebuild')")
+            self.search_paused = False
+
+    def add_file(self, path: str, tags: List[str]):
+        self.files[path] = normalize_tags(tags)
+        if len(self.files) >= self.batch_size:
+            self.flush()
+
+    def add_function(self, file_path: str, name: str, signature: str, description: str, tags: List[str]):
+        self.functions[(file_path, name)] = (signature, description, normalize_tags(tags))
+        if len(self.functions) >= self.batch_size:
+            self.flush()
+
+    def replace_functions(self, file_path: str, functions):
+        """
+        Replaces all functions of a file with [(name, signature, description, tags)].
+        """
+        for key in [key for key in self.functions if key[0] == file_path]:
+            del self.functions[key]
+        self.cursor.execute("DELETE FROM function_tags WHERE file_path = ?", (file_path,))
+        self.cursor.execute("DELETE FROM functions WHERE file_path = ?", (file_path,))
+        for name, signature, description, tags in functions:
+            self.add_function(file_path, name, signature, description, tags)
+
+    def set_file_state(self, path: str, content_hash: str, model: str):
+        self.states[path] = (content_hash, model)
+        if len(self.states) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.files:
+            self.memory.upsert_files(self.cursor, self.files)
+            self.files = {}
+        if self.states:
+            self.cursor.executemany("UPDATE files SET content_hash = ?, model = ? WHERE path = ?",
+                                    [(content_hash, model, path) for path, (content_hash, model) in self.states.items()])
+            self.states = {}
+        if self.functions:
+            self.pause_search_if_large(len(self.functions))
+            self.memory.upsert_functions(self.cursor, self.functions)
+            self.functions = {}
+
 
 class Memory:
-    def __init__(self, db_path: str = "memory.db"):
+    """
+    SQLite store of per-file and per-function tags and descriptions.
+
+    Tags are stored one row per tag in file_tags and function_tags for indexed exact
+    lookups; the comma-separated tags columns keep a copy for display. The database runs
+    in WAL mode with synchronous=NORMAL; use bulk() to write many entries in one transaction.
+
+    Memory can be shared between threads. Each thread reads through its own read-only
+    connection, so readers run concurrently under WAL; all writes go through one writer
+    connection and are serialized by a lock.
+    """
+
+    def __init__(self, db_path: str = "memory.db", timeout: float = 30.0):
         self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
-        self.cursor = self.conn.cursor()
+        self.timeout = timeout
+        self.writer = sqlite3.connect(self.db_path, timeout=timeout, check_same_thread=False)
+        self.writer.execute("PRAGMA journal_mode = WAL")
+        self.writer.execute("PRAGMA synchronous = NORMAL")
+        self.write_lock = threading.RLock()
+        self.local = threading.local()
         self.initialize_schema()
 
+    @property
+    def reader(self) -> sqlite3.Connection:
+        """
+        Read-only connection of the calling thread, opened on first use.
+        """
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout)
+            conn.execute("PRAGMA query_only = ON")
+            self.local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        Holds the write lock for one transaction on the writer connection and yields its cursor.
+        Commits when the block succeeds and rolls back when it raises.
+
+        A transaction opened inside another one on the same thread, e.g. a write inside bulk(),
+        runs in a savepoint of the outer transaction and is committed with it.
+        """
+        with self.write_lock:
+            cursor = self.writer.cursor()
+            if self.writer.in_transaction:
+                self.writer.execute("SAVEPOINT nested")
+                try:
+                    yield cursor
+                except BaseException:
+                    self.writer.execute("ROLLBACK TO nested")
+                    self.writer.execute("RELEASE nested")
+                    raise
+                self.writer.execute("RELEASE nested")
+                return
+            self.writer.execute("BEGIN")
+            try:
+                yield cursor
+            except BaseException:
+                self.writer.rollback()
+                raise
+            self.writer.commit()
+
+    def close(self):
+        """
+        Closes the writer and the calling thread's reader; other readers close with their threads.
+        """
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+        with self.write_lock:
+            self.writer.close()
+
     def initialize_schema(self):
-        self.cursor.execute("""
+        with self.transaction() as cursor:
+            cursor.execute("""
             CREATE TABLE IF NOT EXISTS files (
                 path TEXT PRIMARY KEY,
                 tags TEXT
             )
         """)
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS functions (
-                file_path TEXT,
-                name TEXT,
-                signature TEXT,
-                description TEXT,
-                tags TEXT,
-                PRIMARY KEY (file_path, name),
-                FOREIGN KEY (file_path) REFERENCES files(path) ON DELETE CASCADE
-            )
-        """)
-        self.conn.commit()
+            cursor.execute(FUNCTIONS_TABLE)
+        self.migrate()
 
+    def migrate(self):
+        """
+        Applies pending migrations, each in its own transaction.
+        """
+        with self.write_lock:
+            version = self.writer.execute("PRAGMA user_version").fetchone()[0]
+            for number in range(version, len(MIGRATIONS)):
+                with self.transaction() as cursor:
+                    MIGRATIONS[number](self.writer)
+                    cursor.execute(f"PRAGMA user_version = {number + 1}")
+
+    @traced("memory.has_file_info")
     def has_file_info(self, path: str) -> bool:
         query = "SELECT 1 FROM files WHERE path = ? LIMIT 1"
-        self.cursor.execute(query, (path,))
-        return self.cursor.fetchone() is not None
+        return self.reader.execute(query, (path,)).fetchone() is not None
 
-    def add_or_update_file(self, path: str, tags: List[str]):
-        tags_str = ",".join(tags)
-        self.cursor.execute("""
+    def upsert_files(self, cursor, files: Dict[str, List[str]]):
+        """
+        Writes {path: tags} without committing.
+        """
+        cursor.executemany("""
             INSERT INTO files (path, tags)
             VALUES (?, ?)
             ON CONFLICT(path) DO UPDATE SET tags = excluded.tags
-        """, (path, tags_str))
-        self.conn.commit()
+        """, [(path, ",".join(tags)) for path, tags in files.items()])
+        cursor.executemany("DELETE FROM file_tags WHERE path = ?", [(path,) for path in files])
+        cursor.executemany("INSERT INTO file_tags (tag, path) VALUES (?, ?)",
+                           [(tag, path) for path, tags in files.items() for tag in tags])
 
-    def add_or_update_function(self, file_path: str, name: str, signature: str, description: str, tags: List[str]):
-        tags_str = ",".join(tags)
-        self.cursor.execute("""
+    def upsert_functions(self, cursor, functions: Dict[tuple, tuple]):
+        """
+        Writes {(file_path, name): (signature, description, tags)} without committing.
+        """
+        cursor.executemany("""
             INSERT INTO functions (file_path, name, signature, description, tags)
             VALUES (?, ?, ?, ?, ?)
             ON CONFLICT(file_path, name) DO UPDATE SET
                 signature = excluded.signature,
                 description = excluded.description,
                 tags = excluded.tags
-        """, (file_path, name, signature, description, tags_str))
-        self.conn.commit()
-
-    def query_by_tags(self, tags: List[str]) -> List[Dict]:
-        tag_filter = " OR ".join(["tags LIKE ?"] * len(tags))
-        values = [f"%{tag}%" for tag in tags]
-        self.cursor.execute(f"""
-            SELECT path, tags FROM files
-            WHERE {tag_filter}
-        """, values)
-        files = self.cursor.fetchall()
-
-        results = []
-        for path, file_tags in files:
-            self.cursor.execute("""
-                SELECT name, signature, description, tags
-                FROM functions
-                WHERE file_path = ?
-            """, (path,))
-            functions = self.cursor.fetchall()
-            functions_list = [
-                {
-                    "name": name,
-                    "signature": signature,
-                    "description": description,
-                    "tags": fn_tags
+        """, [(file_path, name, signature, description, ",".join(tags))
+              for (file_path, name), (signature, description, tags) in functions.items()])
+        cursor.executemany("DELETE FROM function_tags WHERE file_path = ? AND name = ?", list(functions))
+        cursor.executemany("INSERT INTO function_tags (tag, file_path, name) VALUES (?, ?, ?)",
+                           [(tag, file_path, name) for (file_path, name), (_, _, tags) in functions.items() for tag in tags])
+
+    @contextmanager
+    def bulk(self, batch_size: int = 10000):
+        """
+        Collects writes and commits them in one transaction:
+
+            with memory.bulk() as batch:
+                batch.add_file(path, tags)
+                batch.add_function(path, name, signature, description, tags)
+
+        Nothing is committed if the block raises. Other threads' writes wait until the block ends.
+        """
+        with self.transaction() as cursor:
+            batch = MemoryBatch(self, cursor, batch_size)
+            yield batch
+            batch.finish()
+
+    @traced("memory.add_or_update_file")
+    def add_or_update_file(self, path: str, tags: List[str]):
+        with self.transaction() as cursor:
+            self.upsert_files(cursor, {path: normalize_tags(tags)})
+
+    @traced("memory.set_file_state")
+    def set_file_state(self, path: str, content_hash: str, model: str):
+        """
+        Records the content hash and model a file was tagged from. Returns False if the file has no entry.
+        """
+        with self.transaction() as cursor:
+            cursor.execute("UPDATE files SET content_hash = ?, model = ? WHERE path = ?", (content_hash, model, path))
+            return cursor.rowcount > 0
+
+    def file_states(self) -> Dict[str, tuple]:
+        """
+        Returns {path: (content_hash, model)} for all files; both are None for files never built.
+        """
+        return {path: (content_hash, model) for path, content_hash, model
+                in self.reader.execute("SELECT path, content_hash, model FROM files")}
+
+    @traced("memory.remove_files")
+    def remove_files(self, paths: List[str]) -> int:
+        """
+        Deletes files with their functions and tags. Returns the number of files removed.
+        """
+        rows = [(path,) for path in paths]
+        with self.transaction() as cursor:
+            cursor.executemany("DELETE FROM function_tags WHERE file_path = ?", rows)
+            cursor.executemany("DELETE FROM functions WHERE file_path = ?", rows)
+            cursor.executemany("DELETE FROM file_tags WHERE path = ?", rows)
+            cursor.executemany("DELETE FROM files WHERE path = ?", rows)
+            return cursor.rowcount
+
+    @traced("memory.add_or_update_function")
+    def add_or_update_function(self, file_path: str, name: str, signature: str, description: str, tags: List[str]):
+        with self.transaction() as cursor:
+            self.upsert_functions(cursor, {(file_path, name): (signature, description, normalize_tags(tags))})
+
+    @traced("memory.replace_functions")
+    def replace_functions(self, file_path: str, functions):
+        """
+        Replaces all functions of a file with [(name, signature, description, tags)].
+        """
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM function_tags WHERE file_path = ?", (file_path,))
+            cursor.execute("DELETE FROM functions WHERE file_path = ?", (file_path,))
+            self.upsert_functions(cursor, {(file_path, name): (signature, description, normalize_tags(tags))
+                                           for name, signature, description, tags in functions})
+
+    def iter_files(self, source: str = "files", params=(), order_by: str = "files.path",
+                   limit: Optional[int] = None, offset: int = 0, extra_columns: str = "") -> Iterator[Dict]:
+        """
+        Streams file entries with their functions using a single query.
+        The functions of each file are collected by a correlated json_group_array subquery,
+        so limit and offset apply to files rather than to joined rows.
+
+        :param source: FROM clause; it must expose the files table as 'files'.
+        :param extra_columns: Extra 'expression AS name' columns added to every entry.
+        """
+        cursor = self.reader.execute(f"""
+            SELECT files.path, files.tags, (
+                SELECT json_group_array(json_object(
+                    'name', fn.name,
+                    'signature', fn.signature,
+                    'description', fn.description,
+                    'tags', fn.tags
+                ))
+                FROM functions AS fn
+                WHERE fn.file_path = files.path
+            ){extra_columns}
+            FROM {source}
+            ORDER BY {order_by}
+            LIMIT ? OFFSET ?
+        """, (*params, -1 if limit is None else limit, offset))
+        names = [column[0] for column in cursor.description[3:]]
+        try:
+            for path, file_tags, functions, *extra in cursor:
+                entry = {
+                    "path": path,
+                    "tags": file_tags,
+                    "functions": json.loads(functions)
                 }
-                for name, signature, description, fn_tags in functions
-            ]
-            results.append({
-                "path": path,
-                "tags": file_tags,
-                "functions": functions_list
-            })
+                entry.update(zip(names, extra))
+                yield entry
+        finally:
+            cursor.close()
+
+    @traced("memory.query_by_tags")
+    def query_by_tags(self, tags: List[str], limit: Optional[int] = None, offset: int = 0) -> Iterator[Dict]:
+        """
+        Streams files whose own tags or function tags exactly match any of the given tags,
+        best matches first. Each entry has 'matched': the number of requested tags it matches.
+        """
+        tags = normalize_tags(tags)
+        if not tags:
+            return
+        placeholders = ",".join("?" * len(tags))
+        source = f"""
+            (
+                SELECT path, COUNT(DISTINCT tag) AS matched FROM (
+                    SELECT path, tag FROM file_tags WHERE tag IN ({placeholders})
+                    UNION ALL
+                    SELECT file_path, tag FROM function_tags WHERE tag IN ({placeholders})
+                )
+                GROUP BY path
+            ) AS matches
+            JOIN files ON files.path = matches.path
+        """
+        yield from self.iter_files(source, (*tags, *tags), "matches.matched DESC, files.path",
+                                   limit, offset, ", matches.matched AS matched")
+
+    def has_search_index(self) -> bool:
+        return self.reader.execute("SELECT 1 FROM sqlite_master WHERE name = 'functions_fts'").fetchone() is not None
 
-        return results
+    @traced("memory.search_functions")
+    def search_functions(self, query: str, k: int = 10) -> List[Dict]:
+        """
+        Full-text search over function names, signatures, descriptions and tags, ranked by bm25.
+        Any query word may match, as a word prefix; more matching words rank higher.
+        """
+        terms = SEARCH_TERM_PATTERN.findall(query.lower())
+        if not terms or k <= 0:
+            return []
+        if not self.has_search_index():
+            return self.search_functions_like(terms, k)
 
+        match = " OR ".join(f'"{term}"*' for term in terms)
+        rows = self.reader.execute(f"""
+            SELECT fn.file_path, fn.name, fn.signature, fn.description, fn.tags,
+                   bm25(functions_fts, {", ".join(map(str, SEARCH_WEIGHTS))}) AS rank
+            FROM functions_fts
+            JOIN functions AS fn ON fn.id = functions_fts.rowid
+            WHERE functions_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        """, (match, k)).fetchall()
+        return [
+            {
+                "file_path": file_path,
+                "name": name,
+                "signature": signature,
+                "description": description,
+                "tags": tags,
+                "score": round(-rank, 3)
+            }
+            for file_path, name, signature, description, tags, rank in rows
+        ]
+
+    def search_functions_like(self, terms, k):
+        columns = ("name", "signature", "description", "tags")
+        conditions = " OR ".join(f"{column} LIKE ?" for column in columns for _ in terms)
+        values = [f"%{term}%" for _ in columns for term in terms]
+        rows = self.reader.execute(f"""
+            SELECT file_path, name, signature, description, tags FROM functions
+            WHERE {conditions}
+            LIMIT ?
+        """, (*values, k)).fetchall()
+        return [
+            {"file_path": file_path, "name": name, "signature": signature, "description": description, "tags": tags}
+            for file_path, name, signature, description, tags in rows
+        ]
+
+    @traced("memory.clear")
     def clear(self):
-        self.cursor.execute("DELETE FROM functions")
-        self.cursor.execute("DELETE FROM files")
-        self.conn.commit()
-
-    def get_all_files(self) -> List[Dict]:
-        self.cursor.execute("SELECT path, tags FROM files")
-        files = self.cursor.fetchall()
-        results = []
-        for path, file_tags in files:
-            self.cursor.execute("""
-                SELECT name, signature, description, tags
-                FROM functions
-                WHERE file_path = ?
-            """, (path,))
-            functions = self.cursor.fetchall()
-            functions_list = [
-                {
-                    "name": name,
-                    "signature": signature,
-                    "description": description,
-                    "tags": fn_tags
-                }
-                for name, signature, description, fn_tags in functions
-            ]
-            results.append({
-                "path": path,
-                "tags": file_tags,
-                "functions": functions_list
-            })
-        return results
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM function_tags")
+            cursor.execute("DELETE FROM file_tags")
+            cursor.execute("DELETE FROM functions")
+            cursor.execute("DELETE FROM files")
+
+    @traced("memory.get_all_files")
+    def get_all_files(self, limit: Optional[int] = None, offset: int = 0) -> Iterator[Dict]:
+        yield from self.iter_files(limit=limit, offset=offset)
 
 
-memory = Memory()
\ No newline at end of file
+memory = Memory()
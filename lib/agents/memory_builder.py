@@ -0,0 +1,289 @@
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+
+from .file_reader import is_binary, BINARY_SNIFF_BYTES
+from .file_tree import FileTreeService
+from .function_extractor import extract_functions
+from .memory import normalize_tags
+from .tracing import span
+
+SOURCE_EXTENSIONS = (".h", ".hh", ".hpp", ".hxx", ".inl", ".c", ".cc", ".cpp", ".cxx")
+# About 6k tokens; the rest of a longer file is cut before tagging.
+MAX_FILE_CHARS = 24000
+# File contents read while planning are kept for the pipeline up to this total; larger files are read again.
+PLAN_CACHE_BYTES = 64 * 1024 * 1024
+# Marks the end of a stage's output in the pipeline queues.
+DONE = object()
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def put(target, item, stop):
+    """
+    Puts an item on a bounded queue, giving up when the pipeline is stopped.
+    """
+    while not stop.is_set():
+        try:
+            target.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+class MemoryBuilder:
+    """
+    Brings the memory database up to date with the project incrementally.
+
+    Every source file is hashed and only files whose content hash or tagging model differs
+    from the one stored in `files` are sent to the tagging agents. Entries of files that
+    no longer exist are removed. A re-index therefore costs LLM calls in proportion to the
+    files changed since the last build, not to the size of the project.
+
+    Tagging runs as a pipeline: a reader thread loads and truncates files, `workers` threads
+    each drive their own agent, and the calling thread writes results in batches with
+    Memory.bulk(). Bounded queues between the stages keep memory flat when tagging is the
+    bottleneck. Hashes are written together with the tags, so an interrupted build resumes
+    where it stopped. The functions and methods the parser finds replace the file's entries
+    in the `functions` table, which Memory.search_functions searches.
+
+    With a local_tagger, the reader tags every file from its parser output first; only files
+    the local tagger is not confident about go to the agents, and their local tags are kept
+    alongside the agent's.
+
+    :param root: Project root directory.
+    :param memory: Memory to update.
+    :param agent_factory: Callable taking store(path, tags) and returning a tagging agent
+                          whose tool passes the file's tags to store.
+    :param model: Model the agents tag with; a file tagged by another model is tagged again.
+    :param list_files: Callable returning relative file paths, defaults to a fresh gitignore-aware scan of root.
+    :param extensions: Suffixes of the files to index.
+    :param local_tagger: Optional LocalTagger used before the agents.
+    :param workers: Number of agents tagging concurrently, i.e. LLM requests in flight.
+    :param write_batch: Maximum number of results written in one transaction.
+    :param write_interval: Seconds after which collected results are written even if the batch is not full.
+    """
+
+    def __init__(self, root, memory, agent_factory, model, list_files=None, extensions=SOURCE_EXTENSIONS,
+                 max_file_chars=MAX_FILE_CHARS, local_tagger=None, workers=4, write_batch=50, write_interval=2.0):
+        self.root = root
+        self.memory = memory
+        self.agent_factory = agent_factory
+        self.model = model
+        self.list_files = list_files or (lambda: FileTreeService(root, watch=None).iter_files())
+        self.extensions = tuple(extensions)
+        self.max_file_chars = max_file_chars
+        self.local_tagger = local_tagger
+        self.workers = max(1, workers)
+        self.write_batch = write_batch
+        self.write_interval = write_interval
+
+    def read(self, path):
+        """
+        Returns the bytes of a source file, or None if it is unreadable or binary.
+        """
+        try:
+            with open(os.path.join(self.root, path), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        return None if is_binary(data[:BINARY_SNIFF_BYTES]) else data
+
+    def relative_path(self, path):
+        """
+        The path relative to root with '/' separators, for paths given as './a.cpp', 'src//a.cpp'
+        or absolute paths.
+        """
+        if os.path.isabs(path):
+            path = os.path.relpath(path, os.path.abspath(self.root))
+        return os.path.normpath(path).replace(os.sep, "/")
+
+    def owns(self, path):
+        """
+        Whether a stored path is one this builder indexes: under root and with one of its extensions.
+        """
+        relative = self.relative_path(path)
+        return relative.endswith(self.extensions) and relative != ".." and not relative.startswith("../")
+
+    def plan(self):
+        """
+        Compares the project with the stored file states.
+
+        :return: (changed, removed, unchanged): (path, digest, data) of the files to tag, paths to forget and
+                 the number of up-to-date files. data is None once PLAN_CACHE_BYTES of contents are kept.
+                 Only stored paths this builder owns are forgotten.
+        """
+        states = self.memory.file_states()
+        changed = []
+        seen = set()
+        cached_bytes = 0
+        for path in sorted(self.list_files()):
+            if not path.endswith(self.extensions):
+                continue
+            data = self.read(path)
+            if data is None:
+                continue
+            seen.add(path)
+            digest = content_hash(data)
+            if states.get(path) != (digest, self.model):
+                keep = cached_bytes + len(data) <= PLAN_CACHE_BYTES
+                cached_bytes += len(data) if keep else 0
+                changed.append((path, digest, data if keep else None))
+        removed = sorted(path for path in states if self.owns(path) and self.relative_path(path) not in seen)
+        return changed, removed, len(seen) - len(changed)
+
+    def prompt(self, path, text):
+        if len(text) > self.max_file_chars:
+            text = text[:self.max_file_chars] + f"\n... [truncated, {len(text) - self.max_file_chars} more characters]"
+        return f"File path: {path}\n\n{text}"
+
+    # Pipeline stages
+
+    def read_files(self, files, jobs, results, stop):
+        try:
+            for path, digest, data in files:
+                if data is None:
+                    data = self.read(path)
+                    if data is None:
+                        continue
+                    digest = content_hash(data)
+                text = data.decode("utf-8", errors="replace")
+                if self.local_tagger:
+                    try:
+                        local_tags, confidence, functions = self.local_tagger.analyze(path, text)
+                    except Exception as e:
+                        logging.warning(f"[MemoryBuilder] Local tagging of {path} failed, sending it to the LLM: "
+                                        f"{type(e).__name__}: {e}")
+                        local_tags, confidence, functions = [], 0.0, None
+                    if confidence >= self.local_tagger.min_confidence:
+                        if not put(results, (path, digest, local_tags, functions, 0, True), stop):
+                            return
+                        continue
+                else:
+                    local_tags, functions = [], extract_functions(path, text)
+                if not put(jobs, (path, digest, local_tags, functions, self.prompt(path, text)), stop):
+                    return
+        finally:
+            for _ in range(self.workers):
+                put(jobs, DONE, stop)
+
+    def tag_files(self, client, jobs, results, stop):
+        stored = {}
+        agent = self.agent_factory(lambda path, tags: stored.__setitem__(self.relative_path(path), normalize_tags(tags)))
+        while not stop.is_set():
+            try:
+                job = jobs.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if job is DONE:
+                break
+            path, digest, local_tags, functions, prompt = job
+            stored.clear()
+            tokens_before = agent.token_usage
+            agent.clear()
+            try:
+                agent.request(client, prompt)
+            except Exception as e:
+                logging.warning(f"[MemoryBuilder] Tagging {path} failed: {type(e).__name__}: {e}")
+            tags = stored.get(path)
+            if tags is None and len(stored) == 1:
+                # One file per request: a single entry is this file's, whatever path the model gave.
+                tags = next(iter(stored.values()))
+            if tags is not None:
+                tags += [tag for tag in local_tags if tag not in tags]
+            if not put(results, (path, digest, tags, functions, agent.token_usage - tokens_before, False), stop):
+                return
+        put(results, DONE, stop)
+
+    def write_results(self, results, stats, total, started_at):
+        pending = []
+        finished_workers = 0
+        last_write = time.monotonic()
+        while finished_workers < self.workers:
+            try:
+                item = results.get(timeout=self.write_interval)
+            except queue.Empty:
+                item = None
+            if item is DONE:
+                finished_workers += 1
+            elif item is not None:
+                pending.append(item)
+
+            due = time.monotonic() - last_write >= self.write_interval
+            if pending and (len(pending) >= self.write_batch or due or finished_workers == self.workers):
+                self.write(pending, stats)
+                pending = []
+                last_write = time.monotonic()
+                self.report(stats, total, started_at)
+
+    def write(self, results, stats):
+        with self.memory.bulk() as batch:
+            for path, digest, tags, functions, tokens, local in results:
+                stats["tokens"] += tokens
+                if tags is None:
+                    stats["failed"] += 1
+                    continue
+                batch.add_file(path, tags)
+                if functions is not None:
+                    batch.replace_functions(path, [(name, signature, "", words) for name, signature, words in functions])
+                batch.set_file_state(path, digest, self.model)
+                stats["tagged"] += 1
+                stats["local"] += local
+
+    def throughput(self, stats, started_at):
+        minutes = max(time.monotonic() - started_at, 1e-6) / 60
+        return (stats["tagged"] + stats["failed"]) / minutes, stats["tokens"] / minutes
+
+    def report(self, stats, total, started_at):
+        files_per_minute, tokens_per_minute = self.throughput(stats, started_at)
+        logging.info(f"[MemoryBuilder] {stats['tagged'] + stats['failed']}/{total} files, "
+                     f"{files_per_minute:.0f} files/min, {tokens_per_minute:.0f} tokens/min")
+
+    def build(self, client) -> dict:
+        """
+        Tags new and changed files and removes entries of deleted files.
+
+        :return: Counts of 'unchanged', 'tagged' (of them 'local', without the LLM), 'failed' and 'removed'
+                 files, the 'tokens' spent, the elapsed 'seconds' and the throughput in 'files_per_minute'
+                 and 'tokens_per_minute'.
+        """
+        started_at = time.monotonic()
+        with span("memory.build") as build_span:
+            changed, removed, unchanged = self.plan()
+            stats = {"unchanged": unchanged, "tagged": 0, "local": 0, "failed": 0, "removed": 0, "tokens": 0}
+            if removed:
+                stats["removed"] = self.memory.remove_files(removed)
+
+            if changed:
+                self.run_pipeline(client, changed, stats, started_at)
+
+            stats["seconds"] = round(time.monotonic() - started_at, 3)
+            files_per_minute, tokens_per_minute = self.throughput(stats, started_at)
+            stats["files_per_minute"] = round(files_per_minute, 1)
+            stats["tokens_per_minute"] = round(tokens_per_minute, 1)
+            build_span.set(**stats)
+        logging.info(f"[MemoryBuilder] {stats}")
+        return stats
+
+    def run_pipeline(self, client, files, stats, started_at):
+        jobs = queue.Queue(maxsize=self.workers * 2)
+        results = queue.Queue(maxsize=self.write_batch * 2)
+        stop = threading.Event()
+        threads = [threading.Thread(target=self.read_files, args=(files, jobs, results, stop),
+                                    name="memory-reader", daemon=True)]
+        threads += [threading.Thread(target=self.tag_files, args=(client, jobs, results, stop),
+                                     name=f"memory-tagger-{i}", daemon=True) for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            self.write_results(results, stats, len(files), started_at)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
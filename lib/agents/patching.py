@@ -0,0 +1,305 @@
+import difflib
+import os
+import re
+
+"""
+Applies model-written edits without rewriting whole files.
+
+Two formats are accepted, and can be mixed in one patch:
+
+1. Unified diffs (as produced by `git diff` / `diff -u`), many files per patch:
+       --- a/src/app.py
+       +++ b/src/app.py
+       @@ -10,3 +10,3 @@
+        context
+       -old line
+       +new line
+   Line numbers are only hints; hunks are located by their context. Hunks without
+   context or removed lines (`git diff -U0`) are inserted at their line number.
+
+2. Search/replace blocks, preceded by the file path:
+       *** src/app.py
+       <<<<<<< SEARCH
+       old lines
+       =======
+       new lines
+       >>>>>>> REPLACE
+   An empty SEARCH section appends to the file, creating it if needed.
+"""
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+FUZZY_RATIO = 0.9
+MAX_FUZZY_WINDOWS = 5000
+
+
+class PatchError(ValueError):
+    pass
+
+
+class Hunk:
+    def __init__(self, path, old, new, hint=None, index=0):
+        self.path = path
+        self.old = old
+        self.new = new
+        self.hint = hint
+        self.index = index
+
+
+def strip_diff_path(path):
+    path = path.split("\t")[0].strip()
+    if path == "/dev/null":
+        return None
+    if path.startswith(("a/", "b/")):
+        path = path[2:]
+    return path
+
+
+def is_file_header(lines, i):
+    return lines[i].startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ ")
+
+
+def parse_unified_diff(lines, start):
+    """
+    Parses one file section starting at a '--- ' line. Returns (hunks, deleted, next_index).
+    """
+    old_path = strip_diff_path(lines[start][4:])
+    if start + 1 >= len(lines) or not lines[start + 1].startswith("+++ "):
+        raise PatchError(f"line {start + 1}: '---' header without '+++' header")
+    new_path = strip_diff_path(lines[start + 1][4:])
+    path = new_path or old_path
+    if path is None:
+        raise PatchError(f"line {start + 1}: both diff paths are /dev/null")
+
+    hunks = []
+    i = start + 2
+    while i < len(lines) and lines[i].startswith("@@"):
+        match = HUNK_HEADER.match(lines[i])
+        old_count = int(match.group(2) or 1) if match else 0
+        # A hunk without old lines (`@@ -10,0 +11,2 @@`) inserts after line 10.
+        hint = (int(match.group(1)) - 1 if old_count else int(match.group(1))) if match else None
+        old, new = [], []
+        i += 1
+        # Header counts written by models are often wrong, so hunks end at the next header.
+        while i < len(lines):
+            line = lines[i]
+            if line.startswith(("@@", "*** ", "diff --git")) or is_file_header(lines, i):
+                break
+            if line.startswith("\\"):
+                pass
+            elif line.startswith("-"):
+                old.append(line[1:])
+            elif line.startswith("+"):
+                new.append(line[1:])
+            elif line.startswith(" ") or line == "":
+                old.append(line[1:])
+                new.append(line[1:])
+            else:
+                break
+            i += 1
+        # Blank lines between sections are not context unless the header counts them.
+        while old and new and old[-1] == "" and new[-1] == "" and len(old) > old_count:
+            old.pop()
+            new.pop()
+        hunks.append(Hunk(path, old, new, hint, len(hunks) + 1))
+
+    if not hunks and new_path is not None:
+        raise PatchError(f"line {start + 1}: no hunks for {path}")
+    return hunks, new_path is None, i
+
+
+def parse_search_replace(lines, start, path, index):
+    i = start + 1
+    search, replace = [], []
+    while i < len(lines) and not lines[i].startswith("======="):
+        search.append(lines[i])
+        i += 1
+    if i >= len(lines):
+        raise PatchError(f"line {start + 1}: SEARCH block for {path} has no '======='")
+    i += 1
+    while i < len(lines) and not lines[i].startswith(">>>>>>> REPLACE"):
+        replace.append(lines[i])
+        i += 1
+    if i >= len(lines):
+        raise PatchError(f"line {start + 1}: SEARCH block for {path} has no '>>>>>>> REPLACE'")
+    return Hunk(path, search, replace, None, index), i + 1
+
+
+def parse_patch(patch: str):
+    """
+    Returns (hunks_by_path, deleted_paths) in the order files appear in the patch.
+    """
+    lines = patch.replace("\r\n", "\n").split("\n")
+    hunks_by_path = {}
+    deleted = set()
+    current_path = None
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if is_file_header(lines, i):
+            hunks, is_deleted, i = parse_unified_diff(lines, i)
+            path = hunks[0].path if hunks else strip_diff_path(line[4:])
+            if is_deleted:
+                deleted.add(path)
+                continue
+            for hunk in hunks:
+                hunk.index = len(hunks_by_path.setdefault(path, [])) + 1
+                hunks_by_path[path].append(hunk)
+            current_path = None
+        elif line.startswith("*** "):
+            current_path = line[4:].strip()
+            i += 1
+        elif line.startswith("<<<<<<< SEARCH"):
+            if not current_path:
+                raise PatchError(f"line {i + 1}: SEARCH block without a preceding '*** path' line")
+            index = len(hunks_by_path.get(current_path, [])) + 1
+            hunk, i = parse_search_replace(lines, i, current_path, index)
+            hunks_by_path.setdefault(current_path, []).append(hunk)
+        else:
+            i += 1
+
+    if not hunks_by_path and not deleted:
+        raise PatchError("no unified diff sections or SEARCH/REPLACE blocks found")
+    return hunks_by_path, deleted
+
+
+def find_block(lines, block, hint, min_start=0):
+    """
+    Locates block in lines at or after min_start. Tries an exact match nearest to the
+    hint, then a whitespace-insensitive match, then a similarity match.
+    Returns (position, how) or (None, nearest_line).
+    """
+    size = len(block)
+    candidates = range(min_start, len(lines) - size + 1)
+    if hint is None:
+        hint = min_start
+
+    def nearest(positions):
+        return min(positions, key=lambda p: abs(p - hint)) if positions else None
+
+    first = block[0]
+    exact = [p for p in candidates if lines[p] == first and lines[p:p + size] == block]
+    if exact:
+        return nearest(exact), "exact"
+
+    stripped_lines = [l.strip() for l in lines]
+    stripped_block = [l.strip() for l in block]
+    first = stripped_block[0]
+    loose = [p for p in candidates if stripped_lines[p] == first and stripped_lines[p:p + size] == stripped_block]
+    if loose:
+        return nearest(loose), "whitespace"
+
+    best_position, best_ratio = None, 0.0
+    joined_block = "\n".join(stripped_block)
+    ordered = sorted(candidates, key=lambda p: abs(p - hint))[:MAX_FUZZY_WINDOWS]
+    for p in ordered:
+        window = "\n".join(stripped_lines[p:p + size])
+        matcher = difflib.SequenceMatcher(None, window, joined_block, autojunk=False)
+        if matcher.real_quick_ratio() < best_ratio or matcher.quick_ratio() < best_ratio:
+            continue
+        ratio = matcher.ratio()
+        if ratio > best_ratio:
+            best_position, best_ratio = p, ratio
+    if best_position is not None and best_ratio >= FUZZY_RATIO:
+        return best_position, f"fuzzy {best_ratio:.2f}"
+    return None, best_position if best_ratio >= 0.5 else None
+
+
+def apply_hunks(lines, hunks):
+    """
+    Applies hunks to a list of lines. Returns (new_lines, applied, errors).
+    """
+    located = []
+    errors = []
+    for hunk in hunks:
+        if not hunk.old:
+            # Without a line hint (an empty SEARCH section or a new file) the lines are appended.
+            if hunk.hint is None or hunk.hint >= len(lines):
+                located.append((len(lines), hunk, "append"))
+            else:
+                located.append((hunk.hint, hunk, "insert"))
+            continue
+        position, how = find_block(lines, hunk.old, hunk.hint)
+        if position is None:
+            near = f", closest match near line {how + 1}" if how is not None else ""
+            errors.append({"file": hunk.path, "hunk": hunk.index,
+                           "error": f"context not found ({len(hunk.old)} lines starting {hunk.old[0].strip()[:60]!r}){near}"})
+            continue
+        located.append((position, hunk, how))
+
+    located.sort(key=lambda item: item[0])
+    accepted = []
+    end_of_previous = 0
+    for position, hunk, how in located:
+        if position < end_of_previous:
+            errors.append({"file": hunk.path, "hunk": hunk.index, "error": "overlaps a previous hunk"})
+            continue
+        accepted.append((position, hunk, how))
+        end_of_previous = position + len(hunk.old)
+
+    new_lines = list(lines)
+    for position, hunk, how in reversed(accepted):
+        new_lines[position:position + len(hunk.old)] = hunk.new
+    applied = [{"hunk": hunk.index, "line": position + 1, "match": how} for position, hunk, how in accepted]
+    return new_lines, applied, errors
+
+
+def apply_patch_text(patch: str, root: str) -> dict:
+    """
+    Parses and validates the whole patch against the files under root, then writes every
+    file that has at least one applicable hunk. Hunks that fail are reported and skipped.
+    """
+    try:
+        hunks_by_path, deleted = parse_patch(patch)
+    except PatchError as e:
+        return {"ok": False, "files": [], "errors": [{"error": f"patch not parsed: {e}"}]}
+
+    root_abs = os.path.abspath(root)
+    writes = {}
+    results = []
+    errors = []
+
+    for path, hunks in hunks_by_path.items():
+        abs_path = os.path.abspath(os.path.join(root_abs, path))
+        if os.path.commonpath([abs_path, root_abs]) != root_abs:
+            errors.append({"file": path, "error": "path is outside the project"})
+            continue
+
+        if os.path.exists(abs_path):
+            with open(abs_path, "r", encoding="utf-8") as f:
+                content = f.read()
+        elif all(not h.old for h in hunks):
+            content = ""
+        else:
+            errors.append({"file": path, "error": "file does not exist"})
+            continue
+
+        trailing_newline = content.endswith("\n") or not content
+        lines = content.split("\n")
+        if content.endswith("\n"):
+            lines.pop()
+        elif not content:
+            lines = []
+
+        new_lines, applied, hunk_errors = apply_hunks(lines, hunks)
+        errors.extend(hunk_errors)
+        if applied:
+            writes[abs_path] = "\n".join(new_lines) + ("\n" if trailing_newline and new_lines else "")
+            results.append({"file": path, "applied": applied})
+
+    for path in deleted:
+        abs_path = os.path.abspath(os.path.join(root_abs, path))
+        if os.path.commonpath([abs_path, root_abs]) != root_abs or not os.path.exists(abs_path):
+            errors.append({"file": path, "error": "cannot delete: file does not exist"})
+            continue
+        writes[abs_path] = None
+        results.append({"file": path, "deleted": True})
+
+    for abs_path, content in writes.items():
+        if content is None:
+            os.remove(abs_path)
+            continue
+        os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+        with open(abs_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    return {"ok": not errors, "files": results, "errors": errors}
@@ -0,0 +1,241 @@
+import logging
+import os
+import re
+import time
+
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(?:[./-][A-Za-z0-9_]+)*")
+SIGNATURE_PATTERN = re.compile(
+    r"^\s*(?:async\s+def|def|class|struct|enum|namespace|template|Q_PROPERTY|[\w:<>,*&\s]+\([^;]*\)\s*(?:const)?\s*[{;]?$)"
+)
+STOP_WORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "into", "file", "files", "add", "make",
+    "change", "update", "fix", "use", "should", "please", "can", "all", "new", "when", "not",
+}
+EXCLUDE_DIRS = {".git", "__pycache__", "node_modules", ".venv", "venv", "build"}
+PATH_KEYS = ("path", "file", "filename")
+# Tools that only read files; reading a prefetched file again is the round trip prefetch should save.
+READ_TOOL_PREFIXES = ("get_", "read_")
+# Files are read up to this size; a larger file cannot fit the token budget and is summarized from its start.
+MAX_READ_BYTES = 256 * 1024
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def walk_files(root):
+    for current, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if d not in EXCLUDE_DIRS]
+        for name in files:
+            yield os.path.relpath(os.path.join(current, name), root).replace(os.sep, "/")
+
+
+def summarize_code(content: str, max_lines=40) -> str:
+    lines = [line.rstrip() for line in content.splitlines() if SIGNATURE_PATTERN.match(line)]
+    if len(lines) > max_lines:
+        lines = lines[:max_lines] + [f"... {len(lines) - max_lines} more declarations"]
+    return "\n".join(lines)
+
+
+def paths_in_arguments(arguments):
+    """
+    Collects file paths from tool arguments: string values (or lists of them) under keys
+    that look like paths, including inside lists of dictionaries.
+    """
+    paths = set()
+    if isinstance(arguments, dict):
+        for key, value in arguments.items():
+            if any(k in key.lower() for k in PATH_KEYS):
+                if isinstance(value, str):
+                    paths.add(value.split(":")[0].split("@")[0])
+                elif isinstance(value, list):
+                    paths.update(v.split(":")[0].split("@")[0] for v in value if isinstance(v, str))
+            if isinstance(value, (dict, list)):
+                paths |= paths_in_arguments(value)
+    elif isinstance(arguments, list):
+        for item in arguments:
+            if isinstance(item, (dict, list)):
+                paths |= paths_in_arguments(item)
+    return {os.path.normpath(p).replace(os.sep, "/") for p in paths}
+
+
+class Prefetcher:
+    """
+    Guesses which files a request needs and attaches them before the first completion,
+    saving the model the round trip of asking for them.
+
+    Files are ranked by identifiers and paths mentioned in the prompt, recent edits and
+    Memory.query_by_tags hits. Contents are attached while they fit the token budget,
+    and declaration summaries are attached for files that do not.
+
+    :param root: Project root directory.
+    :param token_budget: Token budget for all prefetched context.
+    :param memory: Optional Memory used for tag lookups.
+    :param list_files: Callable returning relative file paths, defaults to walking root.
+    :param max_read_bytes: Bytes read from one file.
+    """
+
+    def __init__(self, root, token_budget=6000, max_files=8, min_score=3.0, memory=None,
+                 list_files=None, recent_seconds=3600, max_read_bytes=MAX_READ_BYTES):
+        self.root = root
+        self.token_budget = token_budget
+        self.max_files = max_files
+        self.min_score = min_score
+        self.memory = memory
+        self.list_files = list_files or (lambda: walk_files(self.root))
+        self.recent_seconds = recent_seconds
+        self.max_read_bytes = max_read_bytes
+        self.recently_edited = {}
+        self.recently_used = {}
+        self.prefetched = set()
+        self.used = set()
+        self.reread = set()
+        self.totals = {"requests": 0, "prefetched": 0, "used": 0, "hits": 0, "wasted": 0}
+
+    def prompt_terms(self, prompt):
+        terms = set()
+        for match in IDENTIFIER_PATTERN.findall(prompt):
+            term = match.lower()
+            if len(term) >= 3 and term not in STOP_WORDS:
+                terms.add(term)
+                terms.update(part for part in re.split(r"[./-]", term) if len(part) >= 3)
+        return terms
+
+    def prompt_mentions(self, prompt):
+        """
+        Whole paths and file names written in the prompt: 'src/net/http.cpp' gives the path and
+        its suffixes net/http.cpp and http.cpp, while 'myhttp.cpp' does not mention http.cpp.
+        """
+        mentions = set()
+        for match in IDENTIFIER_PATTERN.findall(prompt.lower()):
+            parts = match.split("/")
+            mentions.update("/".join(parts[i:]) for i in range(len(parts)))
+        return mentions
+
+    def memory_hits(self, terms):
+        if not self.memory or not terms:
+            return {}
+        hits = {}
+        try:
+            for entry in self.memory.query_by_tags(sorted(terms), limit=self.max_files * 4):
+                hits[entry["path"]] = entry.get("matched", 1)
+        except Exception as e:
+            logging.warning(f"[Prefetch] Memory lookup failed: {e}")
+        return hits
+
+    def rank(self, prompt):
+        terms = self.prompt_terms(prompt)
+        mentions = self.prompt_mentions(prompt)
+        memory_hits = self.memory_hits(terms)
+        now = time.time()
+        ranked = []
+
+        for path in self.list_files():
+            lowered = path.lower()
+            name = os.path.basename(lowered)
+            stem = os.path.splitext(name)[0]
+            score = 0.0
+            if lowered in mentions:
+                score += 10
+            elif name in mentions:
+                score += 6
+            elif len(stem) >= 3 and stem in terms:
+                score += 4
+            score += 3 * memory_hits.get(path, 0)
+            edited_at = self.recently_edited.get(path)
+            if edited_at is not None and now - edited_at < self.recent_seconds:
+                score += 2 * (1 - (now - edited_at) / self.recent_seconds)
+            if score >= self.min_score:
+                ranked.append((score, path))
+
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return ranked[:self.max_files]
+
+    def read(self, path):
+        """
+        Returns the text of a file, cut after the last full line within max_read_bytes.
+        """
+        try:
+            with open(os.path.join(self.root, path), "rb") as f:
+                data = f.read(self.max_read_bytes + 1)
+            if len(data) > self.max_read_bytes:
+                data = data[:data.rfind(b"\n", 0, self.max_read_bytes) + 1]
+            return data.decode("utf-8")
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def prefetch(self, prompt):
+        """
+        Returns the context text to attach to the request, or None when nothing is relevant.
+        """
+        self.prefetched = set()
+        self.used = set()
+        self.reread = set()
+        self.totals["requests"] += 1
+
+        sections = []
+        remaining = self.token_budget
+        for score, path in self.rank(prompt):
+            content = self.read(path)
+            if content is None:
+                continue
+            section = f"### {path}\n{content}"
+            if estimate_tokens(section) > remaining:
+                summary = summarize_code(content)
+                section = f"### {path} (declarations only, read the file for full content)\n{summary}"
+                if not summary or estimate_tokens(section) > remaining:
+                    continue
+            sections.append(section)
+            remaining -= estimate_tokens(section)
+            self.prefetched.add(path)
+
+        self.totals["prefetched"] += len(self.prefetched)
+        if not sections:
+            return None
+        logging.info(f"[Prefetch] Attached {sorted(self.prefetched)} ({self.token_budget - remaining} tokens)")
+        return (
+            "Prefetched project files that are likely relevant to the next request. "
+            "Use them instead of reading these files again.\n\n" + "\n\n".join(sections)
+        )
+
+    def observe_tool_call(self, name, arguments):
+        paths = paths_in_arguments(arguments)
+        self.used |= paths
+        if name.startswith(READ_TOOL_PREFIXES):
+            self.reread |= paths & self.prefetched
+        now = time.time()
+        for path in paths:
+            self.recently_used[path] = now
+        if name.startswith(("set_", "apply_", "modify_", "add_", "update_")):
+            for path in paths:
+                self.recently_edited[path] = now
+
+    def recent_paths(self, limit=20):
+        """
+        Returns the paths read or edited through tools within recent_seconds, newest first.
+        """
+        cutoff = time.time() - self.recent_seconds
+        recent = sorted(((t, p) for p, t in self.recently_used.items() if t >= cutoff), reverse=True)
+        return [path for _, path in recent[:limit]]
+
+    def finish_request(self):
+        hits = (self.prefetched & self.used) - self.reread
+        self.totals["used"] += len(self.used)
+        self.totals["hits"] += len(hits)
+        self.totals["wasted"] += len(self.reread)
+        if self.prefetched or self.used:
+            logging.info(f"[Prefetch] Hits {sorted(hits)}, read again {sorted(self.reread)}, "
+                         f"missed {sorted(self.used - self.prefetched)}, unused {sorted(self.prefetched - self.used)}")
+
+    def stats(self) -> dict:
+        """
+        hit_rate: share of prefetched files the model went on to use without reading them again
+        coverage: share of used files that had been prefetched and not read again
+        wasted: prefetched files the model read again anyway
+        """
+        totals = self.totals
+        return {
+            **totals,
+            "hit_rate": totals["hits"] / totals["prefetched"] if totals["prefetched"] else 0.0,
+            "coverage": totals["hits"] / totals["used"] if totals["used"] else 0.0,
+        }
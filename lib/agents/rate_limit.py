@@ -0,0 +1,193 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+
+from .client import ClientWrapper
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError"}
+
+
+def parse_duration(value) -> float | None:
+    """
+    Parses rate-limit reset durations such as '1s', '6m0s', '20ms' or '0.5' into seconds.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    return sum(float(number) * units[unit] for number, unit in parts)
+
+
+def retry_after_seconds(headers) -> float | None:
+    if not headers:
+        return None
+    if headers.get("retry-after-ms") is not None:
+        try:
+            return float(headers["retry-after-ms"]) / 1000.0
+        except ValueError:
+            pass
+    return parse_duration(headers.get("retry-after"))
+
+
+def estimate_request_tokens(kwargs) -> int:
+    size = len(json.dumps(kwargs.get("messages", []), default=str))
+    size += len(json.dumps(kwargs.get("tools", []), default=str))
+    return size // 4 + int(kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or 0)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. A bucket without a rate does not limit anything until
+    ``update_from_headers`` learns the limit from the API.
+    """
+
+    def __init__(self, per_minute=None):
+        self.lock = threading.Condition()
+        self.capacity = None
+        self.rate = None
+        self.tokens = 0.0
+        self.updated_at = time.monotonic()
+        if per_minute:
+            self.set_limit(per_minute)
+
+    def set_limit(self, per_minute):
+        with self.lock:
+            self._refill()
+            first = self.capacity is None
+            self.capacity = float(per_minute)
+            self.rate = self.capacity / 60.0
+            self.tokens = self.capacity if first else min(self.tokens, self.capacity)
+            self.lock.notify_all()
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, amount=1.0):
+        with self.lock:
+            while True:
+                if self.rate is None:
+                    return
+                self._refill()
+                needed = min(amount, self.capacity)
+                if self.tokens >= needed:
+                    self.tokens -= needed
+                    return
+                self.lock.wait((needed - self.tokens) / self.rate)
+
+    def update_from_headers(self, limit, remaining):
+        if limit is not None and (self.capacity is None or float(limit) != self.capacity):
+            self.set_limit(limit)
+        if remaining is not None and self.capacity is not None:
+            with self.lock:
+                self._refill()
+                self.tokens = min(self.tokens, float(remaining))
+
+
+class RateLimitedClient(ClientWrapper):
+    """
+    Shared client layer that coordinates requests from all agents.
+
+    - retries 429 and transient errors with exponential backoff and full jitter,
+      honouring Retry-After headers and pausing every caller while a 429 cools down
+    - paces requests with request and token buckets that adapt to x-ratelimit-* headers
+    - caps the number of requests in flight across threads
+
+    :param client: The wrapped OpenAI client; create it with max_retries=0.
+    :param max_retries: Retries per request before the error is raised.
+    :param requests_per_minute: Initial request budget, None to wait for headers.
+    :param tokens_per_minute: Initial token budget, None to wait for headers.
+    :param max_in_flight: Maximum concurrent requests.
+    """
+
+    def __init__(self, client, max_retries=6, base_delay=0.5, max_delay=30.0,
+                 requests_per_minute=None, tokens_per_minute=None, max_in_flight=4):
+        super().__init__(client)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.requests_bucket = TokenBucket(requests_per_minute)
+        self.tokens_bucket = TokenBucket(tokens_per_minute)
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.pause_lock = threading.Lock()
+        self.paused_until = 0.0
+        self.retries = 0
+        self.rate_limited = 0
+
+    def backoff_delay(self, attempt, headers=None):
+        retry_after = retry_after_seconds(headers)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def pause(self, seconds):
+        with self.pause_lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def wait_for_pause(self):
+        while True:
+            with self.pause_lock:
+                remaining = self.paused_until - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+    def update_limits(self, headers):
+        if not headers:
+            return
+        self.requests_bucket.update_from_headers(
+            headers.get("x-ratelimit-limit-requests"), headers.get("x-ratelimit-remaining-requests"))
+        self.tokens_bucket.update_from_headers(
+            headers.get("x-ratelimit-limit-tokens"), headers.get("x-ratelimit-remaining-tokens"))
+
+    def send(self, kwargs):
+        completions = self.client.chat.completions
+        raw_api = getattr(completions, "with_raw_response", None)
+        if raw_api is None:
+            return completions.create(**kwargs), None
+        raw = raw_api.create(**kwargs)
+        return raw.parse(), raw.headers
+
+    def create(self, **kwargs):
+        estimated_tokens = estimate_request_tokens(kwargs)
+        attempt = 0
+        while True:
+            self.wait_for_pause()
+            self.requests_bucket.acquire(1)
+            self.tokens_bucket.acquire(estimated_tokens)
+            try:
+                with self.in_flight:
+                    completion, headers = self.send(kwargs)
+            except Exception as e:
+                status = getattr(e, "status_code", None)
+                retryable = status in RETRYABLE_STATUS_CODES or type(e).__name__ in RETRYABLE_ERROR_NAMES
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                response = getattr(e, "response", None)
+                headers = getattr(response, "headers", None)
+                self.update_limits(headers)
+                delay = self.backoff_delay(attempt, headers)
+                if status == 429:
+                    self.rate_limited += 1
+                    self.pause(delay)
+                self.retries += 1
+                attempt += 1
+                logging.warning(f"[RateLimit] {type(e).__name__} (status {status}), retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            self.update_limits(headers)
+            return completion
@@ -0,0 +1,468 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+from .file_reader import is_binary, BINARY_SNIFF_BYTES
+from .file_tree import FileTreeService
+from .local_tagger import IDENTIFIER_PATTERN, create_parser, name_terms
+from .tracing import traced
+
+"""
+Offline BM25 retrieval over code chunks.
+
+Files are split into chunks at handler boundaries (functions, methods and classes found by
+the tree-sitter parsers); code between handlers is packed into module-level chunks. Terms are
+identifiers and their camelCase/snake_case words. The term matrix is kept per file, so an
+update only re-chunks changed files, and is compiled into a term-major sparse layout that
+scores a query with a few NumPy operations per query term.
+"""
+
+INDEX_EXTENSIONS = (".h", ".hh", ".hpp", ".hxx", ".inl", ".c", ".cc", ".cpp", ".cxx",
+                    ".py", ".qml", ".js", ".ts", ".java", ".cmake", ".md")
+HANDLER_CATEGORIES = ("functions", "funcs", "methods", "classes")
+STOP_TERMS = {
+    "if", "else", "for", "while", "do", "return", "const", "void", "int", "bool", "auto", "char", "the",
+    "self", "def", "in", "is", "not", "and", "or", "none", "true", "false", "nullptr", "this", "new", "of",
+    "to", "std", "include", "public", "private", "protected", "static", "import", "from", "class", "struct",
+}
+MAX_CHUNK_LINES = 80
+MIN_CHUNK_LINES = 8
+MAX_FILE_BYTES = 1024 * 1024
+INDEX_VERSION = 1
+
+
+def tokenize(text: str):
+    terms = []
+    for identifier in IDENTIFIER_PATTERN.findall(text):
+        for term in name_terms(identifier):
+            if len(term) > 1 and not term.isdigit() and term not in STOP_TERMS:
+                terms.append(term)
+    return terms
+
+
+def top_level(spans):
+    """
+    Spans (start, end, name) that are not nested in an earlier span, by start line.
+    """
+    result = []
+    for span in sorted(spans, key=lambda s: (s[0], -s[1])):
+        if not result or span[0] > result[-1][1]:
+            result.append(span)
+    return result
+
+
+def windows(start, end, name, max_lines):
+    return [(s, min(s + max_lines - 1, end), name) for s in range(start, end + 1, max_lines)]
+
+
+def chunk_spans(spans, first, last, name=None, max_lines=MAX_CHUNK_LINES, min_lines=MIN_CHUNK_LINES):
+    """
+    Splits lines first..last into chunks (start, end, name) along handler spans.
+
+    Handlers of at least min_lines get their own chunk; longer than max_lines, they are split
+    along nested handlers, or into windows when they have none. Smaller handlers and the code
+    between handlers are packed together into chunks of up to max_lines.
+    """
+    chunks = []
+    pending = None
+    line = first
+    segments = []
+    for start, end, span_name in top_level(s for s in spans if first <= s[0] and s[1] <= last):
+        if start > line:
+            segments.append((line, start - 1, None))
+        segments.append((start, end, span_name))
+        line = end + 1
+    if line <= last:
+        segments.append((line, last, None))
+
+    for start, end, segment_name in segments:
+        length = end - start + 1
+        if segment_name and min_lines <= length <= max_lines or length > max_lines:
+            if pending:
+                chunks.append(pending)
+                pending = None
+            if length <= max_lines:
+                chunks.append((start, end, segment_name))
+                continue
+            inner = [s for s in spans if start <= s[0] and s[1] <= end and (s[0], s[1]) != (start, end)]
+            if segment_name and inner:
+                chunks.extend(chunk_spans(inner, start, end, segment_name, max_lines, min_lines))
+            else:
+                chunks.extend(windows(start, end, segment_name or name, max_lines))
+        elif pending and end - pending[0] < max_lines:
+            pending = (pending[0], end, pending[2] or segment_name)
+        else:
+            if pending:
+                chunks.append(pending)
+            pending = (start, end, segment_name or name)
+    if pending:
+        chunks.append(pending)
+    return chunks
+
+
+class IndexedFile:
+    """
+    Chunks and term counts of one file. Chunk i owns terms[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, content_hash, mtime_ns, size, chunks, terms, counts, offsets):
+        self.content_hash = content_hash
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.chunks = chunks
+        self.terms = terms
+        self.counts = counts
+        self.offsets = offsets
+
+
+class RetrievalIndex:
+    """
+    BM25 index over code chunks, persisted as a .npz file.
+
+    refresh() brings the index up to date: files are re-chunked only when their size or mtime
+    changed and their content hash differs. search() compiles the per-file term counts into a
+    term-major sparse matrix (postings per term) once after each change, then scores with NumPy.
+
+    update() is the cheap variant for every query: it runs refresh() once, and afterwards only
+    re-indexes the paths reported to notify_changed(), e.g. by a FileTreeService listener.
+
+    :param root: Project root directory.
+    :param path: .npz file the index is loaded from and saved to; None keeps it in memory.
+    :param list_files: Callable returning relative file paths, defaults to a fresh gitignore-aware scan of root.
+    """
+
+    def __init__(self, root, path=None, list_files=None, extensions=INDEX_EXTENSIONS,
+                 max_chunk_lines=MAX_CHUNK_LINES, min_chunk_lines=MIN_CHUNK_LINES, k1=1.2, b=0.75):
+        self.root = root
+        self.path = path
+        self.list_files = list_files or (lambda: FileTreeService(root, watch=None).iter_files())
+        self.extensions = tuple(extensions)
+        self.max_chunk_lines = max_chunk_lines
+        self.min_chunk_lines = min_chunk_lines
+        self.k1 = k1
+        self.b = b
+        self.files = {}
+        self.vocabulary = {}
+        self.terms = []
+        self.parsers = {}
+        self.compiled = None
+        self.lock = threading.RLock()
+        self.pending_lock = threading.Lock()
+        self.pending = set()
+        self.needs_refresh = True
+        if path and os.path.exists(path):
+            try:
+                self.load()
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"[Retrieval] Ignoring unreadable index {path}: {e}")
+                self.files = {}
+
+    # Chunking
+
+    def parser(self, path):
+        extension = os.path.splitext(path)[1]
+        if extension not in self.parsers:
+            try:
+                self.parsers[extension] = create_parser(path)
+            except Exception as e:
+                logging.warning(f"[Retrieval] No parser for {extension} files, chunking by lines: {e}")
+                self.parsers[extension] = None
+        return self.parsers[extension]
+
+    def handler_spans(self, path, text):
+        parser = self.parser(path)
+        if parser is None:
+            return []
+        try:
+            parser.parse(text)
+            handlers = parser.parse_handlers()
+        except Exception as e:
+            logging.warning(f"[Retrieval] Parsing {path} failed, chunking by lines: {type(e).__name__}: {e}")
+            return []
+        spans = []
+        for category in HANDLER_CATEGORIES:
+            for handler in handlers.get(category, []):
+                if not handler.name or handler.name == "Q_PROPERTY":
+                    continue
+                class_name = getattr(handler, "class_name", None)
+                name = f"{class_name}::{handler.name}" if class_name and category != "classes" else handler.name
+                spans.append((handler.get_start_line(), handler.get_end_line(), name))
+        return spans
+
+    def chunk(self, path, text):
+        lines = text.splitlines()
+        if not lines:
+            return []
+        spans = self.handler_spans(path, text)
+        return chunk_spans(spans, 1, len(lines), None, self.max_chunk_lines, self.min_chunk_lines)
+
+    def term_id(self, term):
+        term_id = self.vocabulary.get(term)
+        if term_id is None:
+            term_id = self.vocabulary[term] = len(self.terms)
+            self.terms.append(term)
+        return term_id
+
+    def index_file(self, path, text, content_hash, stat):
+        lines = text.splitlines()
+        chunks, terms, counts, offsets = [], [], [], [0]
+        for start, end, name in self.chunk(path, text):
+            chunk_terms = tokenize("\n".join(lines[start - 1:end]))
+            if not chunk_terms:
+                continue
+            ids, chunk_counts = np.unique([self.term_id(t) for t in chunk_terms], return_counts=True)
+            chunks.append((start, end, name))
+            terms.append(ids)
+            counts.append(chunk_counts)
+            offsets.append(offsets[-1] + len(ids))
+        return IndexedFile(
+            content_hash, stat.st_mtime_ns, stat.st_size, chunks,
+            np.concatenate(terms).astype(np.int32) if terms else np.zeros(0, np.int32),
+            np.concatenate(counts).astype(np.int32) if counts else np.zeros(0, np.int32),
+            np.array(offsets, dtype=np.int64),
+        )
+
+    # Updates
+
+    def update_file(self, path, stats) -> bool:
+        """
+        Re-indexes one file if it changed. Returns False when it is missing, too large or binary.
+        """
+        abs_path = os.path.join(self.root, path)
+        try:
+            stat = os.stat(abs_path)
+        except OSError:
+            return False
+        if stat.st_size > MAX_FILE_BYTES:
+            return False
+        entry = self.files.get(path)
+        if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            stats["unchanged"] += 1
+            return True
+        try:
+            with open(abs_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return False
+        if is_binary(data[:BINARY_SNIFF_BYTES]):
+            return False
+        content_hash = hashlib.sha256(data).hexdigest()
+        if entry and entry.content_hash == content_hash:
+            entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+            stats["unchanged"] += 1
+            return True
+        self.files[path] = self.index_file(path, data.decode("utf-8", errors="replace"), content_hash, stat)
+        stats["indexed"] += 1
+        return True
+
+    def finish_update(self, stats):
+        if stats["indexed"] or stats["removed"]:
+            self.compiled = None
+            if self.path:
+                self.save()
+        return stats
+
+    @traced("retrieval.refresh")
+    def refresh(self) -> dict:
+        """
+        Re-indexes new and changed files and drops deleted ones; saves the index when anything changed.
+        """
+        with self.lock:
+            with self.pending_lock:
+                self.pending.clear()
+                self.needs_refresh = False
+            stats = {"indexed": 0, "removed": 0, "unchanged": 0}
+            current = set()
+            for path in self.list_files():
+                if path.endswith(self.extensions) and self.update_file(path, stats):
+                    current.add(path)
+
+            for path in [p for p in self.files if p not in current]:
+                del self.files[path]
+                stats["removed"] += 1
+            return self.finish_update(stats)
+
+    def notify_changed(self, paths):
+        """
+        Records paths that were written, created or removed, or None when any file may have changed.
+        The next update() re-indexes them.
+        """
+        with self.pending_lock:
+            if paths is None:
+                self.needs_refresh = True
+            else:
+                self.pending.update(paths)
+
+    @traced("retrieval.update")
+    def update(self) -> dict:
+        """
+        Runs refresh() the first time and after notify_changed(None); otherwise re-indexes only
+        the paths reported since the last update. A path that became a directory triggers a refresh.
+        """
+        with self.lock:
+            with self.pending_lock:
+                needs_refresh, paths = self.needs_refresh, self.pending
+                self.pending = set()
+            if needs_refresh or any(os.path.isdir(os.path.join(self.root, path)) for path in paths):
+                return self.refresh()
+            stats = {"indexed": 0, "removed": 0, "unchanged": 0}
+            for path in paths:
+                if path.endswith(self.extensions) and self.update_file(path, stats):
+                    continue
+                prefix = path + "/"
+                for stale in [p for p in self.files if p == path or p.startswith(prefix)]:
+                    del self.files[stale]
+                    stats["removed"] += 1
+            return self.finish_update(stats)
+
+    # Scoring
+
+    def compile(self):
+        """
+        Builds the term-major matrix: postings of term t are chunks[ptr[t]:ptr[t + 1]] with counts.
+        """
+        paths = sorted(self.files)
+        entries = [self.files[p] for p in paths]
+        chunk_files, chunk_lines, names, row_lengths = [], [], [], []
+        for file_index, entry in enumerate(entries):
+            chunk_files.extend([file_index] * len(entry.chunks))
+            chunk_lines.extend((start, end) for start, end, _ in entry.chunks)
+            names.extend(name for _, _, name in entry.chunks)
+            row_lengths.append(np.diff(entry.offsets))
+
+        chunk_count = len(chunk_lines)
+        terms = np.concatenate([e.terms for e in entries]) if entries else np.zeros(0, np.int32)
+        counts = np.concatenate([e.counts for e in entries]) if entries else np.zeros(0, np.int32)
+        rows = np.repeat(np.arange(chunk_count), np.concatenate(row_lengths).astype(np.int64)) \
+            if chunk_count else np.zeros(0, np.int64)
+
+        order = np.argsort(terms, kind="stable")
+        doc_lengths = np.bincount(rows, weights=counts, minlength=chunk_count)
+        average = doc_lengths.mean() if chunk_count else 1.0
+        document_frequency = np.bincount(terms, minlength=len(self.terms))
+        self.compiled = {
+            "paths": paths,
+            "chunk_files": np.array(chunk_files, dtype=np.int32),
+            "chunk_lines": np.array(chunk_lines, dtype=np.int32).reshape(-1, 2),
+            "names": names,
+            "postings": rows[order].astype(np.int32),
+            "counts": counts[order].astype(np.float32),
+            "ptr": np.concatenate(([0], np.cumsum(document_frequency))).astype(np.int64),
+            "idf": np.log1p((chunk_count - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32),
+            "norm": (self.k1 * (1 - self.b + self.b * doc_lengths / max(average, 1e-9))).astype(np.float32),
+        }
+        return self.compiled
+
+    @traced("retrieval.search")
+    def search(self, query: str, k: int = 10):
+        """
+        Returns the k best chunks for a query as dicts with file_path, start_line, end_line, name and score.
+        """
+        with self.lock:
+            compiled = self.compiled or self.compile()
+            term_ids = {self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary}
+            chunk_count = len(compiled["chunk_lines"])
+            if not term_ids or not chunk_count or k <= 0:
+                return []
+
+            scores = np.zeros(chunk_count, dtype=np.float32)
+            for term_id in term_ids:
+                begin, end = compiled["ptr"][term_id], compiled["ptr"][term_id + 1]
+                chunks = compiled["postings"][begin:end]
+                tf = compiled["counts"][begin:end]
+                scores[chunks] += compiled["idf"][term_id] * tf * (self.k1 + 1) / (tf + compiled["norm"][chunks])
+
+            k = min(k, chunk_count)
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best], kind="stable")]
+            results = []
+            for chunk in best:
+                if scores[chunk] <= 0:
+                    break
+                start, end = compiled["chunk_lines"][chunk]
+                results.append({
+                    "file_path": compiled["paths"][compiled["chunk_files"][chunk]],
+                    "start_line": int(start),
+                    "end_line": int(end),
+                    "name": compiled["names"][chunk],
+                    "score": round(float(scores[chunk]), 3),
+                })
+            return results
+
+    # Persistence
+
+    def compact(self):
+        """
+        Drops terms no indexed file uses any more, e.g. those of deleted or rewritten files,
+        and renumbers the rest.
+        """
+        used = np.unique(np.concatenate([e.terms for e in self.files.values()])) if self.files else np.zeros(0, np.int64)
+        if len(used) == len(self.terms):
+            return
+        new_ids = np.full(len(self.terms), -1, dtype=np.int32)
+        new_ids[used] = np.arange(len(used), dtype=np.int32)
+        for entry in self.files.values():
+            entry.terms = new_ids[entry.terms]
+        self.terms = [self.terms[i] for i in used]
+        self.vocabulary = {term: i for i, term in enumerate(self.terms)}
+        self.compiled = None
+
+    def save(self):
+        with self.lock:
+            self.compact()
+            self.write()
+
+    def write(self):
+        paths = sorted(self.files)
+        entries = [self.files[p] for p in paths]
+        meta = {
+            "version": INDEX_VERSION,
+            "terms": self.terms,
+            "files": [[p, e.content_hash, e.mtime_ns, e.size, len(e.chunks)] for p, e in zip(paths, entries)],
+            "names": [name for e in entries for _, _, name in e.chunks],
+        }
+        empty = np.zeros(0, np.int32)
+        arrays = {
+            "meta": np.array(json.dumps(meta)),
+            "terms": np.concatenate([e.terms for e in entries]) if entries else empty,
+            "counts": np.concatenate([e.counts for e in entries]) if entries else empty,
+            "row_lengths": np.concatenate([np.diff(e.offsets) for e in entries]) if entries else empty,
+            "chunk_lines": np.array([(s, t) for e in entries for s, t, _ in e.chunks], dtype=np.int32).reshape(-1, 2),
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        with np.load(self.path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("version") != INDEX_VERSION:
+                raise ValueError(f"index version {meta.get('version')}")
+            terms, counts = data["terms"], data["counts"]
+            row_lengths, chunk_lines = data["row_lengths"], data["chunk_lines"]
+
+        self.terms = meta["terms"]
+        self.vocabulary = {term: i for i, term in enumerate(self.terms)}
+        names = meta["names"]
+        self.files = {}
+        chunk_start = 0
+        term_start = 0
+        for path, content_hash, mtime_ns, size, chunk_count in meta["files"]:
+            lengths = row_lengths[chunk_start:chunk_start + chunk_count]
+            offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+            term_end = term_start + int(offsets[-1])
+            chunks = [(int(s), int(e), names[chunk_start + i])
+                      for i, (s, e) in enumerate(chunk_lines[chunk_start:chunk_start + chunk_count])]
+            self.files[path] = IndexedFile(content_hash, mtime_ns, size, chunks,
+                                           terms[term_start:term_end], counts[term_start:term_end], offsets)
+            chunk_start += chunk_count
+            term_start = term_end
+        self.compiled = None
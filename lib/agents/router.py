@@ -0,0 +1,133 @@
+import json
+import logging
+import atexit
+import os
+import threading
+import time
+
+from .tokens import token_counter
+
+
+class ModelRouter:
+    """
+    Picks a model for every completion of an agent: the fast model by default and the
+    strong model when the prompt is large, the loop has run long, the step follows a
+    tool that needs careful reasoning, or the fast model has been failing lately.
+
+    :param fast_model: Cheap, low-latency model used for most requests.
+    :param strong_model: Model used for large prompts, long loops and escalations.
+    :param max_fast_prompt_tokens: Estimated prompt size above which the strong model is used.
+    :param max_fast_steps: Tool-loop step from which the strong model takes over.
+    :param strong_tools: Tool names whose results should be handled by the strong model.
+    :param mutating_tools: Tool names with side effects; a request that ran one is not retried on the strong model.
+    :param min_success_rate: Fast-model success rate below which requests go to the strong model.
+    :param stats_path: Optional JSON file to persist success rates between sessions.
+    :param save_interval: Minimum seconds between writes of stats_path; pending outcomes are written at exit.
+    """
+
+    def __init__(self, fast_model, strong_model, max_fast_prompt_tokens=8000, max_fast_steps=3,
+                 strong_tools=(), mutating_tools=(), min_success_rate=0.6, min_samples=5, window=50,
+                 stats_path=None, save_interval=10.0):
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.max_fast_prompt_tokens = max_fast_prompt_tokens
+        self.max_fast_steps = max_fast_steps
+        self.strong_tools = set(strong_tools)
+        self.mutating_tools = set(mutating_tools)
+        self.min_success_rate = min_success_rate
+        self.min_samples = min_samples
+        self.window = window
+        self.stats_path = stats_path
+        self.save_interval = save_interval
+        self.lock = threading.Lock()
+        self.outcomes = {}
+        self.dirty = False
+        self.saved_at = time.monotonic()
+        self.load()
+        if stats_path:
+            atexit.register(self.flush)
+
+    def load(self):
+        if self.stats_path and os.path.exists(self.stats_path):
+            with open(self.stats_path, "r", encoding="utf-8") as f:
+                self.outcomes = json.load(f)
+
+    def save_locked(self):
+        """
+        Atomically writes the outcomes to stats_path; the caller holds the lock.
+        """
+        if not self.stats_path:
+            return
+        tmp_path = self.stats_path + ".tmp"
+        os.makedirs(os.path.dirname(self.stats_path) or ".", exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.outcomes, f)
+        os.replace(tmp_path, self.stats_path)
+        self.dirty = False
+        self.saved_at = time.monotonic()
+
+    def flush(self):
+        """
+        Writes outcomes recorded since the last save.
+        """
+        with self.lock:
+            if self.dirty:
+                self.save_locked()
+
+    def success_rate(self, model):
+        with self.lock:
+            outcomes = self.outcomes.get(model, [])
+            if len(outcomes) < self.min_samples:
+                return None
+            return sum(outcomes) / len(outcomes)
+
+    def record(self, model, success):
+        with self.lock:
+            outcomes = self.outcomes.setdefault(model, [])
+            outcomes.append(1 if success else 0)
+            del outcomes[:-self.window]
+            self.dirty = True
+            if time.monotonic() - self.saved_at >= self.save_interval:
+                self.save_locked()
+
+    def last_tool_names(self, messages):
+        for message in reversed(messages):
+            if message.get("role") == "user":
+                return set()
+            if message.get("role") == "assistant" and message.get("tool_calls"):
+                return {call["function"]["name"] for call in message["tool_calls"]}
+        return set()
+
+    def can_escalate(self, tool_names) -> bool:
+        """
+        Whether a request that called tool_names may be rolled back and run again on the strong model.
+        """
+        return not (set(tool_names) & self.mutating_tools)
+
+    def choose(self, messages, step=0) -> tuple:
+        """
+        Returns (model, reason) for the next completion.
+        """
+        prompt_tokens = token_counter.count_messages(messages, self.fast_model)
+        if prompt_tokens > self.max_fast_prompt_tokens:
+            return self.strong_model, f"prompt ~{prompt_tokens} tokens"
+        if step >= self.max_fast_steps:
+            return self.strong_model, f"step {step}"
+        strong_tools = self.last_tool_names(messages) & self.strong_tools
+        if strong_tools:
+            return self.strong_model, f"after {', '.join(sorted(strong_tools))}"
+        rate = self.success_rate(self.fast_model)
+        if rate is not None and rate < self.min_success_rate:
+            return self.strong_model, f"fast success rate {rate:.0%}"
+        return self.fast_model, "default"
+
+
+def default_validator(agent, response) -> bool:
+    """
+    A request passes validation when it completed within its budgets, produced an answer
+    and none of its tool calls failed.
+    """
+    if agent.last_stop_reason != "completed" or agent.request_tool_errors:
+        logging.info(f"[{agent.name}] Validation failed: stop={agent.last_stop_reason}, tool errors={agent.request_tool_errors}")
+        return False
+    return bool(response and response.strip())
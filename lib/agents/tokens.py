@@ -0,0 +1,158 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+import tiktoken
+
+DEFAULT_CONTEXT_LIMIT = 128_000
+CONTEXT_LIMITS = {
+    "gpt-5": 400_000,
+    "gpt-4.1": 1_047_576,
+    "gpt-4o": 128_000,
+    "gpt-4-turbo": 128_000,
+    "gpt-4": 8_192,
+    "gpt-3.5-turbo": 16_385,
+    "o1": 200_000,
+    "o3": 200_000,
+    "o4-mini": 200_000,
+}
+# Chat formatting overhead per message and for priming the reply, as in OpenAI's token counting guide.
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+class ContextLimitError(ValueError):
+    def __init__(self, model, tokens, limit):
+        super().__init__(f"Request of {tokens} tokens exceeds the {limit}-token context of {model}")
+        self.model = model
+        self.tokens = tokens
+        self.limit = limit
+
+
+def context_limit(model) -> int:
+    """
+    Context window of a model, matched by the longest known name prefix.
+    """
+    best = None
+    for name in CONTEXT_LIMITS:
+        if model == name or model.startswith(name + "-"):
+            if best is None or len(name) > len(best):
+                best = name
+    return CONTEXT_LIMITS[best] if best else DEFAULT_CONTEXT_LIMIT
+
+
+def load_encoding(model):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+class TokenCounter:
+    """
+    Counts tokens with one cached encoder per model and a cache of per-message counts,
+    so counting a conversation after a new turn only encodes the new messages.
+
+    When an encoding cannot be loaded (tiktoken downloads them on first use), counts fall
+    back to an estimate of 4 characters per token.
+
+    :param load_encoding: Callable returning a tiktoken encoding for a model name.
+    :param max_cached_messages: Number of per-message counts kept in the LRU cache.
+    """
+
+    def __init__(self, load_encoding=load_encoding, max_cached_messages=4096):
+        self.load_encoding = load_encoding
+        self.max_cached_messages = max_cached_messages
+        self.encoders = {}
+        self.message_counts = OrderedDict()
+        self.tool_counts = {}
+        self.lock = threading.Lock()
+
+    def encoder(self, model):
+        """
+        Returns the encoding for a model, or None when only estimates are available.
+        """
+        try:
+            return self.encoders[model]
+        except KeyError:
+            pass
+        try:
+            encoding = self.load_encoding(model)
+        except Exception as e:
+            logging.warning(f"[Tokens] No tokenizer for {model}, estimating token counts: {e}")
+            encoding = None
+        self.encoders[model] = encoding
+        return encoding
+
+    def count_text(self, text: str, model: str) -> int:
+        encoding = self.encoder(model)
+        if encoding is None:
+            return (len(text) + 3) // 4
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def count_message(self, message: dict, model: str) -> int:
+        content = message.get("content")
+        if content is not None and not isinstance(content, str):
+            content = json.dumps(content, default=str)
+        tool_calls = message.get("tool_calls")
+        if tool_calls:
+            tool_calls = json.dumps(tool_calls, default=str)
+        key = (model, message.get("role"), content, tool_calls, message.get("tool_call_id"))
+
+        with self.lock:
+            count = self.message_counts.get(key)
+            if count is not None:
+                self.message_counts.move_to_end(key)
+                return count
+
+        count = TOKENS_PER_MESSAGE + self.count_text(message.get("role") or "", model)
+        if content:
+            count += self.count_text(content, model)
+        if tool_calls:
+            count += self.count_text(tool_calls, model)
+
+        with self.lock:
+            self.message_counts[key] = count
+            while len(self.message_counts) > self.max_cached_messages:
+                self.message_counts.popitem(last=False)
+        return count
+
+    def count_tools(self, tools, model: str) -> int:
+        if not tools:
+            return 0
+        key = (model, id(tools))
+        cached = self.tool_counts.get(key)
+        if cached is not None and cached[0] is tools:
+            return cached[1]
+        count = self.count_text(json.dumps(tools), model)
+        self.tool_counts[key] = (tools, count)
+        return count
+
+    def count_messages(self, messages, model: str, tools=None) -> int:
+        """
+        Prompt size of a chat request: all messages, tool schemas and reply priming.
+        """
+        total = TOKENS_PER_REPLY + self.count_tools(tools, model)
+        for message in messages:
+            total += self.count_message(message, model)
+        return total
+
+    def usage(self, messages, model: str, tools=None):
+        """
+        Returns (prompt tokens, context limit) for a conversation.
+        """
+        return self.count_messages(messages, model, tools), context_limit(model)
+
+    def check_request(self, messages, model: str, tools=None, reserve=0) -> int:
+        """
+        Raises ContextLimitError when the prompt plus `reserve` tokens for the reply does not
+        fit the model's context. Returns the prompt size.
+        """
+        tokens, limit = self.usage(messages, model, tools)
+        if tokens + reserve > limit:
+            raise ContextLimitError(model, tokens + reserve, limit)
+        return tokens
+
+
+token_counter = TokenCounter()
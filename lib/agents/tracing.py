@@ -0,0 +1,199 @@
+import atexit
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Span:
+    __slots__ = ("id", "parent_id", "name", "start", "duration", "attrs", "error")
+
+    def __init__(self, name, parent_id=None, attrs=None):
+        self.id = next(_span_ids)
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time()
+        self.duration = None
+        self.attrs = attrs or {}
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        record = {
+            "id": self.id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "thread": threading.current_thread().name,
+        }
+        if self.attrs:
+            record["attrs"] = self.attrs
+        if self.error:
+            record["error"] = self.error
+        return record
+
+
+class Tracer:
+    """
+    Collects timing spans in memory and optionally appends them to a JSONL file.
+
+    Spans nest per thread/task: a span opened inside another records it as its parent.
+    """
+
+    def __init__(self, max_spans=20000):
+        self.spans = deque(maxlen=max_spans)
+        self.lock = threading.Lock()
+        self.file = None
+        self.path = None
+        self.enabled = True
+
+    def export_to(self, path):
+        with self.lock:
+            if self.file:
+                self.file.close()
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.path = path
+            self.file = open(path, "a", encoding="utf-8")
+
+    def flush(self):
+        with self.lock:
+            if self.file:
+                self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+    def record(self, span):
+        with self.lock:
+            self.spans.append(span)
+            if self.file:
+                self.file.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+    @contextmanager
+    def span(self, name, **attrs):
+        if not self.enabled:
+            yield Span(name, attrs=attrs)
+            return
+
+        parent = _current_span.get()
+        span = Span(name, parent.id if parent else None, attrs)
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            _current_span.reset(token)
+            self.record(span)
+
+    def traced_generator(self, name, func):
+        """
+        Wraps a generator function. Its span covers only the time spent producing items,
+        not the time the caller spends between them, and is recorded when the generator
+        finishes or is closed.
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                yield from func(*args, **kwargs)
+                return
+            parent = _current_span.get()
+            span = Span(name, parent.id if parent else None)
+            generator = func(*args, **kwargs)
+            elapsed = 0.0
+            items = 0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        break
+                    finally:
+                        elapsed += time.perf_counter() - start
+                    items += 1
+                    yield item
+            except BaseException as e:
+                if not isinstance(e, GeneratorExit):
+                    span.error = type(e).__name__
+                raise
+            finally:
+                generator.close()
+                span.duration = elapsed
+                span.set(items=items)
+                self.record(span)
+        return wrapper
+
+    def traced(self, name):
+        def decorator(func):
+            if inspect.isgeneratorfunction(func):
+                return self.traced_generator(name, func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def stats(self) -> dict:
+        """
+        Returns latency statistics in milliseconds per span name.
+        """
+        with self.lock:
+            spans = list(self.spans)
+
+        durations = {}
+        for span in spans:
+            durations.setdefault(span.name, []).append(span.duration * 1000)
+
+        return {
+            name: {
+                "count": len(values),
+                "p50": percentile(values, 0.5),
+                "p95": percentile(values, 0.95),
+                "total": sum(values),
+            }
+            for name, values in sorted(durations.items())
+        }
+
+    def format_stats(self) -> str:
+        stats = self.stats()
+        if not stats:
+            return "No spans recorded yet."
+        lines = [f"{'span':<36}{'count':>7}{'p50 ms':>11}{'p95 ms':>11}{'total ms':>12}"]
+        for name, s in stats.items():
+            lines.append(f"{name:<36}{s['count']:>7}{s['p50']:>11.2f}{s['p95']:>11.2f}{s['total']:>12.1f}")
+        return "\n".join(lines)
+
+
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
+
+atexit.register(tracer.close)
@@ -0,0 +1,215 @@
+import heapq
+import os
+from collections import Counter
+
+from .prefetch import estimate_tokens
+
+INDENT = "  "
+REMAINDER_TOKENS = 16
+
+
+def extension(name):
+    ext = os.path.splitext(name)[1]
+    return f"*{ext}" if ext else name
+
+
+def plural(count, word):
+    return f"{count} {word}" if count == 1 else f"{count} {word}s"
+
+
+class TreeRenderer:
+    """
+    Renders a get_file_tree() dictionary as indented text within a token budget.
+
+    Directories are expanded breadth-first while the listing fits the budget; the rest are
+    collapsed into summaries such as 'tests/ (312 files, *.cpp, *.h)'. Directories on the
+    path to focus paths (recently touched files) are expanded first, and if one of them is
+    too large it is listed partially with a '... N more' line. Chains of single
+    subdirectories are joined, e.g. 'src/main/java/'.
+
+    Per-directory statistics are cached by node identity, so re-rendering a snapshot from
+    FileTreeService only recomputes directories that changed.
+    """
+
+    def __init__(self, max_extensions=3, count_tokens=estimate_tokens, max_cached=200_000):
+        self.max_extensions = max_extensions
+        self.count_tokens = count_tokens
+        self.max_cached = max_cached
+        self.stats_cache = {}
+
+    def stats(self, node):
+        """
+        Returns (file count, extension counter) for a directory, recursively.
+        """
+        cached = self.stats_cache.get(id(node))
+        if cached is not None and cached[0] is node:
+            return cached[1], cached[2]
+        files = 0
+        extensions = Counter()
+        for name, value in node.items():
+            if value is None:
+                files += 1
+                extensions[extension(name)] += 1
+            else:
+                child_files, child_extensions = self.stats(value)
+                files += child_files
+                extensions.update(child_extensions)
+        if len(self.stats_cache) >= self.max_cached:
+            self.stats_cache.clear()
+        self.stats_cache[id(node)] = (node, files, extensions)
+        return files, extensions
+
+    def describe(self, files, extensions):
+        if not files:
+            return "(empty)"
+        common = [ext for ext, _ in extensions.most_common(self.max_extensions + 1)]
+        parts = [plural(files, "file")] + common[:self.max_extensions]
+        if len(common) > self.max_extensions:
+            parts.append("...")
+        return f"({', '.join(parts)})"
+
+    def summary(self, node):
+        return self.describe(*self.stats(node))
+
+    def line_cost(self, depth, name, value):
+        text = INDENT * depth + name
+        if value is not None:
+            text += "/ " + self.summary(value)
+        return self.count_tokens(text + "\n")
+
+    @staticmethod
+    def focus_sets(tree, focus):
+        focus_dirs, focus_entries = {()}, set()
+        for path in focus:
+            parts = tuple(p for p in path.replace(os.sep, "/").split("/") if p and p != ".")
+            node = tree
+            for i, part in enumerate(parts):
+                if not isinstance(node, dict) or part not in node:
+                    break
+                focus_entries.add(parts[:i + 1])
+                node = node[part]
+                if isinstance(node, dict):
+                    focus_dirs.add(parts[:i + 1])
+        return focus_dirs, focus_entries
+
+    def plan(self, tree, token_budget, focus):
+        """
+        Decides which directories to expand. Returns {dir path tuple: [shown child names]}.
+        """
+        focus_dirs, focus_entries = self.focus_sets(tree, focus)
+        shown = {}
+        partial = []
+        used = 0
+
+        def fill_partial():
+            nonlocal used
+            for path, node, costs in partial:
+                names = shown[path]
+                listed = set(names)
+                for name in sorted((n for n in node if n not in listed), key=lambda n: (node[n] is None, n)):
+                    if used + costs[name] > token_budget:
+                        break
+                    names.append(name)
+                    used += costs[name]
+            partial.clear()
+
+        queue = [(0, 0, (), tree)]
+        while queue:
+            priority, depth, path, node = heapq.heappop(queue)
+            if priority and partial:
+                fill_partial()
+            collapsed = self.line_cost(depth - 1, path[-1], node) if path else 0
+            opened = self.count_tokens(INDENT * (depth - 1) + path[-1] + "/\n") if path else 0
+            costs = {name: self.line_cost(depth, name, value) for name, value in node.items()}
+            full = opened + sum(costs.values())
+
+            if used - collapsed + full <= token_budget:
+                names = list(node)
+            elif path in focus_dirs:
+                # List only the focused entries for now; what is left once every focus
+                # directory has its entries goes to the rest of these directories.
+                remaining = token_budget - used + collapsed - opened - REMAINDER_TOKENS
+                names = []
+                for name in sorted(n for n in node if path + (n,) in focus_entries):
+                    if costs[name] > remaining:
+                        break
+                    names.append(name)
+                    remaining -= costs[name]
+                if not names and path:
+                    continue
+                full = opened + sum(costs[n] for n in names) + REMAINDER_TOKENS
+                partial.append((path, node, costs))
+            else:
+                continue
+
+            used += full - collapsed
+            shown[path] = names
+            for name in names:
+                value = node[name]
+                if isinstance(value, dict) and value:
+                    child = path + (name,)
+                    priority = 0 if child in focus_dirs else 1
+                    heapq.heappush(queue, (priority, depth + 1, child, value))
+        fill_partial()
+        return shown
+
+    def render_dir(self, path, node, depth, shown, lines):
+        names = shown[path]
+        for name in names:
+            value = node[name]
+            pad = INDENT * depth
+            if value is None:
+                lines.append(pad + name)
+                continue
+            label = name + "/"
+            child = path + (name,)
+            while len(value) == 1:
+                (sub, sub_value), = value.items()
+                if sub_value is None:
+                    break
+                label += sub + "/"
+                child += (sub,)
+                value = sub_value
+            if child in shown:
+                lines.append(pad + label)
+                self.render_dir(child, value, depth + 1, shown, lines)
+            else:
+                lines.append(f"{pad}{label} {self.summary(value)}")
+
+        listed = set(names)
+        hidden = [name for name in node if name not in listed]
+        if hidden:
+            files, extensions = 0, Counter()
+            for name in hidden:
+                value = node[name]
+                if value is None:
+                    files += 1
+                    extensions[extension(name)] += 1
+                else:
+                    child_files, child_extensions = self.stats(value)
+                    files += child_files
+                    extensions.update(child_extensions)
+            if all(node[name] is None for name in hidden):
+                common = ", ".join(ext for ext, _ in extensions.most_common(self.max_extensions))
+                lines.append(f"{INDENT * depth}... {files} more files ({common})")
+            else:
+                lines.append(f"{INDENT * depth}... {len(hidden)} more entries {self.describe(files, extensions)}")
+
+    def render(self, tree, token_budget=3000, focus=()):
+        """
+        :param tree: Nested dictionary from get_file_tree().
+        :param token_budget: Approximate number of tokens the listing may use.
+        :param focus: Relative paths of recently touched files or directories to expand first.
+        :return: The indented listing, one entry per line.
+        """
+        shown = self.plan(tree, token_budget, focus)
+        lines = []
+        self.render_dir((), tree, 0, shown, lines)
+        return "\n".join(lines)
+
+
+renderer = TreeRenderer()
+
+
+def render_tree(tree, token_budget=3000, focus=()):
+    return renderer.render(tree, token_budget, focus)
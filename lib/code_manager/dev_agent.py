@@ -1,5 +1,6 @@
 from lib.agents.agents import Agent
-from openai import OpenAI
+from lib.agents.client import get_client
+from lib.agents.tracing import traced
 
 from .editors.python_editor import PythonFileEditor
 from .editors.cpp_editor import CppFileEditor
@@ -9,7 +10,7 @@ from .parsers.python_parser import *
 import os
 import json
 
-client = OpenAI()
+client = get_client()
 directory = os.getenv("PROJECT_PATH", "")
 
 editor_registry = {
@@ -37,6 +38,7 @@ def get_summary():
     
     return cleaned_json
 
+@traced("fs.get_file_tree")
 def get_file_tree():
     """
     Recursively gets the file tree of a given directory.
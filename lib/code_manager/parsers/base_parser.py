@@ -1,5 +1,20 @@
 from tree_sitter import Parser, Query
-import json, re
+import functools
+import json, os, re
+
+from lib.agents.tracing import traced
+
+# Debugging aid: when set, the syntax tree of every parsed file is written to this path,
+# e.g. DEVAGENT_PARSE_TREE_DUMP=data/full_tree_output.scm.
+TREE_DUMP_PATH = os.getenv("DEVAGENT_PARSE_TREE_DUMP")
+
+@functools.lru_cache(maxsize=256)
+def compile_query(language, query_str):
+    """
+    Compiling a query costs far more than running it, so each one is compiled once per language.
+    """
+    return Query(language, query_str)
+
 
 def register_handler(name, class_level=False):
     def decorator(func):
@@ -38,6 +53,7 @@ class BaseParser:
     def __init__(self, language):
         self.parser = Parser(language)
 
+    @traced("parser.parse")
     def parse(self, source_code: str):
         if isinstance(source_code, bytes):
             self.code = source_code
@@ -46,8 +62,9 @@ class BaseParser:
         self.tree = self.parser.parse(self.code)
         self.root_node = self.tree.root_node
 
-        with open("data/full_tree_output.scm", "w", encoding="utf-8") as f:
-            f.write(self.build_tree_string())
+        if TREE_DUMP_PATH:
+            with open(TREE_DUMP_PATH, "w", encoding="utf-8") as f:
+                f.write(self.build_tree_string())
 
 
     def build_tree_string(self, node=None, indent=0, max_text_length=80):
@@ -80,6 +97,7 @@ class BaseParser:
 
         return _build(node)
     
+    @traced("parser.parse_handlers")
     def parse_handlers(self) -> dict:
         result = {}
         for attr_name in dir(self):
@@ -124,7 +142,7 @@ class BaseParser:
         return self.code[node.start_byte:node.end_byte].decode("utf-8")
 
     def _run_query(self, query_str, node=None):
-        query = Query(self.parser.language, query_str)
+        query = compile_query(self.parser.language, query_str)
         if node:
             return query.matches(node)
         return query.matches(self.root_node)
@@ -1,14 +1,11 @@
-import os
+import sys
 import json
-import logging
-from logging.handlers import RotatingFileHandler
 from datetime import datetime
 from prompt_toolkit import PromptSession
 from prompt_toolkit.patch_stdout import patch_stdout
 from prompt_toolkit.formatted_text import HTML
 from prompt_toolkit.shortcuts import print_formatted_text
 from xml.sax.saxutils import escape
-import tiktoken
 
 # 🔹 Wybierz developera: "code_manager" lub "agents"
 ACTIVE_DEVELOPER = "agents"
@@ -24,7 +21,7 @@ if ACTIVE_DEVELOPER == "code_manager":
         add_new_code,
     )
 elif ACTIVE_DEVELOPER == "agents":
-    from lib.agents.dev_agent import developer, client, get_file_tree
+    from lib.agents.dev_agent import developer, client, render_file_tree, ROOT_DIRECTORY, file_tree
     # Dla kompatybilności definiujemy funkcje, które nie istnieją w tym agencie
     def get_summary():
         return None
@@ -37,82 +34,69 @@ else:
     raise ValueError(f"Unknown ACTIVE_DEVELOPER: {ACTIVE_DEVELOPER}")
 
 from lib.agents.git_agent import giter
+from lib.agents.mem_agent import build_memory
+from lib.agents.tracing import tracer
+from lib.agents.journal import ConversationJournal
+from lib.agents.logs import LogSession
+from lib.agents.tokens import token_counter
 
 
 def init_global_log():
-    os.makedirs("log", exist_ok=True)
     start_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    log_filename = f"log/data_{start_time}.log"
+    log_session = LogSession("log", start_time, max_bytes=1 * 1024 * 1024, backup_count=3)
+    log_session.compress_old_logs()
 
-    handler = RotatingFileHandler(log_filename, maxBytes=1 * 1024 * 1024, backupCount=3)
-    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-    handler.setFormatter(formatter)
+    tracer.export_to(f"log/spans_{start_time}.jsonl")
 
-    root_logger = logging.getLogger()
+    return log_session
 
-    for h in root_logger.handlers[:]:
-        root_logger.removeHandler(h)
 
-    root_logger.setLevel(logging.INFO)
-    root_logger.addHandler(handler)
+journal = ConversationJournal("data/conversation.jsonl")
 
-    def compress_old_logs():
-        import zipfile
-        import glob
 
-        log_files = glob.glob("log/data_*.log.*")
-        for filepath in log_files:
-            zip_path = filepath + ".zip"
-            if not os.path.exists(zip_path):
-                with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-                    zipf.write(filepath, arcname=os.path.basename(filepath))
-                os.remove(filepath)
-
-    return compress_old_logs
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    return token_counter.count_text(text, model)
 
 
-def set_conversation(conversation_text: str):
-    """
-    Saves the given conversation text to 'conversation.json'.
-    """
-    os.makedirs("data", exist_ok=True)
-    with open("data/conversation.json", "w", encoding="utf-8") as f:
-        f.write(conversation_text)
-    print("Conversation saved to conversation.json")
+def context_label(agent) -> str:
+    used, limit = agent.context_usage()
+    return f"{used / 1000:.1f}k/{limit // 1000}k tokens ({used / limit:.0%})"
 
 
-def count_tokens(text: str, model: str = "gpt-4") -> int:
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-    except KeyError:
-        encoding = tiktoken.get_encoding("cl100k_base")
-    tokens = encoding.encode(text)
-    return len(tokens)
+def model_label(agent) -> str:
+    if agent.routing:
+        return f"auto ({agent.router.fast_model} / {agent.router.strong_model})"
+    return agent.model
 
 
 def main():
     session = PromptSession(multiline=True)
-    init_global_log()
-    print("Will use model:", developer.model)
+    log_session = init_global_log()
+    print("Will use model:", model_label(developer))
 
     summary = get_summary()
     if summary:
         developer.set_additional_system_prompt(summary)
         developer.clear()
 
+    if "--resume" in sys.argv[1:]:
+        restored = journal.restore(developer)
+        print(f"Resumed {restored} messages from {journal.path}")
+
     while True:
         try:
             with patch_stdout():            
-                current_file_tree = get_file_tree()
+                current_file_tree = render_file_tree()
                 developer.set_additional_system_prompt(
-                    "The file tree represents all files and directories in the project. "
-                    "It is a nested dictionary where keys are file or folder names, "
-                    "files have value None, and directories have nested dictionaries as their values. "
+                    "The file tree lists all files and directories in the project, one per line, "
+                    "indented by two spaces per nesting level. Directory names end with '/'. "
+                    "Large directories are collapsed into a summary such as 'tests/ (312 files, *.cpp)'; "
+                    "use get_directory_tree to list them. "
                     "Only use these files for reading or modification.\n\n"
                     f"Current project files:\n{current_file_tree}"
                 )
 
-                user_input = session.prompt("> ")
+                user_input = session.prompt(f"[{context_label(developer)}] > ")
 
             if user_input.strip() == "summary":
                 if generate_code_summary_from_file:
@@ -126,18 +110,44 @@ def main():
                 print_formatted_text(HTML(f"{response}"))
                 continue
 
+            if user_input.strip() == "memory":
+                build = build_memory(client, ROOT_DIRECTORY, file_tree.iter_files)
+                print(f"memory: {build['tagged']} files tagged ({build['local']} locally), {build['failed']} failed, "
+                      f"{build['unchanged']} unchanged, {build['removed']} removed in {build['seconds']:.1f}s "
+                      f"({build['files_per_minute']:.0f} files/min, {build['tokens_per_minute']:.0f} tokens/min)")
+                continue
+
+            if user_input.strip() == "stats":
+                tracer.flush()
+                print(tracer.format_stats())
+                if getattr(developer, "prefetcher", None):
+                    prefetch = developer.prefetcher.stats()
+                    print(f"prefetch: {prefetch['prefetched']} files attached over {prefetch['requests']} requests, "
+                          f"hit rate {prefetch['hit_rate']:.0%}, coverage {prefetch['coverage']:.0%}, "
+                          f"{prefetch['wasted']} read again")
+                continue
+
             if user_input.strip() == "reset":
                 developer.soft_reset()
+                journal.sync(developer.messages)
                 continue
 
             if user_input.strip() == "clear":
                 developer.clear()
+                journal.sync(developer.messages)
                 continue
 
             if user_input.strip() == "switch_model":
-                new_model = "gpt-4o-mini" if developer.model == "gpt-4o" else "gpt-4o"
-                developer.set_model(new_model)
-                print("Will use model:", developer.model)
+                router = developer.router
+                if router is None:
+                    developer.set_model("gpt-4o-mini" if developer.model == "gpt-4o" else "gpt-4o")
+                elif developer.routing:
+                    developer.set_model(router.fast_model)
+                elif developer.model == router.fast_model:
+                    developer.set_model(router.strong_model)
+                else:
+                    developer.set_auto_model()
+                print("Will use model:", model_label(developer))
                 continue
 
             response = developer.request(client, user_input)
@@ -145,7 +155,7 @@ def main():
             safe_response = escape(response)
             print(response)
 
-            set_conversation(json.dumps(developer.messages))
+            journal.sync(developer.messages)
 
             # developer.soft_reset()
 
@@ -153,6 +163,8 @@ def main():
             print("\nExiting chat.")
             break
 
+    log_session.stop()
+
 
 if __name__ == "__main__":
     main()
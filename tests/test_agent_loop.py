@@ -0,0 +1,229 @@
+import json
+
+from lib.agents.agents import Agent
+from lib.agents.fake_client import FakeClient, FakeOpenAIServer
+from lib.agents.prefetch import Prefetcher
+from lib.agents.router import ModelRouter
+from lib.agents.tracing import tracer
+
+
+def echo(text: str):
+    """
+    Returns the text unchanged.
+
+    :param text: Text to echo.
+    """
+    return text
+
+
+def test_fake_client_drives_tool_calls():
+    client = FakeClient([
+        {"tool_calls": [{"name": "echo", "arguments": {"text": "ping"}}]},
+        "pong",
+    ])
+    agent = Agent(name="Test", model="fake-model", system_prompt="test", tools=[echo])
+
+    assert agent.request(client, "hello") == "pong"
+    assert len(client.requests) == 2
+    tool_messages = [m for m in agent.messages if m["role"] == "tool"]
+    assert tool_messages[0]["content"] == '"ping"'
+
+
+def test_malformed_arguments_answer_the_tool_call_with_an_error():
+    client = FakeClient([{"tool_calls": [{"name": "echo", "arguments": "{not json"}]}, "sorry"])
+    agent = Agent(name="Test", model="fake-model", system_prompt="test", tools=[echo])
+
+    assert agent.request(client, "hello") == "sorry"
+    assistant, tool = agent.messages[-3:-1]
+    assert "function_call" not in assistant and "refusal" not in assistant
+    assert tool["tool_call_id"] == assistant["tool_calls"][0]["id"]
+    assert json.loads(tool["content"]).startswith("Error: JSONDecodeError")
+    assert agent.request_tool_errors == 1
+
+
+def test_http_stand_in_serves_script():
+    from openai import OpenAI
+
+    with FakeOpenAIServer(["first", "second"]) as server:
+        client = OpenAI(base_url=server.base_url, api_key="fake", max_retries=0)
+        agent = Agent(name="Test", model="fake-model", system_prompt="test")
+        assert agent.request(client, "one") == "first"
+        assert agent.request(client, "two") == "second"
+        assert server.requests[1]["messages"][-1]["content"] == "two"
+
+
+def test_spans_recorded_for_completions_and_tools(tmp_path):
+    tracer.export_to(str(tmp_path / "spans.jsonl"))
+    try:
+        client = FakeClient([{"tool_calls": [{"name": "echo", "arguments": {"text": "x"}}]}, "done"])
+        agent = Agent(name="Traced", model="fake-model", system_prompt="test", tools=[echo])
+        agent.request(client, "hello")
+    finally:
+        tracer.close()
+
+    stats = tracer.stats()
+    assert stats["tool.echo"]["count"] >= 1
+    assert stats["llm.completion"]["count"] >= 2
+
+    records = [json.loads(line) for line in (tmp_path / "spans.jsonl").read_text().splitlines()]
+    request = next(r for r in records if r["name"] == "agent.request")
+    assert any(r["parent_id"] == request["id"] for r in records if r["name"] == "tool.echo")
+
+
+def test_looping_model_stops_at_step_budget():
+    client = FakeClient([{"tool_calls": [{"name": "echo", "arguments": {"text": "again"}}]}], loop=True)
+    agent = Agent(name="Looping", model="fake-model", system_prompt="test", tools=[echo])
+
+    response = agent.request(client, "loop forever")
+
+    assert agent.last_stop_reason == "steps"
+    assert agent.handle_tool_calls_count == Agent.max_handle_tool_calls
+    assert len(client.requests) == Agent.max_handle_tool_calls
+    assert "steps budget exhausted" in response
+    assert agent.messages[-1] == {"role": "assistant", "content": response}
+
+
+def test_token_and_time_budgets():
+    script = [{"content": "working", "tool_calls": [{"name": "echo", "arguments": {"text": "x"}}]}]
+
+    agent = Agent(name="Tokens", model="fake-model", system_prompt="test", tools=[echo])
+    response = agent.request(FakeClient(script, loop=True), "go", max_steps=100, max_tokens=1)
+    assert agent.last_stop_reason == "tokens"
+    assert agent.handle_tool_calls_count == 1
+    assert response.startswith("working")
+
+    agent = Agent(name="Time", model="fake-model", system_prompt="test", tools=[echo])
+    agent.request(FakeClient(script, latency=0.02, loop=True), "go", max_steps=100, max_seconds=0.05)
+    assert agent.last_stop_reason == "time"
+
+
+def test_completed_request_records_stop_reason():
+    agent = Agent(name="Done", model="fake-model", system_prompt="test", tools=[echo])
+    assert agent.request(FakeClient(["hi"]), "hello") == "hi"
+    assert agent.last_stop_reason == "completed"
+
+
+def fail(reason: str):
+    """
+    Always raises.
+
+    :param reason: Error message.
+    """
+    raise RuntimeError(reason)
+
+
+def test_router_escalates_failed_fast_attempt():
+    client = FakeClient([
+        {"tool_calls": [{"name": "fail", "arguments": {"reason": "boom"}}]},
+        "cheap answer",
+        "strong answer",
+    ])
+    router = ModelRouter("fast", "strong")
+    agent = Agent(name="Routed", model="fast", system_prompt="test", tools=[fail], router=router)
+
+    assert agent.request(client, "fix it") == "strong answer"
+    assert [r["model"] for r in client.requests] == ["fast", "fast", "strong"]
+    assert [m["content"] for m in agent.messages if m["role"] == "user"] == ["fix it"]
+    assert router.outcomes == {"fast": [0], "strong": [1]}
+
+
+def test_router_does_not_repeat_mutating_tools():
+    writes = []
+
+    def write(text: str):
+        """
+        Records a write.
+
+        :param text: Text to write.
+        """
+        writes.append(text)
+        return "written"
+
+    client = FakeClient([{"tool_calls": [{"name": "write", "arguments": {"text": "a"}},
+                                         {"name": "fail", "arguments": {"reason": "boom"}}]}, "cheap answer"])
+    router = ModelRouter("fast", "strong", mutating_tools=("write",))
+    agent = Agent(name="Routed", model="fast", system_prompt="test", tools=[write, fail], router=router)
+
+    assert agent.request(client, "fix it") == "cheap answer"
+    assert writes == ["a"]
+    assert [r["model"] for r in client.requests] == ["fast", "fast"]
+    assert router.outcomes == {"fast": [0]}
+
+
+def test_router_stats_are_saved_in_batches(tmp_path):
+    path = tmp_path / "router.json"
+    router = ModelRouter("fast", "strong", stats_path=str(path), save_interval=60)
+    router.saved_at -= 60
+    router.record("fast", True)
+    router.record("fast", False)
+    assert json.loads(path.read_text()) == {"fast": [1]}
+
+    router.flush()
+    assert json.loads(path.read_text()) == {"fast": [1, 0]}
+    assert ModelRouter("fast", "strong", stats_path=str(path)).outcomes == {"fast": [1, 0]}
+
+
+def test_router_uses_strong_model_for_large_prompts_and_pinning():
+    router = ModelRouter("fast", "strong", max_fast_prompt_tokens=100)
+    agent = Agent(name="Routed", model="fast", system_prompt="test", router=router)
+    client = FakeClient(["small", "large", "pinned"])
+
+    agent.request(client, "short")
+    agent.request(client, "x" * 1000)
+    agent.set_model("fast")
+    agent.request(client, "y" * 1000)
+    assert [r["model"] for r in client.requests] == ["fast", "strong", "fast"]
+
+
+def get_files_content(file_paths: list):
+    """
+    Pretends to read files.
+
+    :param file_paths: Paths to read.
+    """
+    return "content"
+
+
+def set_files_content(files: list):
+    """
+    Pretends to write files.
+
+    :param files: Files to write.
+    """
+    return "saved"
+
+
+def test_prefetch_attaches_files_and_tracks_hits(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "parser.py").write_text("def parse(text):\n    return text\n")
+    (tmp_path / "src" / "other.py").write_text("x = 1\n")
+    write = {"name": "set_files_content", "arguments": {"files": [{"file_path": "src/parser.py", "content": ""}]}}
+    read = {"name": "get_files_content", "arguments": {"file_paths": ["src/parser.py"]}}
+
+    prefetcher = Prefetcher(str(tmp_path))
+    client = FakeClient([{"tool_calls": [write]}, "done"])
+    agent = Agent(name="Prefetch", model="fake-model", system_prompt="test",
+                  tools=[get_files_content, set_files_content], prefetcher=prefetcher)
+    agent.request(client, "Fix the bug in parser.py")
+
+    first_request = client.requests[0]["messages"]
+    assert "def parse(text)" in first_request[-2]["content"]
+    assert "other.py" not in first_request[-2]["content"]
+    assert not any("Prefetched" in str(m.get("content")) for m in agent.messages)
+    assert prefetcher.stats()["hit_rate"] == 1.0
+
+    agent.request(FakeClient([{"tool_calls": [read, write]}, "done"]), "Fix the bug in parser.py")
+    stats = prefetcher.stats()
+    assert (stats["prefetched"], stats["used"], stats["hits"], stats["wasted"]) == (2, 2, 1, 1)
+    assert (stats["hit_rate"], stats["coverage"]) == (0.5, 0.5)
+
+
+def test_prefetch_matches_whole_names_and_caps_reads(tmp_path):
+    (tmp_path / "http.cpp").write_text("void get();\n")
+    (tmp_path / "big.cpp").write_text("void first();\n" + "int x;\n" * 200)
+    prefetcher = Prefetcher(str(tmp_path), max_read_bytes=100)
+
+    assert prefetcher.rank("Fix myhttp.cpp") == []
+    assert prefetcher.rank("Fix http.cpp.") == [(10, "http.cpp")]
+    content = prefetcher.read("big.cpp")
+    assert content.startswith("void first();\n") and content.endswith("int x;\n") and len(content) <= 100
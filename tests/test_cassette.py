@@ -0,0 +1,62 @@
+import pytest
+
+from lib.agents.cassette import CassetteClient, CassetteMiss, request_key, completion_from_dict
+from lib.agents.client import ClientWrapper
+
+
+def make_completion(content):
+    return completion_from_dict({
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o-mini",
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": content},
+        }],
+        "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+    })
+
+
+class CountingClient(ClientWrapper):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        return make_completion(f"answer {self.calls}")
+
+
+def test_record_then_replay(tmp_path):
+    messages = [{"role": "user", "content": "hello"}]
+
+    inner = CountingClient()
+    recorder = CassetteClient(inner, tmp_path, mode="record")
+    recorded = recorder.chat.completions.create(model="gpt-4o-mini", messages=messages)
+    assert inner.calls == 1
+
+    player = CassetteClient(None, tmp_path, mode="replay")
+    replayed = player.chat.completions.create(model="gpt-4o-mini", messages=messages)
+    assert replayed.choices[0].message.content == recorded.choices[0].message.content
+    assert replayed.usage.total_tokens == 5
+
+    with pytest.raises(CassetteMiss):
+        player.chat.completions.create(model="gpt-4o", messages=messages)
+
+
+def test_auto_mode_records_only_misses(tmp_path):
+    inner = CountingClient()
+    client = CassetteClient(inner, tmp_path, mode="auto")
+    for _ in range(3):
+        client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}])
+    assert inner.calls == 1
+    assert client.hits == 2
+
+
+def test_request_key_is_stable():
+    a = request_key("m", [{"role": "user", "content": "x"}], [{"b": 1, "a": 2}])
+    b = request_key("m", [{"content": "x", "role": "user"}], [{"a": 2, "b": 1}])
+    assert a == b
+    assert a != request_key("m", [{"role": "user", "content": "y"}])
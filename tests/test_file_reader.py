@@ -0,0 +1,80 @@
+from lib.agents.file_reader import FileReader, parse_path_spec
+
+
+def make_log(tmp_path, lines=1000):
+    path = tmp_path / "big.log"
+    path.write_text("".join(f"line {i}\n" for i in range(1, lines + 1)))
+    return str(path)
+
+
+def test_parse_path_spec():
+    assert parse_path_spec("src/a.py") == ("src/a.py", None, None, None)
+    assert parse_path_spec("src/a.py:10-20") == ("src/a.py", "lines", 10, 20)
+    assert parse_path_spec("app.log:500-") == ("app.log", "lines", 500, None)
+    assert parse_path_spec("app.log:7") == ("app.log", "lines", 7, 7)
+    assert parse_path_spec("blob.bin@0-4096") == ("blob.bin", "bytes", 0, 4096)
+
+
+def test_line_window_and_total_lines(tmp_path):
+    path = make_log(tmp_path)
+    result = FileReader().read(path, "lines", 500, 502)
+    assert result["content"] == "line 500\nline 501\nline 502\n"
+    assert result["total_lines"] == 1000
+    assert (result["start_line"], result["end_line"]) == (500, 502)
+    assert not result["truncated"]
+
+
+def test_byte_window_reports_lines(tmp_path):
+    path = make_log(tmp_path)
+    result = FileReader().read(path, "bytes", 0, 14)
+    assert result["content"] == "line 1\nline 2\n"
+    assert (result["start_line"], result["end_line"]) == (1, 2)
+
+
+def test_whole_file_is_capped_and_pageable(tmp_path):
+    path = make_log(tmp_path)
+    reader = FileReader(max_read_bytes=100)
+    first = reader.read(path)
+    assert first["truncated"]
+    assert len(first["content"]) <= 100
+    assert first["content"].endswith("\n")
+
+    next_path, kind, start, end = parse_path_spec(first["next"])
+    assert (next_path, kind, end) == (path, "lines", None)
+    second = reader.read(path, kind, start, end)
+    assert second["start_line"] == first["end_line"] + 1
+
+
+def test_line_longer_than_the_cap_continues_by_byte_offset(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text("short\n" + "é" * 120 + "\nlast\n")
+    reader = FileReader(max_read_bytes=100)
+
+    first = reader.read(str(path), "lines", 2, None, path="data.json")
+    assert first["truncated"] and (first["start_line"], first["end_line"]) == (2, 2)
+    content = first["content"]
+    while "next" in first:
+        _, kind, start, end = parse_path_spec(first["next"])
+        assert kind == "bytes"
+        first = reader.read(str(path), kind, start, end, path="data.json")
+        content += first["content"]
+    assert content == "é" * 120 + "\nlast\n"
+
+
+def test_binary_and_empty_files(tmp_path):
+    binary = tmp_path / "image.png"
+    binary.write_bytes(b"\x89PNG\r\n\x1a\n\x00\x00\x00")
+    assert FileReader().read(str(binary)) == {"size": 11, "binary": True, "content": ""}
+
+    empty = tmp_path / "empty.txt"
+    empty.write_text("")
+    assert FileReader().read(str(empty))["total_lines"] == 0
+
+
+def test_index_is_rebuilt_when_file_changes(tmp_path):
+    path = make_log(tmp_path, lines=3)
+    reader = FileReader()
+    assert reader.read(path)["total_lines"] == 3
+    with open(path, "a") as f:
+        f.write("line 4\nline 5\n")
+    assert reader.read(path, "lines", 5, 5)["content"] == "line 5\n"
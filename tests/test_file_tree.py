@@ -0,0 +1,98 @@
+import os
+import time
+
+from lib.agents.file_tree import FileTreeService, is_ignored, load_gitignore
+
+
+def make_project(root):
+    (root / ".gitignore").write_text("build/\n*.log\n!keep.log\n/top.txt\ndocs/**/*.tmp\n")
+    for path in ["src/a/x.py", "src/main.py", "src/top.txt", "top.txt", "build/o.o",
+                 "logs/a.log", "logs/keep.log", "docs/x/y/z.tmp", "docs/readme.md", ".git/HEAD"]:
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text("")
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_gitignore_rules(tmp_path):
+    make_project(tmp_path)
+    rules = load_gitignore(str(tmp_path), "")
+    assert is_ignored(rules, "build", True)
+    assert not is_ignored(rules, "build", False)
+    assert is_ignored(rules, "logs/a.log", False)
+    assert not is_ignored(rules, "logs/keep.log", False)
+    assert is_ignored(rules, "top.txt", False)
+    assert not is_ignored(rules, "src/top.txt", False)
+    assert is_ignored(rules, "docs/x/y/z.tmp", False)
+
+
+def test_snapshot_skips_ignored_paths(tmp_path):
+    make_project(tmp_path)
+    (tmp_path / "src" / ".gitignore").write_text("a/\n")
+    tree = FileTreeService(str(tmp_path), watch=None).snapshot()
+    assert tree == {
+        "docs": {"x": {"y": {}}, "readme.md": None},
+        "logs": {"keep.log": None},
+        "src": {".gitignore": None, "main.py": None, "top.txt": None},
+        ".gitignore": None,
+    }
+
+
+def test_notify_changed_updates_without_mutating_old_snapshots(tmp_path):
+    make_project(tmp_path)
+    service = FileTreeService(str(tmp_path), watch=None)
+    before = service.snapshot()
+    assert service.snapshot() is before
+
+    (tmp_path / "src" / "new" / "deep").mkdir(parents=True)
+    (tmp_path / "src" / "new" / "deep" / "f.py").write_text("")
+    service.notify_changed("src/new/deep/f.py")
+
+    after = service.snapshot()
+    assert after["src"]["new"] == {"deep": {"f.py": None}}
+    assert "new" not in before["src"]
+    assert after["docs"] is before["docs"]
+    assert "src/new/deep/f.py" in set(service.iter_files())
+
+
+def test_watchers_pick_up_outside_changes(tmp_path):
+    make_project(tmp_path)
+    for mode in ("inotify", "poll"):
+        service = FileTreeService(str(tmp_path), watch=mode, poll_interval=0.05).start()
+        try:
+            os.makedirs(tmp_path / "src" / mode)
+            (tmp_path / "src" / mode / "f.py").write_text("")
+            assert wait_until(lambda: "f.py" in service.snapshot()["src"].get(mode, {}))
+
+            (tmp_path / "src" / mode / "f.py").unlink()
+            (tmp_path / "src" / mode).rmdir()
+            assert wait_until(lambda: mode not in service.snapshot()["src"])
+            assert not any(d.startswith(f"src/{mode}") for d in service.dirs)
+        finally:
+            service.stop()
+
+
+def test_listeners_hear_written_files_but_not_ignored_ones(tmp_path):
+    make_project(tmp_path)
+    service = FileTreeService(str(tmp_path), watch="inotify", poll_interval=0.05)
+    heard = []
+    service.add_listener(heard.append)
+    service.start()
+    try:
+        assert heard == [None]
+        (tmp_path / "src" / "main.py").write_text("x = 1\n")
+        (tmp_path / "logs" / "debug.log").write_text("ignored\n")
+        assert wait_until(lambda: any(paths and "src/main.py" in paths for paths in heard))
+        assert not any(paths and "logs/debug.log" in paths for paths in heard)
+
+        service.notify_changed("./src/a/x.py")
+        assert heard[-1] == {"src/a/x.py"}
+    finally:
+        service.stop()
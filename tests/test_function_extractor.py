@@ -0,0 +1,20 @@
+from lib.agents.function_extractor import extract_functions, signature_of
+
+SOURCE = """bool Database::openConnection(const QString& name)
+{
+    return true;
+}
+
+static int retryCount(int base,
+                      int factor) { return base * factor; }
+"""
+
+
+def test_functions_and_methods_are_listed_with_signatures_and_name_words():
+    assert sorted(extract_functions("database.cpp", SOURCE)) == [
+        ("Database::openConnection", "bool Database::openConnection(const QString& name)",
+         ["database", "open", "connection"]),
+        ("retryCount", "static int retryCount(int base, int factor)", ["retry", "count"]),
+    ]
+    assert extract_functions("notes.txt", "text") is None
+    assert signature_of("def parse(text):\n    return text\n") == "def parse(text)"
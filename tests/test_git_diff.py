@@ -0,0 +1,117 @@
+import subprocess
+
+from lib.agents.fake_client import FakeClient
+from lib.agents.git_diff import DiffPipeline, parse_numstat, skip_reason, split_diff
+
+
+def git(repo, *args):
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+def make_repo(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git(repo, "init", "-q")
+    git(repo, "config", "user.email", "dev@example.com")
+    git(repo, "config", "user.name", "Dev")
+    (repo / "main.cpp").write_text("int main() { return 0; }\n")
+    (repo / "old_name.h").write_text("".join(f"int value{i};\n" for i in range(20)))
+    git(repo, "add", ".")
+    git(repo, "commit", "-q", "-m", "initial")
+    return repo
+
+
+def test_numstat_parsing_and_skip_rules():
+    output = "3\t1\tsrc/a.cpp\0-\t-\tlogo.png\0" "2\t0\t\0old.h\0new.h\0"
+    assert parse_numstat(output) == [
+        (3, 1, "src/a.cpp", None), (None, None, "logo.png", None), (2, 0, "new.h", "old.h")
+    ]
+    assert skip_reason("logo.png", None, None) == "binary"
+    assert skip_reason("web/package-lock.json", 900, 12) == "lockfile"
+    assert skip_reason("proto/user.pb.cc", 40, 0) == "generated"
+    assert skip_reason("src/a.cpp", 3, 1) is None
+
+
+def test_large_diffs_are_summarized_in_parallel_and_noise_is_listed(tmp_path):
+    repo = make_repo(tmp_path)
+    (repo / "main.cpp").write_text("int main() { return 1; }\n")
+    (repo / "old_name.h").rename(repo / "new_name.h")
+    (repo / "big.cpp").write_text("".join(f"int generatedLine{i} = {i};\n" for i in range(400)))
+    (repo / "huge.cpp").write_text("".join(f"void handler{i}() {{}}\n" for i in range(400)))
+    (repo / "Cargo.lock").write_text("".join(f"dep{i} = 1\n" for i in range(300)))
+    (repo / "logo.png").write_bytes(b"\x89PNG\0\1\2\3")
+    git(repo, "add", ".")
+
+    summarized = []
+
+    def summarize(client, path, diff):
+        summarized.append((path, len(diff)))
+        return f"adds many definitions to {path}"
+
+    pipeline = DiffPipeline(str(repo), max_file_chars=2000, max_summary_input_chars=5000, summarize=summarize)
+    overview = pipeline.build(FakeClient([]))
+
+    assert overview.startswith("6 files changed, +1101 -1")
+    assert "Not shown: Cargo.lock (lockfile, +300 -0); logo.png (binary)" in overview
+    assert "-int main() { return 0; }\n+int main() { return 1; }" in overview
+    assert "rename from old_name.h" in overview
+    assert "=== big.cpp (" in overview and "summary: adds many definitions to big.cpp" in overview
+    assert sorted(path for path, _ in summarized) == ["big.cpp", "huge.cpp"]
+    assert all(size < 5100 for _, size in summarized)
+    assert "dep1 = 1" not in overview and len(overview) < 3000
+
+
+def test_without_a_client_large_diffs_are_cut(tmp_path):
+    repo = make_repo(tmp_path)
+    (repo / "big.cpp").write_text("".join(f"int line{i};\n" for i in range(1000)))
+    git(repo, "add", ".")
+
+    overview = DiffPipeline(str(repo), max_file_chars=1000).build()
+    assert "=== big.cpp (" in overview and "more lines cut]" in overview
+    assert len(overview) < 1200
+
+    git(repo, "commit", "-q", "-m", "big")
+    assert DiffPipeline(str(repo)).build() == "No staged changes."
+
+
+def test_renames_are_not_split_across_commands(tmp_path):
+    repo = make_repo(tmp_path)
+    (repo / "main.cpp").write_text("int main() { return 1; }\n")
+    (repo / "old_name.h").rename(repo / "new_name.h")
+    git(repo, "add", ".")
+
+    pipeline = DiffPipeline(str(repo))
+    diffs = pipeline.diffs([(path, old_path) for _, _, path, old_path in pipeline.numstat()], paths_per_command=2)
+    assert sorted(diffs) == ["main.cpp", "new_name.h"]
+    assert "rename from old_name.h" in diffs["new_name.h"]
+
+
+def test_paths_git_quotes_or_that_contain_spaces_are_matched(tmp_path):
+    repo = make_repo(tmp_path)
+    (repo / "x b").mkdir()
+    names = ["données.cpp", "tab\tname.cpp", 'quote".cpp', "x b/y.cpp"]
+    for name in names:
+        (repo / name).write_text(f"int value = 1; // {name}\n")
+    git(repo, "add", ".")
+
+    overview = DiffPipeline(str(repo)).build()
+    assert overview.startswith("4 files changed, +4 -0")
+    assert "Diff not available" not in overview
+    for name in names:
+        assert f"// {name}" in overview
+    assert split_diff('diff --git "a/\\303\\251t\\303\\251.h" "b/\\303\\251t\\303\\251.h"\n+x\n', {"été.h"}) == \
+        {"été.h": 'diff --git "a/\\303\\251t\\303\\251.h" "b/\\303\\251t\\303\\251.h"\n+x\n'}
+
+
+def test_oversized_blobs_are_listed_without_a_diff(tmp_path):
+    from lib.agents.git_repository import GitRepository
+
+    repo = make_repo(tmp_path)
+    (repo / "dump.sql").write_text("".join(f"INSERT INTO t VALUES ({i});\n" for i in range(2000)))
+    git(repo, "add", ".")
+
+    with GitRepository(str(repo)) as repository:
+        overview = DiffPipeline(repository=repository, max_blob_bytes=10000).build()
+        assert repository.batch_check.process is not None
+    assert "Not shown: dump.sql (" in overview and "bytes, +2000 -0)" in overview
+    assert "INSERT" not in overview
@@ -0,0 +1,117 @@
+import asyncio
+import subprocess
+
+import pytest
+
+from lib.agents.git_repository import GitError, GitRepository, parse_status
+
+
+def git(repo, *args):
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git(repo, "init", "-q", "-b", "main")
+    git(repo, "config", "user.email", "dev@example.com")
+    git(repo, "config", "user.name", "Dev")
+    (repo / "a.cpp").write_text("int a();\n")
+    (repo / "b.h").write_text("".join(f"int b{i};\n" for i in range(10)))
+    (repo / "c.h").write_text("int c;\n")
+    git(repo, "add", ".")
+    git(repo, "commit", "-q", "-m", "initial")
+    return repo
+
+
+def test_objects_are_read_through_persistent_processes(repo):
+    with GitRepository(str(repo)) as repository:
+        assert repository.read_file("a.cpp") == "int a();\n"
+        process = repository.batch.process
+        for _ in range(50):
+            assert repository.object_info("HEAD:b.h")["type"] == "blob"
+        assert repository.object_info("HEAD")["type"] == "commit"
+        assert repository.read_file("missing.cpp") is None
+        assert repository.read_file(".") is None
+
+        (repo / "a.cpp").write_text("int a(int);\n")
+        git(repo, "add", "a.cpp")
+        assert repository.read_file("a.cpp", ":") == "int a(int);\n"
+        assert repository.read_file("a.cpp") == "int a();\n"
+        assert repository.batch.process is process
+
+        with pytest.raises(ValueError):
+            repository.object_info("HEAD\nHEAD")
+        with pytest.raises(GitError):
+            repository.run("rev-parse", "no-such-branch")
+
+        process.kill()
+        process.wait()
+        assert repository.read_file("c.h") == "int c;\n"
+    assert repository.batch.process is None
+
+
+class InterruptedRead:
+    def __init__(self, stdout):
+        self.stdout = stdout
+
+    def readline(self):
+        return self.stdout.readline()
+
+    def read(self, size):
+        raise KeyboardInterrupt
+
+    def close(self):
+        self.stdout.close()
+
+
+def test_interrupted_request_does_not_leave_its_reply_for_the_next(repo):
+    with GitRepository(str(repo)) as repository:
+        assert repository.read_file("a.cpp") == "int a();\n"
+        repository.batch.process.stdout = InterruptedRead(repository.batch.process.stdout)
+        with pytest.raises(KeyboardInterrupt):
+            repository.read_file("b.h")
+        assert repository.batch.process is None
+        assert repository.read_file("c.h") == "int c;\n"
+
+
+def test_status_is_parsed_into_entries(repo):
+    (repo / "a.cpp").write_text("int a(int);\n")
+    git(repo, "mv", "b.h", "renamed.h")
+    (repo / "c.h").write_text("int c = 1;\n")
+    (repo / "new file.txt").write_text("new\n")
+
+    with GitRepository(str(repo)) as repository:
+        status = repository.status()
+        assert status["branch"]["head"] == "main"
+        entries = {entry["path"]: entry for entry in status["entries"]}
+        assert (entries["a.cpp"]["kind"], entries["a.cpp"]["index"], entries["a.cpp"]["worktree"]) == \
+            ("changed", ".", "M")
+        assert (entries["renamed.h"]["kind"], entries["renamed.h"]["orig_path"]) == ("renamed", "b.h")
+        assert entries["new file.txt"] == {"kind": "untracked", "path": "new file.txt"}
+        assert asyncio.run(repository.astatus()) == status
+
+
+def test_parse_status_handles_branch_tracking_and_conflicts():
+    output = "\0".join([
+        "# branch.oid abc", "# branch.head main", "# branch.upstream origin/main", "# branch.ab +2 -1",
+        "u UU N... 100644 100644 100644 100644 h1 h2 h3 conflict.cpp", "! build/out.o", "",
+    ])
+    assert parse_status(output) == {
+        "branch": {"oid": "abc", "head": "main", "upstream": "origin/main", "ahead": 2, "behind": 1},
+        "entries": [
+            {"kind": "unmerged", "path": "conflict.cpp", "index": "U", "worktree": "U", "submodule": False},
+            {"kind": "ignored", "path": "build/out.o"},
+        ],
+    }
+
+
+def test_async_variants_share_the_batch_processes(repo):
+    async def read_all(repository):
+        return await asyncio.gather(*(repository.aread_file(name) for name in ("a.cpp", "c.h") * 10))
+
+    with GitRepository(str(repo)) as repository:
+        contents = asyncio.run(read_all(repository))
+        assert contents == ["int a();\n", "int c;\n"] * 10
+        assert asyncio.run(repository.aobject_info("HEAD:missing")) is None
@@ -0,0 +1,58 @@
+import json
+
+from lib.agents.agents import Agent
+from lib.agents.journal import ConversationJournal
+
+
+def records(path):
+    return [json.loads(line) for line in open(path, encoding="utf-8")]
+
+
+def test_only_new_messages_are_appended(tmp_path):
+    path = str(tmp_path / "conversation.jsonl")
+    journal = ConversationJournal(path)
+    messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "a"}]
+
+    journal.sync(messages)
+    messages += [{"role": "assistant", "content": "b"}, {"role": "user", "content": "c"}]
+    assert journal.sync(messages) == 2
+    assert journal.sync(messages) == 0
+
+    ops = [r["op"] for r in records(path)]
+    assert ops == ["reset", "append", "append"]
+    assert ConversationJournal(path).load() == messages[1:]
+
+
+def test_rewritten_history_writes_reset_and_compacts(tmp_path):
+    path = str(tmp_path / "conversation.jsonl")
+    journal = ConversationJournal(path, compact_after=4)
+    messages = [{"role": "system", "content": "sys"}]
+    journal.sync(messages)
+
+    for i in range(3):
+        messages.append({"role": "user", "content": str(i)})
+        journal.sync(messages)
+    assert len(records(path)) == 1
+
+    messages[1:] = [{"role": "user", "content": "rewritten"}]
+    journal.sync(messages)
+
+    assert [r["op"] for r in records(path)] == ["reset", "reset"]
+    assert ConversationJournal(path).load() == [{"role": "user", "content": "rewritten"}]
+
+
+def test_torn_last_line_is_ignored_and_agent_restored(tmp_path):
+    path = tmp_path / "conversation.jsonl"
+    journal = ConversationJournal(str(path))
+    journal.sync([{"role": "system", "content": "old"}, {"role": "user", "content": "hi"}])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op": "append", "message": {"role": "assis')
+
+    agent = Agent(name="Resume", model="fake-model", system_prompt="new system")
+    assert ConversationJournal(str(path)).restore(agent) == 1
+    assert agent.messages == [{"role": "system", "content": "new system"}, {"role": "user", "content": "hi"}]
+
+    journal = ConversationJournal(str(path))
+    journal.load()
+    journal.sync(agent.messages + [{"role": "assistant", "content": "hello"}])
+    assert [r["op"] for r in records(path)] == ["reset", "append"]
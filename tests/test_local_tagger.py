@@ -0,0 +1,49 @@
+from lib.agents.local_tagger import LocalTagger, split_identifier
+
+HEADER = """
+#include <QObject>
+#include <QSqlDatabase>
+#include "logger.h"
+
+class DatabaseManager : public QObject {
+    Q_OBJECT
+    Q_PROPERTY(int connectionCount READ connectionCount NOTIFY connectionCountChanged)
+public:
+    bool openConnection(const QString& name);
+    QSqlQuery runQuery(const QString& sql);
+private:
+    QSqlDatabase m_db;
+};
+"""
+
+
+def test_split_identifier_handles_camel_snake_and_paths():
+    assert split_identifier("QSqlDatabase") == ["q", "sql", "database"]
+    assert split_identifier("open_http_socket") == ["open", "http", "socket"]
+    assert split_identifier("net/HTTPClient.h") == ["net", "http", "client", "h"]
+
+
+def test_header_is_tagged_confidently_from_includes_classes_and_properties():
+    tags, confidence = LocalTagger().tag("src/database_manager.h", HEADER)
+    assert tags[:3] == ["database", "qt", "logging"]
+    assert "databasemanager" in tags
+    assert confidence == 1.0
+
+
+def test_analyze_lists_methods_from_the_same_parse():
+    _, _, functions = LocalTagger().analyze("src/database_manager.h", HEADER)
+    names = [name for name, _, _ in functions]
+    assert "DatabaseManager::openConnection" in names
+    assert LocalTagger().analyze("notes.txt", "plain text")[2] is None
+
+
+def test_code_without_signals_has_low_confidence():
+    tags, confidence = LocalTagger().tag("src/gcd.cpp", "static int gcd(int a, int b) { return b ? gcd(b, a % b) : a; }\n")
+    assert tags == []
+    assert confidence < LocalTagger().min_confidence
+
+
+def test_python_imports_count_without_a_parser():
+    code = "import sqlite3\nfrom logging.handlers import QueueHandler\n\ndef connect(path):\n    return sqlite3.connect(path)\n"
+    tags, _ = LocalTagger().tag("store.txt", code)
+    assert tags[:2] == ["database", "logging"]
@@ -0,0 +1,78 @@
+import gzip
+import hashlib
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+
+from lib.agents.logs import LogSession
+
+
+@pytest.fixture
+def restore_root_logger():
+    root_logger = logging.getLogger()
+    handlers, level = root_logger.handlers[:], root_logger.level
+    yield
+    for h in root_logger.handlers[:]:
+        root_logger.removeHandler(h)
+    for h in handlers:
+        root_logger.addHandler(h)
+    root_logger.setLevel(level)
+
+
+def test_arguments_mutated_after_logging_do_not_change_the_record(tmp_path, restore_root_logger):
+    session = LogSession(str(tmp_path), "test")
+    files = ["a.cpp"]
+    logging.info("Tool %s files: %s", "get_files_content", files)
+    files.append("b.cpp")
+    session.stop()
+
+    assert "Tool get_files_content files: ['a.cpp']\n" in open(session.path, encoding="utf-8").read()
+
+
+def test_large_payloads_are_stored_once_by_hash(tmp_path, restore_root_logger):
+    session = LogSession(str(tmp_path), "test", max_payload_chars=100)
+    big = "x" * 5000
+    logging.info("Result: %s", big)
+    logging.info("Result: %s", big)
+    session.stop()
+
+    lines = open(session.path, encoding="utf-8").read().splitlines()
+    assert len(lines) == 2 and all("5008 chars, full text:" in line for line in lines)
+    payloads = os.listdir(tmp_path / "payloads")
+    assert payloads == [hashlib.sha256(("Result: " + big).encode()).hexdigest() + ".txt"]
+    assert (tmp_path / "payloads" / payloads[0]).read_text() == "Result: " + big
+
+
+def test_rotated_and_old_logs_are_gzipped(tmp_path, restore_root_logger):
+    old_log = tmp_path / "data_old.log"
+    old_log.write_text("previous session\n")
+
+    session = LogSession(str(tmp_path), "test", max_bytes=2000, backup_count=2)
+    session.compress_old_logs()
+    for i in range(100):
+        logging.info("line %d %s", i, "y" * 50)
+    session.stop()
+
+    assert not old_log.exists()
+    assert gzip.open(str(old_log) + ".gz").read() == b"previous session\n"
+    backups = sorted(name for name in os.listdir(tmp_path) if name.startswith("data_test.log."))
+    assert backups == ["data_test.log.1.gz", "data_test.log.2.gz"]
+    assert b"line" in gzip.open(tmp_path / "data_test.log.1.gz").read()
+
+
+def test_pending_backups_of_exited_processes_are_compressed(tmp_path, restore_root_logger):
+    exited = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                            capture_output=True, text=True).stdout.strip()
+    left = tmp_path / f"data_crashed.log.{exited}.1.pending"
+    left.write_text("rotated before a crash\n")
+    own = tmp_path / f"data_running.log.{os.getpid()}.1.pending"
+    own.write_text("being compressed\n")
+
+    session = LogSession(str(tmp_path), "test")
+    session.stop()
+
+    assert not left.exists() and own.exists()
+    assert gzip.open(tmp_path / f"data_crashed.log.{exited}.1.gz").read() == b"rotated before a crash\n"
@@ -0,0 +1,199 @@
+from lib.agents.memory import Memory
+
+
+def make_memory(tmp_path, files=3):
+    memory = Memory(str(tmp_path / "memory.db"))
+    for i in range(files):
+        memory.add_or_update_file(f"src/file_{i}.cpp", ["database" if i % 2 else "logging", "core"])
+        for name in ("open", "close"):
+            memory.add_or_update_function(f"src/file_{i}.cpp", name, f"void {name}()", f"{name}s it", ["io"])
+    return memory
+
+
+def count_statements(memory):
+    statements = []
+    memory.reader.set_trace_callback(statements.append)
+    return statements
+
+
+def test_get_all_files_uses_one_query(tmp_path):
+    memory = make_memory(tmp_path, files=20)
+    statements = count_statements(memory)
+
+    files = list(memory.get_all_files())
+
+    assert len(statements) == 1
+    assert [f["path"] for f in files] == sorted(f"src/file_{i}.cpp" for i in range(20))
+    assert files[0]["functions"] == [
+        {"name": "close", "signature": "void close()", "description": "closes it", "tags": "io"},
+        {"name": "open", "signature": "void open()", "description": "opens it", "tags": "io"},
+    ]
+
+
+def test_results_stream_with_limit_and_offset(tmp_path):
+    memory = make_memory(tmp_path, files=5)
+    memory.add_or_update_file("src/empty.cpp", ["logging"])
+
+    page = list(memory.query_by_tags(["logging"], limit=2, offset=1))
+    assert [f["path"] for f in page] == ["src/file_0.cpp", "src/file_2.cpp"]
+
+    results = memory.get_all_files()
+    assert next(results)["path"] == "src/empty.cpp"
+    assert next(iter(memory.query_by_tags(["logging"])))["functions"] == []
+    assert list(memory.query_by_tags([])) == []
+
+
+def test_streamed_queries_are_traced_when_consumed(tmp_path):
+    from lib.agents.tracing import tracer
+
+    memory = make_memory(tmp_path, files=4)
+    before = len(tracer.spans)
+    results = memory.get_all_files()
+    assert len(tracer.spans) == before
+
+    assert len(list(results)) == 4
+    span = tracer.spans[-1]
+    assert span.name == "memory.get_all_files" and span.attrs["items"] == 4
+
+
+def test_tags_match_exactly_and_rank_by_matches(tmp_path):
+    memory = Memory(str(tmp_path / "memory.db"))
+    memory.add_or_update_file("catalog.cpp", ["catalog", "ui"])
+    memory.add_or_update_file("logger.cpp", ["Log", "io"])
+    memory.add_or_update_file("db.cpp", ["database", "log"])
+    memory.add_or_update_function("db.cpp", "connect", "void connect()", "connects", ["network"])
+
+    results = list(memory.query_by_tags(["log", "network"]))
+    assert [(r["path"], r["matched"]) for r in results] == [("db.cpp", 2), ("logger.cpp", 1)]
+    assert results[1]["tags"] == "log,io"
+
+    memory.add_or_update_file("db.cpp", ["database"])
+    assert [r["path"] for r in memory.query_by_tags(["log"])] == ["logger.cpp"]
+
+
+def test_existing_database_is_migrated(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE files (path TEXT PRIMARY KEY, tags TEXT)")
+    conn.execute("""CREATE TABLE functions (file_path TEXT, name TEXT, signature TEXT, description TEXT,
+                    tags TEXT, PRIMARY KEY (file_path, name))""")
+    conn.execute("INSERT INTO files VALUES ('a.cpp', 'auth, Database'), ('b.cpp', 'catalog')")
+    conn.execute("INSERT INTO functions VALUES ('b.cpp', 'login', 'void login()', 'logs in', 'auth')")
+    conn.commit()
+    conn.close()
+
+    memory = Memory(path)
+    assert memory.reader.execute("PRAGMA user_version").fetchone()[0] >= 1
+    assert [(r["path"], r["matched"]) for r in memory.query_by_tags(["auth", "database"])] == [("a.cpp", 2), ("b.cpp", 1)]
+    assert list(memory.query_by_tags(["cat"])) == []
+    assert [r["name"] for r in memory.search_functions("login", k=5)] == ["login"]
+
+
+def test_full_text_search_ranks_functions_and_stays_in_sync(tmp_path):
+    memory = Memory(str(tmp_path / "memory.db"))
+    memory.add_or_update_function("db.cpp", "open_connection", "Connection open_connection(Config)",
+                                  "Opens a database connection", ["database"])
+    memory.add_or_update_function("log.cpp", "write_log", "void write_log(str)", "Writes a log line", ["logging"])
+    memory.add_or_update_function("ui.cpp", "render", "void render()", "Draws the window; no database", ["ui"])
+
+    results = memory.search_functions("database connections", k=5)
+    assert [r["name"] for r in results] == ["open_connection", "render"]
+    assert results[0]["score"] > results[1]["score"]
+
+    memory.add_or_update_function("db.cpp", "open_connection", "Connection open()", "Opens a socket", ["network"])
+    assert [r["name"] for r in memory.search_functions("database", k=5)] == ["render"]
+    assert [r["name"] for r in memory.search_functions("sock", k=5)] == ["open_connection"]
+
+    memory.clear()
+    assert memory.search_functions("render", k=5) == []
+
+
+def test_replaced_functions_stay_searchable_after_vacuum(tmp_path):
+    memory = Memory(str(tmp_path / "memory.db"))
+    memory.replace_functions("db.cpp", [("Db::open", "bool Db::open()", "", ["db", "open"]),
+                                        ("Db::close", "void Db::close()", "", ["db", "close"])])
+    memory.replace_functions("net.cpp", [("connect", "int connect()", "", ["connect"])])
+    memory.replace_functions("db.cpp", [("Db::reopen", "bool Db::reopen()", "", ["db", "reopen"])])
+    assert [r["name"] for r in memory.search_functions("db open close", k=5)] == ["Db::reopen"]
+
+    memory.writer.execute("VACUUM")
+    assert [r["name"] for r in memory.search_functions("connect", k=5)] == ["connect"]
+    assert [r["name"] for r in memory.search_functions("reopen", k=5)] == ["Db::reopen"]
+
+
+def test_bulk_writes_in_one_transaction_and_rebuilds_search(tmp_path):
+    memory = Memory(str(tmp_path / "memory.db"))
+    assert memory.reader.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    with memory.bulk(batch_size=50) as batch:
+        batch.min_paused_rows = 10
+        for i in range(120):
+            batch.add_file(f"src/file_{i // 10}.cpp", ["core"])
+            batch.add_function(f"src/file_{i // 10}.cpp", f"handler_{i}", f"void handler_{i}()", "handles it", ["io"])
+        batch.add_function("src/file_0.cpp", "handler_0", "void handler_0()", "handles sockets", ["network"])
+        assert batch.search_paused
+
+    assert memory.reader.execute("SELECT COUNT(*) FROM memory_state").fetchone()[0] == 0
+    assert memory.reader.execute("SELECT COUNT(*) FROM functions").fetchone()[0] == 120
+    assert [r["name"] for r in memory.search_functions("sockets", k=5)] == ["handler_0"]
+    assert len(list(memory.query_by_tags(["core"]))) == 12
+
+    try:
+        with memory.bulk() as batch:
+            batch.add_file("src/lost.cpp", ["core"])
+            batch.flush()
+            raise RuntimeError("parse failed")
+    except RuntimeError:
+        pass
+    assert [r["path"] for r in memory.query_by_tags(["core"]) if r["path"] == "src/lost.cpp"] == []
+
+    memory.add_or_update_function("src/new.cpp", "accept", "void accept()", "accepts sockets", ["network"])
+    assert [r["name"] for r in memory.search_functions("sockets", k=5)] == ["accept", "handler_0"]
+
+
+def test_writes_nested_in_bulk_join_its_transaction(tmp_path):
+    memory = Memory(str(tmp_path / "memory.db"))
+    with memory.bulk() as batch:
+        batch.add_file("a.cpp", ["core"])
+        memory.add_or_update_file("b.cpp", ["core"])
+        try:
+            with memory.transaction() as cursor:
+                cursor.execute("INSERT INTO files (path, tags) VALUES ('lost.cpp', 'core')")
+                raise RuntimeError("undo")
+        except RuntimeError:
+            pass
+        memory.replace_functions("b.cpp", [("open", "void open()", "", ["io"])])
+    assert [r["path"] for r in memory.query_by_tags(["core"])] == ["a.cpp", "b.cpp"]
+    assert [r["name"] for r in memory.search_functions("open", k=5)] == ["open"]
+
+    try:
+        with memory.bulk() as batch:
+            memory.add_or_update_file("c.cpp", ["core"])
+            raise RuntimeError("parse failed")
+    except RuntimeError:
+        pass
+    assert [r["path"] for r in memory.query_by_tags(["core"])] == ["a.cpp", "b.cpp"]
+
+
+def test_memory_is_shared_safely_between_threads(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    memory = make_memory(tmp_path, files=4)
+
+    def work(worker):
+        for i in range(25):
+            path = f"src/worker_{worker}_{i}.cpp"
+            memory.add_or_update_file(path, ["threaded"])
+            memory.add_or_update_function(path, "run", "void run()", "runs work", ["io"])
+            assert memory.has_file_info(path)
+            assert len(list(memory.query_by_tags(["logging"]))) == 2
+        return memory.reader
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        readers = list(pool.map(work, range(8)))
+
+    assert all(reader is not memory.reader for reader in readers)
+    assert len(list(memory.query_by_tags(["threaded"]))) == 200
+    assert len(memory.search_functions("runs", k=500)) == 200
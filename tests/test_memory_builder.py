@@ -0,0 +1,228 @@
+import threading
+import time
+
+import pytest
+
+from lib.agents.agents import Agent
+from lib.agents.fake_client import FakeClient
+from lib.agents.memory import Memory
+from lib.agents.memory_builder import MemoryBuilder
+
+
+def make_agent(store, model="tagger-1"):
+    def add_or_update_file(path, tags):
+        """
+        Stores file tags.
+
+        :param path: File path.
+        :param tags: Tags.
+        """
+        store(path, tags)
+
+    return Agent(name="Tagger", model=model, system_prompt="tag", tools=[add_or_update_file])
+
+
+def make_builder(tmp_path, model="tagger-1", **kwargs):
+    memory = Memory(str(tmp_path / "memory.db"))
+    return MemoryBuilder(str(tmp_path / "src"), memory, lambda store: make_agent(store, model), model, **kwargs)
+
+
+def tagger(messages):
+    """
+    Tags the file named in the prompt, or refuses files containing 'untaggable'.
+    """
+    last = messages[-1]
+    if last["role"] == "tool":
+        return "ok"
+    if "untaggable" in last["content"]:
+        return "I could not tag it"
+    path = last["content"].split("\n", 1)[0].removeprefix("File path: ")
+    return {"tool_calls": [{"name": "add_or_update_file", "arguments": {"path": path, "tags": ["core"]}}]}
+
+
+def write_sources(src, count):
+    src.mkdir(exist_ok=True)
+    for i in range(count):
+        (src / f"file_{i:02}.cpp").write_text(f"int f{i}();\n")
+
+
+def test_only_new_and_changed_files_are_tagged(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    for name in ("a.cpp", "b.cpp", "c.h"):
+        (src / name).write_text(f"// {name}\n")
+    (src / "notes.txt").write_text("not source")
+    (src / "blob.cpp").write_bytes(b"\0\1\2")
+
+    builder = make_builder(tmp_path)
+    stats = builder.build(FakeClient([tagger], loop=True))
+    assert (stats["tagged"], stats["unchanged"], stats["removed"]) == (3, 0, 0)
+    assert [r["path"] for r in builder.memory.query_by_tags(["core"])] == ["a.cpp", "b.cpp", "c.h"]
+
+    client = FakeClient([])
+    assert builder.build(client)["unchanged"] == 3
+    assert client.requests == []
+
+    (src / "b.cpp").write_text("// changed\n")
+    (src / "c.h").unlink()
+    (src / "d.h").write_text("// new\n")
+    client = FakeClient([tagger], loop=True)
+    stats = builder.build(client)
+    assert (stats["tagged"], stats["unchanged"], stats["removed"]) == (2, 1, 1)
+    assert any("File path: b.cpp\n\n// changed" in r["messages"][-1]["content"] for r in client.requests)
+    assert sorted(builder.memory.file_states()) == ["a.cpp", "b.cpp", "d.h"]
+
+
+def test_echoed_paths_are_matched_and_foreign_entries_kept(tmp_path):
+    src = tmp_path / "src"
+    (src / "net").mkdir(parents=True)
+    (src / "a.cpp").write_text("// a\n")
+    (src / "net" / "b.cpp").write_text("// b\n")
+    (src / "c.cpp").write_text("// c\n")
+    echoed = {"a.cpp": "./a.cpp", "net/b.cpp": str(src / "net" / "b.cpp"), "c.cpp": "src/c.cpp"}
+
+    def echoing_tagger(messages):
+        step = tagger(messages)
+        if isinstance(step, dict):
+            call = step["tool_calls"][0]["arguments"]
+            call["path"] = echoed[call["path"]]
+        return step
+
+    builder = make_builder(tmp_path)
+    builder.memory.add_or_update_file("tools/build.py", ["build"])
+    builder.memory.add_or_update_file("../other/main.cpp", ["other"])
+    stats = builder.build(FakeClient([echoing_tagger], loop=True))
+    assert (stats["tagged"], stats["failed"], stats["removed"]) == (3, 0, 0)
+    assert [r["path"] for r in builder.memory.query_by_tags(["core"])] == ["a.cpp", "c.cpp", "net/b.cpp"]
+    assert sorted(builder.memory.file_states()) == ["../other/main.cpp", "a.cpp", "c.cpp", "net/b.cpp", "tools/build.py"]
+
+
+def test_model_change_and_missing_tags_trigger_retagging(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a.cpp").write_text("// untaggable\n")
+
+    builder = make_builder(tmp_path)
+    stats = builder.build(FakeClient([tagger], loop=True))
+    assert (stats["tagged"], stats["failed"]) == (0, 1)
+
+    (src / "a.cpp").write_text("int main() {}\n")
+    assert builder.build(FakeClient([tagger], loop=True))["tagged"] == 1
+    changed, removed, unchanged = make_builder(tmp_path, model="tagger-2").plan()
+    assert ([path for path, _, _ in changed], removed, unchanged) == (["a.cpp"], [], 0)
+    assert changed[0][2] == b"int main() {}\n"
+
+
+def test_parsed_functions_are_stored_and_replaced(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "db.cpp").write_text("bool Database::openConnection() { return true; }\n")
+    builder = make_builder(tmp_path)
+
+    builder.build(FakeClient([tagger], loop=True))
+    assert [r["name"] for r in builder.memory.search_functions("open connection", k=5)] == ["Database::openConnection"]
+
+    (src / "db.cpp").write_text("void Database::closeConnection() {}\n")
+    builder.build(FakeClient([tagger], loop=True))
+    assert [r["name"] for r in builder.memory.search_functions("connection", k=5)] == ["Database::closeConnection"]
+
+
+def test_pipeline_tags_concurrently_and_reports_throughput(tmp_path):
+    write_sources(tmp_path / "src", 24)
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def slow_tagger(messages):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        return tagger(messages)
+
+    builder = make_builder(tmp_path, workers=4, write_batch=5)
+    stats = builder.build(FakeClient([slow_tagger], loop=True))
+
+    assert stats["tagged"] == 24
+    assert in_flight[1] == 4
+    assert stats["tokens"] > 0 and stats["files_per_minute"] > 0 and stats["tokens_per_minute"] > 0
+    assert len(list(builder.memory.query_by_tags(["core"]))) == 24
+
+
+def test_interrupted_build_resumes_from_written_batches(tmp_path):
+    write_sources(tmp_path / "src", 20)
+    builder = make_builder(tmp_path, workers=2, write_batch=5)
+    write = builder.write
+    writes = []
+
+    def write_once(results, stats):
+        if writes:
+            raise KeyboardInterrupt
+        writes.append(len(results))
+        write(results, stats)
+
+    builder.write = write_once
+    with pytest.raises(KeyboardInterrupt):
+        builder.build(FakeClient([tagger], loop=True))
+    done = len(builder.memory.file_states())
+    assert done == writes[0] and 0 < done < 20
+
+    builder.write = write
+    stats = builder.build(FakeClient([tagger], loop=True))
+    assert (stats["unchanged"], stats["tagged"]) == (done, 20 - done)
+
+
+def test_local_tagger_leaves_only_unclear_files_to_the_llm(tmp_path):
+    from lib.agents.local_tagger import LocalTagger
+
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "database.h").write_text("#include <QSqlDatabase>\n#include <QObject>\n"
+                                    "class Database : public QObject { Q_OBJECT };\n")
+    (src / "gcd.h").write_text("class Gcd {\npublic:\n    int gcd(int a, int b);\n};\n")
+
+    builder = make_builder(tmp_path, local_tagger=LocalTagger())
+    client = FakeClient([tagger], loop=True)
+    stats = builder.build(client)
+
+    assert (stats["tagged"], stats["local"]) == (2, 1)
+    assert {r["messages"][1]["content"].split("\n")[0] for r in client.requests} == {"File path: gcd.h"}
+    assert [r["path"] for r in builder.memory.query_by_tags(["database"])] == ["database.h"]
+    assert next(iter(builder.memory.query_by_tags(["gcd"])))["tags"] == "core,gcd"
+
+
+def test_changed_files_are_read_once(tmp_path, monkeypatch):
+    import lib.agents.memory_builder as memory_builder
+
+    write_sources(tmp_path / "src", 6)
+    builder = make_builder(tmp_path)
+    read = builder.read
+    reads = []
+    builder.read = lambda path: reads.append(path) or read(path)
+    assert builder.build(FakeClient([tagger], loop=True))["tagged"] == 6
+    assert len(reads) == 6
+
+    (tmp_path / "src" / "file_00.cpp").write_text("int changed();\n")
+    (tmp_path / "src" / "file_01.cpp").write_text("int also_changed();\n")
+    monkeypatch.setattr(memory_builder, "PLAN_CACHE_BYTES", 20)
+    reads.clear()
+    assert builder.build(FakeClient([tagger], loop=True))["tagged"] == 2
+    assert sorted(reads) == sorted([f"file_{i:02}.cpp" for i in range(6)] + ["file_01.cpp"])
+
+
+def test_local_tagger_errors_send_the_file_to_the_llm(tmp_path):
+    from lib.agents.local_tagger import LocalTagger
+
+    class BrokenTagger(LocalTagger):
+        def analyze(self, path, code):
+            if path == "file_01.cpp":
+                raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")
+            return [], 0.0, None
+
+    write_sources(tmp_path / "src", 4)
+    builder = make_builder(tmp_path, local_tagger=BrokenTagger())
+    client = FakeClient([tagger], loop=True)
+    stats = builder.build(client)
+    assert (stats["tagged"], stats["failed"]) == (4, 0)
+    assert any(r["messages"][1]["content"].startswith("File path: file_01.cpp") for r in client.requests)
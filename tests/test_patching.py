@@ -0,0 +1,133 @@
+from lib.agents.patching import apply_patch_text, parse_patch
+
+
+def write(root, path, content):
+    full = root / path
+    full.parent.mkdir(parents=True, exist_ok=True)
+    full.write_text(content)
+
+
+def test_unified_diff_with_wrong_line_numbers(tmp_path):
+    write(tmp_path, "app.py", "import os\n\ndef main():\n    print('hello')\n    return 0\n")
+    patch = """--- a/app.py
++++ b/app.py
+@@ -40,3 +40,3 @@
+ def main():
+-    print('hello')
++    print('world')
+     return 0
+"""
+    result = apply_patch_text(patch, str(tmp_path))
+
+    assert result["ok"], result
+    assert (tmp_path / "app.py").read_text() == "import os\n\ndef main():\n    print('world')\n    return 0\n"
+
+
+def test_search_replace_blocks_for_many_files_and_new_file(tmp_path):
+    write(tmp_path, "a.py", "x = 1\ny = 2\n")
+    write(tmp_path, "src/b.py", "def f():\n        return 1\n")
+    patch = """*** a.py
+<<<<<<< SEARCH
+y = 2
+=======
+y = 3
+>>>>>>> REPLACE
+*** src/b.py
+<<<<<<< SEARCH
+def f():
+    return 1
+=======
+def f():
+    return 2
+>>>>>>> REPLACE
+*** src/new.py
+<<<<<<< SEARCH
+=======
+VALUE = 1
+>>>>>>> REPLACE
+"""
+    result = apply_patch_text(patch, str(tmp_path))
+
+    assert result["ok"], result
+    assert (tmp_path / "a.py").read_text() == "x = 1\ny = 3\n"
+    assert (tmp_path / "src/b.py").read_text() == "def f():\n    return 2\n"
+    assert (tmp_path / "src/new.py").read_text() == "VALUE = 1\n"
+    assert result["files"][1]["applied"][0]["match"] == "whitespace"
+
+
+def test_failed_hunks_are_reported_and_others_applied(tmp_path):
+    write(tmp_path, "c.py", "one\ntwo\nthree\n")
+    patch = """*** c.py
+<<<<<<< SEARCH
+one
+=======
+ONE
+>>>>>>> REPLACE
+<<<<<<< SEARCH
+completely different text
+=======
+nothing
+>>>>>>> REPLACE
+*** missing.py
+<<<<<<< SEARCH
+a
+=======
+b
+>>>>>>> REPLACE
+"""
+    result = apply_patch_text(patch, str(tmp_path))
+
+    assert not result["ok"]
+    assert (tmp_path / "c.py").read_text() == "ONE\ntwo\nthree\n"
+    assert {(e["file"], e.get("hunk")) for e in result["errors"]} == {("c.py", 2), ("missing.py", None)}
+
+
+def test_unparseable_patch_writes_nothing(tmp_path):
+    write(tmp_path, "d.py", "a\n")
+    result = apply_patch_text("*** d.py\n<<<<<<< SEARCH\na\n", str(tmp_path))
+    assert not result["ok"]
+    assert (tmp_path / "d.py").read_text() == "a\n"
+
+
+def test_paths_outside_root_are_rejected(tmp_path):
+    result = apply_patch_text("*** ../evil.py\n<<<<<<< SEARCH\n=======\nx\n>>>>>>> REPLACE\n", str(tmp_path))
+    assert result["errors"][0]["error"] == "path is outside the project"
+
+
+def test_new_and_deleted_files_in_unified_diff(tmp_path):
+    write(tmp_path, "old.txt", "bye\n")
+    patch = """diff --git a/new.txt b/new.txt
+--- /dev/null
++++ b/new.txt
+@@ -0,0 +1,2 @@
++hello
++there
+--- a/old.txt
++++ /dev/null
+@@ -1 +0,0 @@
+-bye
+"""
+    hunks, deleted = parse_patch(patch)
+    assert deleted == {"old.txt"}
+    result = apply_patch_text(patch, str(tmp_path))
+    assert result["ok"], result
+    assert (tmp_path / "new.txt").read_text() == "hello\nthere\n"
+    assert not (tmp_path / "old.txt").exists()
+
+
+def test_zero_context_hunks_insert_at_their_line(tmp_path):
+    write(tmp_path, "list.txt", "".join(f"line {i}\n" for i in range(1, 13)))
+    patch = """--- a/list.txt
++++ b/list.txt
+@@ -2,0 +3 @@
++after 2
+@@ -10,0 +12,2 @@
++after 10
++also after 10
+"""
+    result = apply_patch_text(patch, str(tmp_path))
+    assert result["ok"], result
+    lines = (tmp_path / "list.txt").read_text().splitlines()
+    assert lines[:4] == ["line 1", "line 2", "after 2", "line 3"]
+    assert lines[9:13] == ["line 9", "line 10", "after 10", "also after 10"]
+    assert lines[-1] == "line 12"
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from lib.agents.client import ClientWrapper
+from lib.agents.fake_client import FakeClient, FakeOpenAIServer
+from lib.agents.rate_limit import RateLimitedClient, TokenBucket, parse_duration
+
+
+def test_retries_injected_429_from_stand_in_server():
+    from openai import OpenAI
+
+    script = [
+        {"status": 429, "headers": {"retry-after-ms": "10"}},
+        {"status": 503},
+        {"content": "ok", "headers": {"x-ratelimit-limit-requests": "600", "x-ratelimit-remaining-requests": "599"}},
+    ]
+    with FakeOpenAIServer(script) as server:
+        client = RateLimitedClient(OpenAI(base_url=server.base_url, api_key="fake", max_retries=0), base_delay=0.01)
+        completion = client.chat.completions.create(model="fake-model", messages=[{"role": "user", "content": "hi"}])
+
+    assert completion.choices[0].message.content == "ok"
+    assert len(server.requests) == 3
+    assert client.rate_limited == 1
+    assert client.retries == 2
+    assert client.requests_bucket.capacity == 600
+
+
+def test_non_retryable_errors_are_raised():
+    class BadRequest(Exception):
+        status_code = 400
+
+    class Failing(ClientWrapper):
+        def create(self, **kwargs):
+            raise BadRequest()
+
+    client = RateLimitedClient(Failing(), base_delay=0.01)
+    with pytest.raises(BadRequest):
+        client.chat.completions.create(model="m", messages=[])
+    assert client.retries == 0
+
+
+def test_in_flight_cap_is_global():
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    class Slow(FakeClient):
+        def create(self, **kwargs):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            try:
+                return super().create(**kwargs)
+            finally:
+                with lock:
+                    active -= 1
+
+    client = RateLimitedClient(Slow(["ok"], latency=0.02, loop=True), max_in_flight=2)
+    threads = [
+        threading.Thread(target=client.chat.completions.create, kwargs={"model": "m", "messages": []})
+        for _ in range(6)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak == 2
+
+
+def test_token_bucket_paces_requests():
+    bucket = TokenBucket(per_minute=600)
+    bucket.tokens = 0
+    start = time.monotonic()
+    bucket.acquire(2)
+    assert time.monotonic() - start >= 0.15
+
+
+def test_parse_duration():
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("20ms") == 0.02
+    assert parse_duration("1.5") == 1.5
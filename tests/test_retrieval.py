@@ -0,0 +1,90 @@
+from lib.agents.retrieval import RetrievalIndex, chunk_spans, tokenize
+
+SOURCE = """#include "database.h"
+#include <QSqlQuery>
+
+bool Database::openConnection(const QString& name)
+{
+    m_db = QSqlDatabase::addDatabase("QSQLITE", name);
+    m_db.setDatabaseName(name);
+    if (!m_db.open()) {
+        return false;
+    }
+    return true;
+}
+
+void Database::renderWidget(Widget& widget)
+{
+    widget.paint();
+    widget.update();
+    widget.show();
+    widget.raise();
+    widget.activateWindow();
+}
+"""
+
+
+def test_tokenize_splits_camel_and_snake_case():
+    assert tokenize("openHttpConnection(max_retry_count)") == [
+        "openhttpconnection", "open", "http", "connection", "max_retry_count", "max", "retry", "count"
+    ]
+
+
+def test_chunks_follow_handlers_and_split_large_ones():
+    spans = [(3, 20, "A"), (5, 8, "A::f"), (22, 23, "g"), (30, 200, "Big"), (40, 60, "Big::h")]
+    assert chunk_spans(spans, 1, 210, max_lines=80, min_lines=8) == [
+        (1, 2, None), (3, 20, "A"), (21, 29, "g"), (30, 39, "Big"), (40, 60, "Big::h"),
+        (61, 140, "Big"), (141, 200, "Big"), (201, 210, None),
+    ]
+
+
+def test_search_returns_method_chunks_and_updates_incrementally(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "database.cpp").write_text(SOURCE)
+    (src / "notes.md").write_text("The widget paints itself.\n")
+    index = RetrievalIndex(str(src), str(tmp_path / "index.npz"), min_chunk_lines=4)
+    assert index.refresh() == {"indexed": 2, "removed": 0, "unchanged": 0}
+
+    best = index.search("open sqlite database connection", k=3)[0]
+    assert (best["file_path"], best["name"], best["start_line"], best["end_line"]) == \
+        ("database.cpp", "Database::openConnection", 4, 12)
+    assert index.search("renderWidget", k=1)[0]["name"] == "Database::renderWidget"
+
+    (src / "notes.md").unlink()
+    (src / "cache.cpp").write_text("int lruCacheLookup(int key) { return key; }\n")
+    assert index.refresh() == {"indexed": 1, "removed": 1, "unchanged": 1}
+    assert [r["file_path"] for r in index.search("cache lookup", k=5)] == ["cache.cpp"]
+
+    reloaded = RetrievalIndex(str(src), str(tmp_path / "index.npz"), min_chunk_lines=4)
+    assert reloaded.search("open connection", k=1) == index.search("open connection", k=1)
+    assert reloaded.refresh() == {"indexed": 0, "removed": 0, "unchanged": 2}
+    assert reloaded.search("unknownterm", k=5) == []
+
+
+def test_update_reindexes_only_notified_paths_and_compacts_terms(tmp_path):
+    src = tmp_path / "src"
+    (src / "net").mkdir(parents=True)
+    (src / "database.cpp").write_text(SOURCE)
+    (src / "net" / "socket.cpp").write_text("int openSocketHandle(int port) { return port; }\n")
+    listed = []
+    index = RetrievalIndex(str(src), str(tmp_path / "index.npz"), min_chunk_lines=4,
+                           list_files=lambda: listed.append(1) or ["database.cpp", "net/socket.cpp"])
+    assert index.update()["indexed"] == 2
+    assert index.update() == {"indexed": 0, "removed": 0, "unchanged": 0}
+    assert len(listed) == 1
+
+    (src / "database.cpp").write_text("int lruCacheLookup(int key) { return key; }\n")
+    index.notify_changed({"database.cpp"})
+    assert index.update() == {"indexed": 1, "removed": 0, "unchanged": 0}
+    assert [r["file_path"] for r in index.search("cache lookup", k=5)] == ["database.cpp"]
+    assert "sqlite" not in index.vocabulary and index.search("sqlite", k=5) == []
+
+    (src / "net" / "socket.cpp").unlink()
+    (src / "net").rmdir()
+    index.notify_changed({"net"})
+    assert index.update()["removed"] == 1
+    assert len(listed) == 1
+    reloaded = RetrievalIndex(str(src), str(tmp_path / "index.npz"), min_chunk_lines=4)
+    assert reloaded.terms == index.terms and "socket" not in reloaded.vocabulary
+    assert reloaded.search("cache lookup", k=1) == index.search("cache lookup", k=1)
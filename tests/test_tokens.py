@@ -0,0 +1,99 @@
+import pytest
+
+from lib.agents import agents as agents_module
+from lib.agents.agents import Agent
+from lib.agents.fake_client import FakeClient
+from lib.agents.tokens import ContextLimitError, TokenCounter, context_limit
+
+
+class WordEncoding:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, text, disallowed_special=()):
+        self.calls.append(text)
+        return text.split()
+
+
+def make_counter():
+    encoding = WordEncoding()
+    loads = []
+
+    def load_encoding(model):
+        loads.append(model)
+        return encoding
+
+    return TokenCounter(load_encoding=load_encoding), encoding, loads
+
+
+def test_encoders_and_message_counts_are_cached():
+    counter, encoding, loads = make_counter()
+    messages = [{"role": "system", "content": "be brief"}, {"role": "user", "content": "one two three"}]
+    first = counter.count_messages(messages, "gpt-5")
+    assert first == 3 + (3 + 1 + 2) + (3 + 1 + 3)
+
+    encoded = len(encoding.calls)
+    messages.append({"role": "assistant", "content": "four"})
+    assert counter.count_messages(messages, "gpt-5") == first + 3 + 1 + 1
+    assert encoding.calls[encoded:] == ["assistant", "four"]
+    assert loads == ["gpt-5"]
+
+
+def test_context_limits_and_oversized_requests():
+    assert context_limit("gpt-5-mini") == 400_000
+    assert context_limit("gpt-4o-mini") == 128_000
+    assert context_limit("gpt-4") == 8_192
+    assert context_limit("unknown-model") == 128_000
+
+    counter, _, _ = make_counter()
+    messages = [{"role": "user", "content": "word " * 9000}]
+    with pytest.raises(ContextLimitError) as raised:
+        counter.check_request(messages, "gpt-4")
+    assert (raised.value.model, raised.value.limit) == ("gpt-4", 8_192) and raised.value.tokens > 9000
+
+
+def test_missing_tokenizer_falls_back_to_estimate():
+    def load_encoding(model):
+        raise OSError("offline")
+
+    counter = TokenCounter(load_encoding=load_encoding)
+    assert counter.count_text("x" * 40, "gpt-5") == 10
+
+
+def test_oversized_request_never_reaches_the_client(monkeypatch):
+    counter, _, _ = make_counter()
+    monkeypatch.setattr(agents_module, "token_counter", counter)
+    client = FakeClient([{"content": "never sent"}])
+    agent = Agent(name="Small", model="gpt-4", system_prompt="sys")
+
+    response = agent.request(client, "word " * 9000)
+    assert client.requests == []
+    assert agent.last_stop_reason == "context"
+    assert "exceeds the 8192-token context of gpt-4" in response
+    assert agent.messages == [{"role": "system", "content": "sys"}]
+
+    assert agent.request(client, "hello") == "never sent"
+    assert agent.last_stop_reason == "completed"
+
+
+def test_context_stop_keeps_tool_calls_that_already_ran(monkeypatch):
+    counter, _, _ = make_counter()
+    monkeypatch.setattr(agents_module, "token_counter", counter)
+    writes = []
+
+    def write_note(text):
+        """
+        Writes a note.
+
+        :param text: Note text.
+        """
+        writes.append(text)
+        return "word " * 9000
+
+    client = FakeClient([{"tool_calls": [{"name": "write_note", "arguments": {"text": "todo"}}]}])
+    agent = Agent(name="Small", model="gpt-4", system_prompt="sys", tools=[write_note])
+
+    response = agent.request(client, "write a note")
+    assert writes == ["todo"] and agent.last_stop_reason == "context"
+    assert [m["role"] for m in agent.messages] == ["system", "assistant", "tool", "assistant"]
+    assert agent.messages[-1]["content"] == response
@@ -0,0 +1,52 @@
+from lib.agents.tree_render import TreeRenderer
+
+
+def make_tree():
+    return {
+        "src": {
+            "core": {f"module_{i}.cpp": None for i in range(50)} | {"core.h": None},
+            "ui": {"main_window.cpp": None, "main_window.h": None},
+        },
+        "tests": {f"test_{i}.cpp": None for i in range(300)} | {"data": {"a.json": None}},
+        "java": {"org": {"app": {"Main.java": None}}},
+        "README.md": None,
+    }
+
+
+def test_small_budget_collapses_directories_into_summaries():
+    text = TreeRenderer().render(make_tree(), token_budget=60)
+    assert "tests/ (301 files, *.cpp, *.json)" in text
+    assert "test_0.cpp" not in text
+    assert "README.md" in text
+    assert len(text) // 4 <= 60
+
+
+def test_large_budget_lists_everything_and_joins_single_directory_chains():
+    text = TreeRenderer().render(make_tree(), token_budget=100_000)
+    lines = text.splitlines()
+    assert "java/org/app/" in lines
+    assert "  Main.java" in lines
+    assert "    module_7.cpp" in lines
+    assert "(" not in text
+
+
+def test_focus_expands_recently_touched_directory_first():
+    tree = make_tree()
+    text = TreeRenderer().render(tree, token_budget=120, focus=["tests/test_250.cpp", "src/ui"])
+    lines = text.splitlines()
+    assert lines[lines.index("tests/") + 1] == "  test_250.cpp"
+    assert any(line.startswith("  ... ") and "more" in line for line in lines)
+    assert "    main_window.h" in lines
+    assert "  core/ (51 files, *.cpp, *.h)" in lines
+
+
+def test_stats_are_reused_for_unchanged_subtrees():
+    renderer = TreeRenderer()
+    tree = make_tree()
+    renderer.render(tree, token_budget=60)
+    cached = dict(renderer.stats_cache)
+
+    updated = dict(tree, src=dict(tree["src"], new=None))
+    renderer.render(updated, token_budget=60)
+    assert renderer.stats_cache[id(tree["tests"])] is cached[id(tree["tests"])]
+    assert renderer.stats(updated["src"])[0] == 54